@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""Measures import to first response time of every lambda handler
+
+Every handler runs in a fresh interpreter against moto, table and topic
+creation is excluded from the measurement.
+
+    python benchmarks/cold_start.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess  # nosec
+import sys
+from pathlib import Path
+
+code_path = Path(__file__).resolve().parents[1] / "code"
+
+handler_script = """
+import json
+import sys
+import time
+
+import boto3
+from moto import mock_dynamodb, mock_sns
+
+handler_module, event = sys.argv[1], json.loads(sys.argv[2])
+
+with mock_dynamodb(), mock_sns():
+    dynamodb = boto3.resource("dynamodb")
+    dynamodb.create_table(
+        TableName="schedule_items",
+        KeySchema=[
+            {"AttributeName": "time_period_hash", "KeyType": "HASH"},
+            {"AttributeName": "trigger_time", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "time_period_hash", "AttributeType": "S"},
+            {"AttributeName": "trigger_time", "AttributeType": "N"},
+            {"AttributeName": "schedule_id", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "gsi_id",
+                "KeySchema": [{"AttributeName": "schedule_id", "KeyType": "HASH"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }
+        ],
+    )
+    dynamodb.create_table(
+        TableName="period_hashes",
+        KeySchema=[{"AttributeName": "time_period", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "time_period", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    topic_arn = boto3.client("sns").create_topic(Name="dispatcher")["TopicArn"]
+    assert topic_arn.endswith(":dispatcher")
+
+    start = time.perf_counter()
+    module = __import__(handler_module, fromlist=["lambda_handler"])
+    imported = time.perf_counter()
+    module.lambda_handler(event, None)
+    responded = time.perf_counter()
+
+print(json.dumps({"import": imported - start, "first_response": responded - start}))
+"""
+
+
+def schedule_event(body: dict) -> dict:
+    return {"httpMethod": "POST", "body": json.dumps(body)}
+
+
+def handler_events() -> dict:
+    schedule_time = 2 * 10**9
+    return {
+        "api_gw.schedule_item": schedule_event(
+            {"schedule_time": schedule_time, "workflow_arn": "test"}
+        ),
+        "api_gw.schedule_items": schedule_event(
+            {"schedule_items": [{"schedule_time": schedule_time, "workflow_arn": "t"}]}
+        ),
+        "api_gw.get_schedule_item": {
+            "httpMethod": "GET",
+            "queryStringParameters": {"schedule_id": "test"},
+        },
+        "api_gw.remove_schedule_item": schedule_event({"schedule_id": "test"}),
+        "api_gw.update_schedule_item": schedule_event(
+            {"schedule_id": "test", "schedule_time": schedule_time, "workflow_arn": "t"}
+        ),
+        "src.workflow_starter": {},
+    }
+
+
+def run_handler(handler_module: str, event: dict) -> dict:
+    environment = {
+        **os.environ,
+        "PYTHONPATH": str(code_path),
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "SCHEDULE_ITEMS_TABLE_NAME": "schedule_items",
+        "HASH_TABLE_NAME": "period_hashes",
+        "SCHEDULE_ID_INDEX_NAME": "gsi_id",
+        "DISPATCHER_SNS_ARN": "arn:aws:sns:us-east-1:123456789012:dispatcher",
+        "LOGGING_LEVEL": "WARNING",
+    }
+    output = subprocess.run(  # nosec
+        [sys.executable, "-c", handler_script, handler_module, json.dumps(event)],
+        env=environment,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    arguments = parser.parse_args()
+
+    print(f"{'handler':<32}{'import ms':>12}{'first response ms':>20}")
+    for handler_module, event in handler_events().items():
+        timings = [run_handler(handler_module, event) for _ in range(arguments.runs)]
+        import_time = statistics.median(t["import"] for t in timings) * 1000
+        response_time = statistics.median(t["first_response"] for t in timings) * 1000
+        print(f"{handler_module:<32}{import_time:>12.1f}{response_time:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
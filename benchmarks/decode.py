@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""Compares decoding of query pages on the resource and the client engine
+
+The resource engine runs every attribute through the boto3 type
+deserializer before mapping, the client engine maps attribute values
+directly. Response parsing by botocore is the same for both and excluded.
+
+    python benchmarks/decode.py --items 10000 --runs 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+for name, value in (
+    ("SCHEDULE_ITEMS_TABLE_NAME", "schedule_items"),
+    ("HASH_TABLE_NAME", "period_hashes"),
+    ("SCHEDULE_ID_INDEX_NAME", "gsi_id"),
+    ("DISPATCHER_SNS_ARN", "arn:aws:sns:us-east-1:123456789012:dispatcher"),
+    ("LOGGING_LEVEL", "WARNING"),
+):
+    os.environ.setdefault(name, value)
+
+from boto3.dynamodb.types import TypeDeserializer  # type: ignore # noqa: E402
+from lib.scheduler.data import DynamodbItem, ScheduleItem  # noqa: E402
+from lib.scheduler.data_mapper import DataMapper  # noqa: E402
+
+
+def query_page(items: int) -> list:
+    page = []
+    for index in range(items):
+        dynamodb_item = DynamodbItem(
+            time_period_hash="period_hash",
+            schedule_item=ScheduleItem(
+                schedule_time=2 * 10**9 + index,
+                workflow_arn="arn:aws:states:us-east-1:123456789012:stateMachine:test",
+                workflow_payload={"index": index, "name": "test"},
+            ),
+        )
+        page.append(DataMapper.dynamodb_item_to_transact_record(dynamodb_item))
+    return page
+
+
+def decode_resource(page: list) -> list:
+    deserializer = TypeDeserializer()
+    return [
+        DataMapper.record_to_dynamodb_item(
+            {k: deserializer.deserialize(v) for k, v in record.items()},
+            validate=False,
+        )
+        for record in page
+    ]
+
+
+def decode_client(page: list) -> list:
+    return [DataMapper.attribute_record_to_dynamodb_item(record) for record in page]
+
+
+def measure(decode, page: list, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        decode(page)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    arguments = parser.parse_args()
+
+    page = query_page(arguments.items)
+    assert decode_resource(page) == decode_client(page)
+
+    print(f"{'engine':<12}{'page ms':>12}{'item us':>12}")
+    for engine, decode in (("resource", decode_resource), ("client", decode_client)):
+        page_time = measure(decode, page, arguments.runs)
+        item_time = page_time / arguments.items * 10**6
+        print(f"{engine:<12}{page_time * 1000:>12.1f}{item_time:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""Compares due queue backends for large pending sets
+
+Items are spread over one day and drained in one second ticks. The poll
+model keeps items sorted by trigger time, as the items table does, and
+runs one range lookup per tick. It measures only the in process part of
+polling, network round trips of the real queries come on top of it.
+
+    python benchmarks/due_queue.py --sizes 10000,100000,1000000
+"""
+import argparse
+import bisect
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+for name, value in (
+    ("SCHEDULE_ITEMS_TABLE_NAME", "schedule_items"),
+    ("HASH_TABLE_NAME", "period_hashes"),
+    ("SCHEDULE_ID_INDEX_NAME", "gsi_id"),
+    ("DISPATCHER_SNS_ARN", "arn:aws:sns:us-east-1:123456789012:dispatcher"),
+    ("LOGGING_LEVEL", "WARNING"),
+):
+    os.environ.setdefault(name, value)
+
+from lib.dispatcher.due_queue import HeapDueQueue  # noqa: E402
+from lib.dispatcher.timing_wheel import TimingWheel  # noqa: E402
+from lib.scheduler.data import DynamodbItem, ScheduleItem, construct  # noqa: E402
+
+start_time = 1_700_000_000 * 10**6
+span_seconds = 24 * 60 * 60
+
+
+def pending_items(size: int) -> list:
+    random.seed(size)
+    dynamodb_items = []
+    for index in range(size):
+        trigger_time = start_time + random.randrange(span_seconds * 10**6)
+        schedule_item = construct(
+            ScheduleItem,
+            schedule_time=trigger_time // 10**6,
+            workflow_arn="test_arn",
+            workflow_payload={},
+            schedule_id=str(index),
+        )
+        dynamodb_items.append(
+            construct(
+                DynamodbItem,
+                time_period_hash=f"hash#{index}",
+                schedule_item=schedule_item,
+                trigger_time=trigger_time,
+                status="NOT_STARTED",
+                payload_ref=None,
+                lease_owner=None,
+                lease_expiry=None,
+            )
+        )
+    return dynamodb_items
+
+
+def measure_queue(due_queue, dynamodb_items: list) -> dict:
+    start = time.perf_counter()
+    for dynamodb_item in dynamodb_items:
+        due_queue.push(dynamodb_item)
+    pushed = time.perf_counter()
+
+    cancelled_items = dynamodb_items[:: max(len(dynamodb_items) // 1000, 1)]
+    for dynamodb_item in cancelled_items:
+        due_queue.cancel(dynamodb_item)
+    cancelled = time.perf_counter()
+
+    drained = 0
+    for tick in range(1, span_seconds + 1):
+        due_queue.next_trigger_time()
+        drained += len(due_queue.pop_due(start_time + tick * 10**6))
+    finished = time.perf_counter()
+
+    assert drained == len(dynamodb_items) - len(cancelled_items)
+    return {
+        "insert_us": (pushed - start) / len(dynamodb_items) * 10**6,
+        "cancel_us": (cancelled - pushed) / len(cancelled_items) * 10**6,
+        "drain_s": finished - cancelled,
+    }
+
+
+def measure_poll(dynamodb_items: list) -> dict:
+    start = time.perf_counter()
+    trigger_times = sorted(int(i.trigger_time) for i in dynamodb_items)
+    inserted = time.perf_counter()
+
+    drained = 0
+    previous = 0
+    for tick in range(1, span_seconds + 1):
+        position = bisect.bisect_right(trigger_times, start_time + tick * 10**6)
+        drained += len(trigger_times[previous:position])
+        previous = position
+    finished = time.perf_counter()
+
+    assert drained == len(dynamodb_items)
+    return {
+        "insert_us": (inserted - start) / len(dynamodb_items) * 10**6,
+        "cancel_us": float("nan"),
+        "drain_s": finished - inserted,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    arguments = parser.parse_args()
+
+    print(
+        f"{'size':>10}{'backend':>10}{'insert us':>12}{'cancel us':>12}{'drain s':>10}"
+    )
+    for size in (int(size) for size in arguments.sizes.split(",")):
+        dynamodb_items = pending_items(size)
+        for backend, measure in (
+            ("heap", lambda items: measure_queue(HeapDueQueue(), items)),
+            ("wheel", lambda items: measure_queue(TimingWheel(start_time), items)),
+            ("poll", measure_poll),
+        ):
+            result = measure(dynamodb_items)
+            print(
+                f"{size:>10}{backend:>10}{result['insert_us']:>12.2f}"
+                f"{result['cancel_us']:>12.2f}{result['drain_s']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+import asyncio
+import logging
+import threading
+from contextlib import AsyncExitStack
+from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar
+
+import boto3  # type: ignore
+from botocore.config import Config  # type: ignore
+
+from .environment import Environment
+from .exceptions import EnvironmentConfigError
+from .logging import request_context
+
+# optional dependencies
+try:
+    from aiobotocore.config import AioConfig  # type: ignore
+    from aiobotocore.session import get_session  # type: ignore
+except ImportError:  # pragma: no cover
+    get_session = None
+
+logger = logging.getLogger(__name__)
+
+ValueType = TypeVar("ValueType")
+
+
+class AwsClients:
+    """Process wide registry of lazily created boto3 clients and resources"""
+
+    # resources
+    environment = Environment.aws_client_env()
+
+    _session: Optional[boto3.session.Session] = None
+    _clients: Dict[str, Any] = {}
+    _resources: Dict[str, Any] = {}
+    _lock = threading.RLock()
+
+    @classmethod
+    def session(cls) -> boto3.session.Session:
+        with cls._lock:
+            if cls._session is None:
+                logger.info("Creating boto3 session", extra=request_context)
+                cls._session = boto3.session.Session()
+            return cls._session
+
+    @classmethod
+    def client(cls, service_name: str) -> Any:
+        with cls._lock:
+            if service_name not in cls._clients:
+                logger.info(f"Creating {service_name} client", extra=request_context)
+                cls._clients[service_name] = cls.session().client(
+                    service_name, config=cls.config(service_name)
+                )
+            return cls._clients[service_name]
+
+    @classmethod
+    def resource(cls, service_name: str) -> Any:
+        with cls._lock:
+            if service_name not in cls._resources:
+                logger.info(f"Creating {service_name} resource", extra=request_context)
+                cls._resources[service_name] = cls.session().resource(
+                    service_name, config=cls.config(service_name)
+                )
+            return cls._resources[service_name]
+
+    @classmethod
+    def config(cls, service_name: str) -> Config:
+        return Config(**cls.config_values(service_name))
+
+    @classmethod
+    def config_values(cls, service_name: str) -> Dict[str, Any]:
+
+        # service overrides are botocore config values applied over shared ones
+        values: Dict[str, Any] = {
+            "max_pool_connections": cls.environment.max_pool_connections,
+            "retries": {
+                "mode": cls.environment.retry_mode,
+                "max_attempts": cls.environment.max_attempts,
+            },
+            "connect_timeout": cls.environment.connect_timeout,
+            "read_timeout": cls.environment.read_timeout,
+            "tcp_keepalive": cls.environment.tcp_keepalive,
+        }
+        values.update(cls.environment.client_overrides.get(service_name, {}))
+        return values
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._session = None
+            cls._clients = {}
+            cls._resources = {}
+
+        # class level tables and topics were built on the dropped clients
+        for instance in cached_classproperty.instances:
+            instance.reset()
+
+
+class AsyncAwsClients:
+    """Registry of aiobotocore clients sharing one session and connection pool"""
+
+    _session: Any = None
+    _clients: Dict[str, Any] = {}
+    _exit_stack: Optional[AsyncExitStack] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    async def client(cls, service_name: str) -> Any:
+        if get_session is None:
+            raise EnvironmentConfigError(message="aiobotocore is not installed")
+
+        # connection pools are bound to the event loop that opened them
+        loop = asyncio.get_running_loop()
+        if cls._loop is not loop:
+            cls._session = get_session()
+            cls._clients = {}
+            cls._exit_stack = AsyncExitStack()
+            cls._loop = loop
+            cls._lock = asyncio.Lock()
+
+        async with cls._lock:  # type: ignore
+            if service_name not in cls._clients:
+                logger.info(
+                    f"Creating async {service_name} client", extra=request_context
+                )
+                client = cls._session.create_client(
+                    service_name,
+                    config=AioConfig(**AwsClients.config_values(service_name)),
+                )
+                cls._clients[service_name] = await cls._exit_stack.enter_async_context(
+                    client
+                )  # type: ignore
+        return cls._clients[service_name]
+
+    @classmethod
+    async def close(cls) -> None:
+        exit_stack = cls._exit_stack
+        cls._session = None
+        cls._clients = {}
+        cls._exit_stack = None
+        cls._loop = None
+        cls._lock = None
+        if exit_stack is not None:
+            await exit_stack.aclose()
+
+
+class cached_classproperty(Generic[ValueType]):
+    """Class level property evaluated on first access and cached afterwards"""
+
+    instances: List["cached_classproperty"] = []
+
+    def __init__(self, function: Callable[[Any], ValueType]) -> None:
+        self.function = function
+        self.value: Optional[ValueType] = None
+        self.lock = threading.Lock()
+        cached_classproperty.instances.append(self)
+
+    def __get__(self, instance: Any, owner: Any) -> ValueType:
+        if self.value is None:
+            with self.lock:
+                if self.value is None:
+                    self.value = self.function(owner)
+        return self.value  # type: ignore
+
+    def reset(self) -> None:
+        with self.lock:
+            self.value = None
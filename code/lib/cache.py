@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+ValueType = TypeVar("ValueType")
+
+
+class TTLCache(Generic[ValueType]):
+    """Bounded in-process LRU cache with optional time to live"""
+
+    def __init__(self, max_size: int = 128, ttl: Optional[float] = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[Hashable, Tuple[float, ValueType]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[ValueType]:
+        with self._lock:
+            try:
+                created_at, value = self._items[key]
+            except KeyError:
+                return None
+
+            if self.ttl is not None and time.monotonic() - created_at > self.ttl:
+                del self._items[key]
+                return None
+
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: ValueType) -> None:
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+import asyncio
+import heapq
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+ItemType = TypeVar("ItemType")
+ResultType = TypeVar("ResultType")
+
+MapResult = Tuple[ItemType, Optional[ResultType], Optional[Exception]]
+
+_merge_done = object()
+
+
+def chunked(
+    items: Iterable[ItemType], chunk_size: int
+) -> Generator[List[ItemType], None, None]:
+    chunk: List[ItemType] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def paced(items: Iterable[ItemType], rate: float) -> Generator[ItemType, None, None]:
+    """Yields at most rate items per second, a rate of 0 does not limit"""
+
+    # schedule is kept from the start, a slow consumer is not penalized twice
+    start_time = time.monotonic()
+    for count, item in enumerate(items):
+        if rate > 0:
+            wait_time = start_time + count / rate - time.monotonic()
+            if wait_time > 0:
+                time.sleep(wait_time)
+        yield item
+
+
+def bounded_map(
+    function: Callable[[ItemType], ResultType],
+    items: Iterable[ItemType],
+    max_workers: int = 1,
+    max_in_flight: Optional[int] = None,
+) -> Generator[MapResult, None, None]:
+    """Maps function over items on a thread pool with bounded in flight work"""
+
+    # serial execution, no pool overhead
+    if max_workers <= 1:
+        for item in items:
+            try:
+                yield item, function(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    # items are consumed lazily, results are yielded in completion order
+    max_in_flight = max_in_flight or 2 * max_workers
+    in_flight: Dict[Future, ItemType] = {}
+
+    def collect(futures) -> Generator[MapResult, None, None]:
+        for future in futures:
+            item = in_flight.pop(future)
+            exception = future.exception()
+            if exception is not None:
+                yield item, None, exception  # type: ignore
+            else:
+                yield item, future.result(), None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for item in items:
+            if len(in_flight) >= max_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                yield from collect(done)
+            in_flight[executor.submit(function, item)] = item
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            yield from collect(done)
+
+
+def concurrent_merge(
+    iterables: List[Iterable[ItemType]],
+    key: Callable[[ItemType], Any],
+    max_buffer: int = 1000,
+) -> Generator[ItemType, None, None]:
+    """Merges sorted iterables consumed concurrently into one sorted stream"""
+
+    if len(iterables) <= 1:
+        for iterable in iterables:
+            yield from iterable
+        return
+
+    # every iterable is drained by its own thread into a bounded buffer
+    stop = threading.Event()
+    buffers: List[queue.Queue] = [queue.Queue(maxsize=max_buffer) for _ in iterables]
+
+    def put(buffer: queue.Queue, entry: Any) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(iterable: Iterable[ItemType], buffer: queue.Queue) -> None:
+        try:
+            for item in iterable:
+                if not put(buffer, (item, None)):
+                    return
+        except Exception as e:
+            put(buffer, (None, e))
+            return
+        put(buffer, _merge_done)
+
+    def consume(buffer: queue.Queue) -> Generator[ItemType, None, None]:
+        while True:
+            entry = buffer.get()
+            if entry is _merge_done:
+                return
+            item, exception = entry
+            if exception is not None:
+                raise exception
+            yield item
+
+    with ThreadPoolExecutor(max_workers=len(iterables)) as executor:
+        for iterable, buffer in zip(iterables, buffers):
+            executor.submit(produce, iterable, buffer)
+        try:
+            yield from heapq.merge(*(consume(b) for b in buffers), key=key)
+        finally:
+            stop.set()
+
+
+async def async_merge(
+    iterables: List[AsyncIterable[ItemType]],
+    key: Callable[[ItemType], Any],
+    max_buffer: int = 1000,
+) -> AsyncGenerator[ItemType, None]:
+    """Merges sorted async iterables consumed concurrently into one sorted stream"""
+
+    if len(iterables) <= 1:
+        for iterable in iterables:
+            async for item in iterable:
+                yield item
+        return
+
+    # every iterable is drained by its own task into a bounded buffer
+    buffers: List[asyncio.Queue] = [
+        asyncio.Queue(maxsize=max_buffer) for _ in iterables
+    ]
+
+    async def produce(iterable: AsyncIterable[ItemType], buffer: asyncio.Queue) -> None:
+        try:
+            async for item in iterable:
+                await buffer.put((item, None))
+        except Exception as e:
+            await buffer.put((None, e))
+            return
+        await buffer.put(_merge_done)
+
+    async def head(index: int) -> Optional[Tuple[Any, int, ItemType]]:
+        entry = await buffers[index].get()
+        if entry is _merge_done:
+            return None
+        item, exception = entry
+        if exception is not None:
+            raise exception
+        return key(item), index, item
+
+    tasks = [
+        asyncio.ensure_future(produce(iterable, buffer))
+        for iterable, buffer in zip(iterables, buffers)
+    ]
+    try:
+        heap = [
+            entry
+            for entry in await asyncio.gather(*(head(i) for i in range(len(tasks))))
+            if entry is not None
+        ]
+        heapq.heapify(heap)
+        while heap:
+            _, index, item = heapq.heappop(heap)
+            yield item
+
+            entry = await head(index)
+            if entry is not None:
+                heapq.heappush(heap, entry)
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -1 +1,6 @@
-from .data import LambdaProxySnsEvent  # noqa
+from .data import (  # noqa
+    DispatchError,
+    DispatchLateness,
+    DispatchReport,
+    LambdaProxySnsEvent,
+)
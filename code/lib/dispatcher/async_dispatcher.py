@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+import asyncio
+import logging
+import time
+from dataclasses import replace
+from typing import AsyncIterable, List, Optional, Tuple
+
+from lib.aws import AsyncAwsClients
+from lib.environment import Environment
+from lib.logging import request_context
+from lib.scheduler import DynamodbItem, QueryRange, ScheduleStatus
+from lib.scheduler.async_scheduler import AsyncDynamoScheduler
+from lib.scheduler.data_mapper import DataMapper
+
+from .data import DispatchError, DispatchReport
+from .dispatcher import Dispatcher
+from .time_budget import TimeBudget
+
+# resources
+logger = logging.getLogger(__name__)
+
+
+class AsyncDispatcher:
+    """Publishes due items with many batches in flight on one event loop"""
+
+    # resources
+    environment = Environment.dispatcher_env()
+
+    @classmethod
+    async def dispatch_query_range(
+        cls, query_range: QueryRange, time_budget: Optional[TimeBudget] = None
+    ) -> DispatchReport:
+
+        # connection pools are bound to the event loop of this run
+        try:
+            return await cls.dispatch_dynamodb_items(
+                AsyncDynamoScheduler.get_dynamodb_items(
+                    query_range, ScheduleStatus.NOT_STARTED
+                ),
+                time_budget,
+            )
+        finally:
+            await AsyncAwsClients.close()
+
+    @classmethod
+    async def dispatch_dynamodb_items(
+        cls,
+        dynamodb_items: AsyncIterable[DynamodbItem],
+        time_budget: Optional[TimeBudget] = None,
+    ) -> DispatchReport:
+        max_in_flight = cls.environment.async_max_in_flight
+        logger.info(
+            f"Dispatching items with {max_in_flight} batches in flight",
+            extra=request_context,
+        )
+
+        batch_size = min(
+            cls.environment.publish_batch_size, Dispatcher.publish_batch_max_entries
+        )
+
+        # batches are published while the query is still paging
+        semaphore = asyncio.Semaphore(max_in_flight)
+        batches: List[List[DynamodbItem]] = []
+        tasks: List[asyncio.Task] = []
+
+        async def dispatch_batch(batch: List[DynamodbItem]) -> List[DispatchError]:
+            try:
+                return await cls.dispatch_dynamodb_item_batch(batch)
+            finally:
+                if time_budget is not None:
+                    time_budget.record(len(batch))
+                semaphore.release()
+
+        # batches not predicted to finish in time are left for a continuation
+        batch: List[DynamodbItem] = []
+        async for dynamodb_item in dynamodb_items:
+            batch.append(dynamodb_item)
+            if len(batch) < batch_size:
+                continue
+
+            await semaphore.acquire()
+            if time_budget is not None and not time_budget.fits(len(batch)):
+                semaphore.release()
+                batch = []
+                break
+            batches.append(batch)
+            tasks.append(asyncio.ensure_future(dispatch_batch(batch)))
+            batch = []
+
+        if batch:
+            await semaphore.acquire()
+            if time_budget is None or time_budget.fits(len(batch)):
+                batches.append(batch)
+                tasks.append(asyncio.ensure_future(dispatch_batch(batch)))
+
+        dispatched = 0
+        errors: List[DispatchError] = []
+        for dynamodb_items_batch, batch_errors in zip(
+            batches, await asyncio.gather(*tasks, return_exceptions=True)
+        ):
+            if isinstance(batch_errors, Exception):
+                logger.error(
+                    f"Error dispatching items {dynamodb_items_batch}: {batch_errors}",
+                    extra=request_context,
+                )
+                batch_errors = [
+                    DispatchError(
+                        schedule_id=str(dynamodb_item.schedule_item.schedule_id),
+                        message=str(batch_errors),
+                    )
+                    for dynamodb_item in dynamodb_items_batch
+                ]
+
+            dispatched += len(dynamodb_items_batch) - len(batch_errors)
+            errors.extend(batch_errors)
+
+        dispatch_report = DispatchReport(dispatched=dispatched, errors=errors)
+        logger.info(f"Dispatch finished: {dispatch_report}", extra=request_context)
+        return dispatch_report
+
+    @classmethod
+    async def dispatch_dynamodb_item_batch(
+        cls, dynamodb_items: List[DynamodbItem]
+    ) -> List[DispatchError]:
+        logger.info(
+            f"Dispatching batch of {len(dynamodb_items)} items for execution",
+            extra=request_context,
+        )
+
+        # claim before publish, concurrent pollers skip leased items
+        claimed_items, errors = await cls._lease_dynamodb_items(dynamodb_items)
+        entries = [
+            {"Id": str(index), "Message": DataMapper.dynamodb_item_to_sns_payload(item)}
+            for index, item in enumerate(claimed_items)
+        ]
+
+        # send to sns, unpublished items are released for the next poll
+        published_items: List[DynamodbItem] = []
+        sns_client = await AsyncAwsClients.client("sns")
+        try:
+            for entries_batch in Dispatcher._split_publish_entries(entries):
+
+                # a failed request fails its entries, later ones are still sent
+                try:
+                    response = await sns_client.publish_batch(
+                        TopicArn=cls.environment.dispatch_topic_arn,
+                        PublishBatchRequestEntries=entries_batch,
+                    )
+                except Exception as e:
+                    response = Dispatcher._failed_response(entries_batch, e)
+
+                published_batch, publish_errors = Dispatcher._publish_results(
+                    claimed_items, response
+                )
+                published_items.extend(published_batch)
+                errors.extend(publish_errors)
+        finally:
+            await cls._release_dynamodb_items(
+                Dispatcher._unpublished_items(claimed_items, published_items)
+            )
+
+        if published_items:
+            errors.extend(
+                Dispatcher._result_errors(
+                    await AsyncDynamoScheduler.complete_claims(published_items)
+                )
+            )
+
+        logger.info(
+            f"Batch dispatched with {len(errors)} errors", extra=request_context
+        )
+        return errors
+
+    @classmethod
+    async def _lease_dynamodb_items(
+        cls, dynamodb_items: List[DynamodbItem]
+    ) -> Tuple[List[DynamodbItem], List[DispatchError]]:
+
+        lease_expiry = int(time.time() + cls.environment.claim_lease_seconds)
+        results = await AsyncDynamoScheduler.claim_dynamodb_items(
+            dynamodb_items, Dispatcher.lease_owner, lease_expiry
+        )
+        claimed_items = [
+            replace(
+                dynamodb_items[result.index],
+                status=ScheduleStatus.PROCESSING,
+                lease_owner=Dispatcher.lease_owner,
+                lease_expiry=lease_expiry,
+            )
+            for result in results
+            if result.success
+        ]
+        return claimed_items, Dispatcher._result_errors(results)
+
+    @classmethod
+    async def _release_dynamodb_items(cls, dynamodb_items: List[DynamodbItem]) -> None:
+        if not dynamodb_items:
+            return
+
+        # a failed release is recovered once the lease expires
+        results = await AsyncDynamoScheduler.release_claims(dynamodb_items)
+        for error in Dispatcher._result_errors(results):
+            logger.warning(
+                f"Claim not released for {error.schedule_id}: {error.message}",
+                extra=request_context,
+            )
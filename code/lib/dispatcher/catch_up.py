@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+import logging
+from typing import Iterator, List, Optional
+
+from lib.concurrency import paced
+from lib.environment import Environment
+from lib.logging import request_context
+from lib.scheduler import QueryRange, ScheduleStatus
+from lib.scheduler.scheduler import DynamoScheduler
+
+from .cursor import DispatchCursor
+from .data import DispatchError, DispatchReport
+from .dispatcher import Dispatcher
+from .retry_window import RetryWindow
+from .time_budget import TimeBudget
+
+# resources
+logger = logging.getLogger(__name__)
+
+
+class CatchUp:
+    """Drains the schedule from the dispatch cursor up to the lookahead
+
+    The range behind the cursor may span hours after an outage. It is read in
+    pages the scheduler accepts, across every period they touch, and the
+    cursor is advanced after each dispatched page. Items that failed are read
+    once more right away, as the page may be far behind the retry window. A
+    run stops before the deadline and the next tick resumes at the cursor.
+    """
+
+    # resources
+    environment = Environment.dispatcher_env()
+
+    # constants
+    page_seconds = DispatchCursor.max_range_seconds
+
+    @classmethod
+    def pages(cls, start_time: int, end_time: int) -> Iterator[QueryRange]:
+        for page_start in range(start_time, end_time, cls.page_seconds):
+            yield QueryRange(
+                start_time=page_start,
+                end_time=min(page_start + cls.page_seconds, end_time),
+            )
+
+    @classmethod
+    def run(
+        cls,
+        cursor: Optional[int],
+        current_time: int,
+        time_budget: TimeBudget,
+    ) -> DispatchReport:
+        start_time = current_time - 60 if cursor is None else cursor
+        end_time = current_time + cls.environment.cursor_lookahead_seconds
+        logger.info(
+            f"Catching up from {start_time} to {end_time}", extra=request_context
+        )
+
+        dispatched = 0
+        errors: List[DispatchError] = []
+        for page in cls.pages(start_time, end_time):
+            if not time_budget.fits():
+                logger.info(f"Deadline reached at {page}", extra=request_context)
+                break
+
+            dispatch_report = Dispatcher.dispatch_dynamodb_items(
+                paced(
+                    DynamoScheduler.get_dynamodb_items(
+                        page, ScheduleStatus.NOT_STARTED
+                    ),
+                    cls.environment.catch_up_rate,
+                ),
+                time_budget,
+            )
+            dispatched += dispatch_report.dispatched
+            errors.extend(dispatch_report.errors)
+
+            # page cut by the deadline is read again next tick
+            if time_budget.exhausted:
+                break
+            if not DispatchCursor.advance(cursor, page.end_time):
+                break
+            cursor = page.end_time
+
+            # failed items are released, those behind the window expire on retry
+            if dispatch_report.errors:
+                retry_report = RetryWindow.retry(
+                    page, RetryWindow.expire_before(end_time), time_budget
+                )
+                dispatched += retry_report.dispatched
+                errors.extend(retry_report.errors)
+
+        # the window behind the previous cursor is retried like on a tick
+        if cursor == end_time and not time_budget.exhausted:
+            retry_report = RetryWindow.run(start_time, end_time, time_budget)
+            dispatched += retry_report.dispatched
+            errors.extend(retry_report.errors)
+
+        dispatch_report = DispatchReport(dispatched=dispatched, errors=errors)
+        logger.info(f"Catch up finished: {dispatch_report}", extra=request_context)
+        return dispatch_report
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+import json
+import logging
+
+from lib.aws import AwsClients
+from lib.logging import request_context
+
+# resources
+logger = logging.getLogger(__name__)
+
+
+class Continuation:
+    """Hands work left at the deadline to a fresh invocation of the function
+
+    Asynchronous invocations are queued and retried by lambda, the
+    continuation outlives the invocation that ran out of time.
+    """
+
+    # constants
+    event_key = "continuation"
+
+    @classmethod
+    def invoke(cls, function_name: str, payload: dict) -> None:
+        logger.info(
+            f"Invoking continuation of {function_name}: {payload}",
+            extra=request_context,
+        )
+
+        AwsClients.client("lambda").invoke(
+            FunctionName=function_name,
+            InvocationType="Event",
+            Payload=json.dumps({cls.event_key: payload}),
+        )
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+import json
+import logging
+import time
+import uuid
+from typing import Iterable, Iterator, List, Optional
+
+from lib.aws import AwsClients
+from lib.environment import Environment
+from lib.logging import request_context
+from lib.scheduler import DynamodbItem, QueryRange, ScheduleStatus
+from lib.scheduler.scheduler import DynamoScheduler
+
+from .data import DispatchError, DispatchReport
+from .dispatcher import Dispatcher
+from .range_lease import RangeLeases
+from .time_budget import TimeBudget
+
+# resources
+logger = logging.getLogger(__name__)
+
+
+class RangeCoordinator:
+    """Splits a query range over worker invocations leasing its sub ranges"""
+
+    # resources
+    environment = Environment.dispatcher_env()
+
+    # constants
+    worker_event_key = "range_worker"
+
+    @classmethod
+    def split_query_range(
+        cls, query_range: QueryRange, partitions: int
+    ) -> List[QueryRange]:
+
+        # contiguous sub ranges, empty ones are dropped for narrow ranges
+        width = query_range.end_time - query_range.start_time
+        boundaries = sorted(
+            {
+                query_range.start_time + width * partition // max(partitions, 1)
+                for partition in range(max(partitions, 1) + 1)
+            }
+        )
+        return [
+            QueryRange(start_time=start_time, end_time=end_time)
+            for start_time, end_time in zip(boundaries, boundaries[1:])
+        ]
+
+    @classmethod
+    def fan_out(cls, query_range: QueryRange, function_name: str) -> int:
+        workers = cls.environment.coordinator_workers
+        function_name = cls.environment.worker_function_name or function_name
+        logger.info(
+            f"Fanning out range {query_range} to {workers} workers of {function_name}",
+            extra=request_context,
+        )
+
+        # workers run asynchronously, each leases sub ranges on its own
+        for worker in range(workers):
+            cls.invoke_worker(function_name, query_range, worker)
+        return workers
+
+    @classmethod
+    def invoke_worker(
+        cls,
+        function_name: str,
+        query_range: QueryRange,
+        worker: int,
+        lease_owner: Optional[str] = None,
+    ) -> None:
+
+        # a continuing worker keeps its owner and with it the held leases
+        worker_event = {
+            "start_time": query_range.start_time,
+            "end_time": query_range.end_time,
+            "worker": worker,
+        }
+        if lease_owner is not None:
+            worker_event["lease_owner"] = lease_owner
+
+        AwsClients.client("lambda").invoke(
+            FunctionName=function_name,
+            InvocationType="Event",
+            Payload=json.dumps({cls.worker_event_key: worker_event}),
+        )
+
+    @classmethod
+    def run_worker(
+        cls,
+        query_range: QueryRange,
+        worker: int,
+        lease_owner: Optional[str] = None,
+        time_budget: Optional[TimeBudget] = None,
+    ) -> DispatchReport:
+        sub_ranges = cls.split_query_range(
+            query_range, cls.environment.range_partitions
+        )
+        logger.info(
+            f"Worker {worker} dispatching {len(sub_ranges)} sub ranges",
+            extra=request_context,
+        )
+
+        # workers start at different sub ranges, then take over what is left
+        offset = worker % len(sub_ranges) if sub_ranges else 0
+        lease_owner = lease_owner or str(uuid.uuid4())
+        dispatched = 0
+        errors: List[DispatchError] = []
+        skipped: List[QueryRange] = []
+        for sub_range in sub_ranges[offset:] + sub_ranges[:offset]:
+            if time_budget is not None and not time_budget.fits():
+                break
+
+            dispatch_report = cls._dispatch_sub_range(
+                sub_range, lease_owner, time_budget
+            )
+            if dispatch_report is None:
+                skipped.append(sub_range)
+                continue
+            dispatched += dispatch_report.dispatched
+            errors.extend(dispatch_report.errors)
+
+        for dispatch_report in cls._take_over_sub_ranges(
+            skipped, lease_owner, time_budget
+        ):
+            dispatched += dispatch_report.dispatched
+            errors.extend(dispatch_report.errors)
+
+        dispatch_report = DispatchReport(dispatched=dispatched, errors=errors)
+        logger.info(
+            f"Worker {worker} finished: {dispatch_report}", extra=request_context
+        )
+        return dispatch_report
+
+    @classmethod
+    def _take_over_sub_ranges(
+        cls,
+        sub_ranges: List[QueryRange],
+        lease_owner: str,
+        time_budget: Optional[TimeBudget] = None,
+    ) -> Iterator[DispatchReport]:
+
+        # ranges leased elsewhere are retried once, after their lease expired
+        held_ranges = []
+        for sub_range in sub_ranges:
+            held_until = RangeLeases.held_until(RangeLeases.range_key(sub_range))
+            if held_until is not None:
+                held_ranges.append((held_until, sub_range))
+
+        for held_until, sub_range in sorted(held_ranges, key=lambda held: held[0]):
+            wait_time = max(held_until + 1 - time.time(), 0)
+            if time_budget is not None and (
+                time_budget.exhausted or time_budget.remaining_seconds() < wait_time
+            ):
+                return
+            time.sleep(wait_time)
+
+            # a renewed lease belongs to a running worker, the range is left to it
+            dispatch_report = cls._dispatch_sub_range(
+                sub_range, lease_owner, time_budget
+            )
+            if dispatch_report is not None:
+                logger.info(
+                    f"Range {RangeLeases.range_key(sub_range)} taken over",
+                    extra=request_context,
+                )
+                yield dispatch_report
+
+    @classmethod
+    def _dispatch_sub_range(
+        cls,
+        sub_range: QueryRange,
+        lease_owner: str,
+        time_budget: Optional[TimeBudget] = None,
+    ) -> Optional[DispatchReport]:
+        range_key = RangeLeases.range_key(sub_range)
+        if not RangeLeases.acquire(range_key, lease_owner, cls._lease_expiry()):
+            logger.info(f"Range {range_key} leased elsewhere", extra=request_context)
+            return None
+
+        renewed_items = cls._renewing_items(
+            DynamoScheduler.get_dynamodb_items(sub_range, ScheduleStatus.NOT_STARTED),
+            range_key,
+            lease_owner,
+        )
+        dispatch_report = Dispatcher.dispatch_dynamodb_items(renewed_items, time_budget)
+
+        # range cut by the deadline stays leased for the continuing worker
+        if time_budget is not None and time_budget.exhausted:
+            return dispatch_report
+
+        # a lost lease leaves the rest of the range to the worker taking it over
+        if not RangeLeases.complete(range_key, lease_owner):
+            logger.warning(
+                f"Lease of range {range_key} lost before completion",
+                extra=request_context,
+            )
+        return dispatch_report
+
+    @classmethod
+    def _renewing_items(
+        cls, dynamodb_items: Iterable[DynamodbItem], range_key: str, lease_owner: str
+    ) -> Iterator[DynamodbItem]:
+
+        # renew at half of the lease, stop reading once it is lost
+        renew_interval = cls.environment.range_lease_seconds / 2
+        renew_at = time.time() + renew_interval
+        for dynamodb_item in dynamodb_items:
+            if time.time() >= renew_at:
+                if not RangeLeases.renew(range_key, lease_owner, cls._lease_expiry()):
+                    logger.warning(
+                        f"Lease of range {range_key} lost, stopping",
+                        extra=request_context,
+                    )
+                    return
+                renew_at = time.time() + renew_interval
+            yield dynamodb_item
+
+    @classmethod
+    def _lease_expiry(cls) -> int:
+        return int(time.time() + cls.environment.range_lease_seconds)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+import logging
+from typing import Optional
+
+from boto3.dynamodb.conditions import Attr  # type: ignore
+from botocore.exceptions import ClientError  # type: ignore
+from lib.aws import AwsClients, cached_classproperty
+from lib.environment import Environment
+from lib.exceptions import OperationsError
+from lib.logging import request_context
+from lib.scheduler import QueryRange
+
+# resources
+logger = logging.getLogger(__name__)
+
+
+class DispatchCursor:
+    """Start time of the next dispatch, every earlier item was dispatched
+
+    Stored under a reserved key of the period hash table. A tick reads from
+    the cursor to its lookahead and advances the cursor once the range was
+    dispatched, a delayed tick is read again by the next one. Items that
+    failed are left to the retry window behind the cursor.
+    """
+
+    # resources
+    environment = Environment.dispatcher_env()
+    scheduler_environment = Environment.dynamodb_scheduler_env()
+
+    @cached_classproperty
+    def table(cls):
+        return AwsClients.resource("dynamodb").Table(
+            cls.scheduler_environment.hash_table_name
+        )
+
+    # constants
+    period_key_key = "time_period"
+    cursor_key = "__dispatch_cursor__"
+    cursor_value_key = "cursor"
+    max_range_seconds = 600
+
+    @classmethod
+    def load(cls) -> Optional[int]:
+        response = cls.table.get_item(
+            Key={cls.period_key_key: cls.cursor_key}, ConsistentRead=True
+        )
+        item = response.get("Item")
+        cursor = int(item[cls.cursor_value_key]) if item else None
+        logger.info(f"Dispatch cursor loaded: {cursor}", extra=request_context)
+        return cursor
+
+    @classmethod
+    def query_range(cls, cursor: Optional[int], current_time: int) -> QueryRange:
+
+        # first tick reads the window of the rolling rescan
+        end_time = current_time + cls.environment.cursor_lookahead_seconds
+        start_time = current_time - 60 if cursor is None else cursor
+
+        # a backlog behind the cursor is drained one range per tick
+        end_time = min(end_time, start_time + cls.max_range_seconds)
+        return QueryRange(start_time=min(start_time, end_time), end_time=end_time)
+
+    @classmethod
+    def advance(cls, cursor: Optional[int], next_cursor: int) -> bool:
+        logger.info(
+            f"Advancing dispatch cursor from {cursor} to {next_cursor}",
+            extra=request_context,
+        )
+
+        # compare and set, a concurrent tick that moved the cursor first wins
+        condition = (
+            Attr(cls.period_key_key).not_exists()
+            if cursor is None
+            else Attr(cls.cursor_value_key).eq(cursor)
+        )
+        try:
+            cls.table.put_item(
+                Item={
+                    cls.period_key_key: cls.cursor_key,
+                    cls.cursor_value_key: next_cursor,
+                },
+                ConditionExpression=condition,
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                logger.warning(
+                    "Dispatch cursor moved by another tick", extra=request_context
+                )
+                return False
+            raise OperationsError(value=str(next_cursor), message=str(e))
+        return True
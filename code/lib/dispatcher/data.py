@@ -1,10 +1,10 @@
 #!/usr/bin/env python
 import json
-from typing import Optional
+from typing import List, Optional
 
 import pydantic
 from lib.exceptions import ValidationError
-from pydantic.dataclasses import dataclass
+from pydantic.dataclasses import Field, dataclass
 
 
 class Config:
@@ -32,3 +32,25 @@ class LambdaProxySnsEvent:
     @property
     def payload(self) -> str:
         return self.lambda_event["Records"][0]["Sns"]["Message"]
+
+
+@dataclass(config=Config)
+class DispatchError:
+    schedule_id: str
+    message: str
+
+
+@dataclass(config=Config)
+class DispatchLateness:
+    count: int = 0
+    mean_ms: float = 0
+    p50_ms: float = 0
+    p99_ms: float = 0
+    max_ms: float = 0
+
+
+@dataclass(config=Config)
+class DispatchReport:
+    dispatched: int = 0
+    errors: List[DispatchError] = Field(default_factory=list)
+    lateness: Optional[DispatchLateness] = None
@@ -2,26 +2,50 @@
 import json
 import logging
 import time
+import uuid
+from dataclasses import replace
+from typing import Iterable, List, Optional, Tuple
 
-import boto3  # type: ignore
 from botocore.exceptions import ClientError  # type: ignore
+from lib.aws import AwsClients, cached_classproperty
+from lib.concurrency import bounded_map, chunked
 from lib.environment import Environment
+from lib.exceptions import OperationsError
 from lib.logging import request_context
-from lib.scheduler import DynamodbItem, ScheduleStatus
+from lib.protocols import DueQueue
+from lib.scheduler import BatchWriteResult, DynamodbItem, QueryRange, ScheduleStatus
 from lib.scheduler.data_mapper import DataMapper
+from lib.scheduler.payload_store import PayloadStore
 from lib.scheduler.scheduler import DynamoScheduler
 
+from .data import DispatchError, DispatchReport
+from .due_queue import DueQueueEngine, HeapDueQueue
+from .time_budget import TimeBudget
+from .timing_wheel import TimingWheel
+
 # resources
 logger = logging.getLogger(__name__)
-sns_resource = boto3.resource("sns")
-lambda_client = boto3.client("lambda")
 
 
 class Dispatcher:
 
     # resources
     environment = Environment.dispatcher_env()
-    sns_topic = sns_resource.Topic(environment.dispatch_topic_arn)
+
+    # leases of this process, left to expire if it stops mid dispatch
+    lease_owner = str(uuid.uuid4())
+
+    @cached_classproperty
+    def sns_topic(cls):
+        return AwsClients.resource("sns").Topic(cls.environment.dispatch_topic_arn)
+
+    # constants
+    publish_batch_max_entries = 10
+    publish_batch_max_bytes = 256 * 1024
+    engine_lookahead = 60
+    tick_seconds = 60
+    release_page_seconds = 600
+    release_interval_seconds = 600
 
     @classmethod
     def dispatch_dynamodb_item(cls, dynamodb_item: DynamodbItem) -> None:
@@ -29,39 +53,365 @@ class Dispatcher:
             f"Dispatching for execution: {dynamodb_item}", extra=request_context
         )
 
-        # send to sns
-        sns_payload = DataMapper.dynamodb_item_to_sns_payload(dynamodb_item)
-        cls.sns_topic.publish(Message=sns_payload)
+        # claim before publish, concurrent pollers skip leased items
+        claimed_items, errors = cls._lease_dynamodb_items([dynamodb_item])
+        if errors:
+            raise OperationsError(
+                value=errors[0].schedule_id, message=str(errors[0].message)
+            )
 
-        # update table entry
-        DynamoScheduler.update_dynamodb_item_status(
-            dynamodb_item, ScheduleStatus.PROCESSING
-        )
+        # send to sns, through the client as items are dispatched from threads
+        sns_payload = DataMapper.dynamodb_item_to_sns_payload(claimed_items[0])
+        try:
+            cls.sns_topic.meta.client.publish(
+                TopicArn=cls.sns_topic.arn, Message=sns_payload
+            )
+        except Exception:
+            cls._release_dynamodb_items(claimed_items)
+            raise
+
+        errors = cls._result_errors(DynamoScheduler.complete_claims(claimed_items))
+        if errors:
+            raise OperationsError(
+                value=errors[0].schedule_id, message=str(errors[0].message)
+            )
         logger.info("Item dispatched successfully", extra=request_context)
 
     @classmethod
-    def trigger_lambda_workflow(cls, dynamodb_item: DynamodbItem) -> None:
+    def dispatch_dynamodb_item_batch(
+        cls, dynamodb_items: List[DynamodbItem]
+    ) -> List[DispatchError]:
+        logger.info(
+            f"Dispatching batch of {len(dynamodb_items)} items for execution",
+            extra=request_context,
+        )
+
+        # claim before publish, concurrent pollers skip leased items
+        claimed_items, errors = cls._lease_dynamodb_items(dynamodb_items)
+        entries = [
+            {"Id": str(index), "Message": DataMapper.dynamodb_item_to_sns_payload(item)}
+            for index, item in enumerate(claimed_items)
+        ]
+
+        # send to sns, unpublished items are released for the next poll
+        published_items: List[DynamodbItem] = []
+        try:
+            for entries_batch in cls._split_publish_entries(entries):
+
+                # a failed request fails its entries, later ones are still sent
+                try:
+                    response = cls.sns_topic.meta.client.publish_batch(
+                        TopicArn=cls.sns_topic.arn,
+                        PublishBatchRequestEntries=entries_batch,
+                    )
+                except Exception as e:
+                    response = cls._failed_response(entries_batch, e)
+
+                published_batch, publish_errors = cls._publish_results(
+                    claimed_items, response
+                )
+                published_items.extend(published_batch)
+                errors.extend(publish_errors)
+        finally:
+            cls._release_dynamodb_items(
+                cls._unpublished_items(claimed_items, published_items)
+            )
+
+        if published_items:
+            errors.extend(
+                cls._result_errors(DynamoScheduler.complete_claims(published_items))
+            )
+
+        logger.info(
+            f"Batch dispatched with {len(errors)} errors", extra=request_context
+        )
+        return errors
+
+    @classmethod
+    def _lease_dynamodb_items(
+        cls, dynamodb_items: List[DynamodbItem], hold_seconds: float = 0
+    ) -> Tuple[List[DynamodbItem], List[DispatchError]]:
+        if not dynamodb_items:
+            return [], []
+
+        # claimed items carry the lease, completion and release are checked on it
+        lease_expiry = int(
+            time.time() + hold_seconds + cls.environment.claim_lease_seconds
+        )
+        results = DynamoScheduler.claim_dynamodb_items(
+            dynamodb_items, cls.lease_owner, lease_expiry
+        )
+        claimed_items = [
+            replace(
+                dynamodb_items[result.index],
+                status=ScheduleStatus.PROCESSING,
+                lease_owner=cls.lease_owner,
+                lease_expiry=lease_expiry,
+            )
+            for result in results
+            if result.success
+        ]
+        return claimed_items, cls._result_errors(results)
+
+    @classmethod
+    def _release_dynamodb_items(cls, dynamodb_items: List[DynamodbItem]) -> None:
+        if not dynamodb_items:
+            return
+
+        # a failed release is recovered once the lease expires
+        for error in cls._result_errors(DynamoScheduler.release_claims(dynamodb_items)):
+            logger.warning(
+                f"Claim not released for {error.schedule_id}: {error.message}",
+                extra=request_context,
+            )
+
+    @classmethod
+    def _unpublished_items(
+        cls, claimed_items: List[DynamodbItem], published_items: List[DynamodbItem]
+    ) -> List[DynamodbItem]:
+        published_ids = {
+            dynamodb_item.schedule_item.schedule_id for dynamodb_item in published_items
+        }
+        return [
+            dynamodb_item
+            for dynamodb_item in claimed_items
+            if dynamodb_item.schedule_item.schedule_id not in published_ids
+        ]
+
+    @classmethod
+    def _result_errors(cls, results: List[BatchWriteResult]) -> List[DispatchError]:
+        return [
+            DispatchError(
+                schedule_id=str(result.schedule_item.schedule_id),
+                message=str(result.message),
+            )
+            for result in results
+            if not result.success
+        ]
+
+    @classmethod
+    def claims_lookback_seconds(cls) -> float:
+
+        # items are held before the lease runs, its expiry is seen a tick late
+        hold_seconds = {
+            "direct": cls.environment.direct_dispatch_horizon,
+            "engine": cls.engine_lookahead,
+        }.get(cls.environment.dispatch_mode, 0)
+        return cls.environment.claim_lease_seconds + hold_seconds + 2 * cls.tick_seconds
+
+    @classmethod
+    def release_expired_claims(cls, query_range: QueryRange) -> int:
+
+        # without the sparse index every processing item of the window is read,
+        # the sweep then runs on one tick per interval and looks back over it
+        current_time = int(time.time())
+        lookback_seconds = cls.claims_lookback_seconds()
+        if not DynamoScheduler.environment.leased_index_name:
+            if current_time % cls.release_interval_seconds >= cls.tick_seconds:
+                return 0
+            lookback_seconds += cls.release_interval_seconds
+
+        # ranges of earlier ticks are not read again, claims of a stopped
+        # tick are looked for until their lease has run out
+        start_time = int(min(query_range.start_time, current_time) - lookback_seconds)
+        logger.info(
+            f"Releasing expired claims from {start_time} to {query_range.end_time}",
+            extra=request_context,
+        )
+
+        # items of pollers that stopped between claim and publish
+        expired_items = [
+            dynamodb_item
+            for page_start in range(
+                start_time, query_range.end_time, cls.release_page_seconds
+            )
+            for dynamodb_item in DynamoScheduler.get_dynamodb_items(
+                QueryRange(
+                    start_time=page_start,
+                    end_time=min(
+                        page_start + cls.release_page_seconds, query_range.end_time
+                    ),
+                ),
+                ScheduleStatus.PROCESSING,
+            )
+            if dynamodb_item.lease_expiry is not None
+            and dynamodb_item.lease_expiry < current_time
+        ]
+        if not expired_items:
+            return 0
+
+        results = DynamoScheduler.release_claims(expired_items)
+        released = sum(result.success for result in results)
+        logger.info(f"Released {released} expired claims", extra=request_context)
+        return released
+
+    @classmethod
+    def _publish_results(
+        cls, dynamodb_items: List[DynamodbItem], response: dict
+    ) -> Tuple[List[DynamodbItem], List[DispatchError]]:
+
+        errors = []
+        for failed in response.get("Failed", []):
+            dynamodb_item = dynamodb_items[int(failed["Id"])]
+            errors.append(
+                DispatchError(
+                    schedule_id=str(dynamodb_item.schedule_item.schedule_id),
+                    message=f"{failed.get('Code')}: {failed.get('Message')}",
+                )
+            )
+
+        published_items = [
+            dynamodb_items[int(successful["Id"])]
+            for successful in response.get("Successful", [])
+        ]
+        return published_items, errors
+
+    @classmethod
+    def _failed_response(cls, entries: List[dict], exception: Exception) -> dict:
+        logger.error(
+            f"Error publishing batch of {len(entries)} entries: {exception}",
+            extra=request_context,
+        )
+        return {
+            "Failed": [
+                {
+                    "Id": entry["Id"],
+                    "Code": type(exception).__name__,
+                    "Message": str(exception),
+                }
+                for entry in entries
+            ]
+        }
+
+    @classmethod
+    def _split_publish_entries(cls, entries: List[dict]) -> List[List[dict]]:
+
+        # batch is limited both in number of messages and in total payload size
+        batches: List[List[dict]] = []
+        batch_size = 0
+        for entry in entries:
+            entry_size = len(entry["Message"].encode("utf-8"))
+            if batches and (
+                len(batches[-1]) < cls.publish_batch_max_entries
+                and batch_size + entry_size <= cls.publish_batch_max_bytes
+            ):
+                batches[-1].append(entry)
+                batch_size += entry_size
+                continue
+
+            batches.append([entry])
+            batch_size = entry_size
+        return batches
+
+    @classmethod
+    def dispatch_dynamodb_items(
+        cls,
+        dynamodb_items: Iterable[DynamodbItem],
+        time_budget: Optional[TimeBudget] = None,
+    ) -> DispatchReport:
+        if cls.environment.dispatch_mode == "direct":
+            return cls.start_due_workflows(dynamodb_items, time_budget)
+
+        logger.info(
+            f"Dispatching items with {cls.environment.dispatch_max_workers} workers",
+            extra=request_context,
+        )
+
+        batch_size = min(
+            cls.environment.publish_batch_size, cls.publish_batch_max_entries
+        )
+
+        # batches not predicted to finish in time are left for a continuation
+        batches: Iterable[List[DynamodbItem]] = chunked(dynamodb_items, batch_size)
+        if time_budget is not None:
+            batches = time_budget.limit(batches)
+
+        dispatched = 0
+        errors: List[DispatchError] = []
+        for dynamodb_items_batch, batch_errors, exception in bounded_map(
+            cls._dispatch_batch,
+            batches,
+            max_workers=cls.environment.dispatch_max_workers,
+        ):
+            if time_budget is not None:
+                time_budget.record(len(dynamodb_items_batch))
+            if exception is not None:
+                logger.error(
+                    f"Error dispatching items {dynamodb_items_batch}: {exception}",
+                    extra=request_context,
+                )
+                batch_errors = [
+                    DispatchError(
+                        schedule_id=str(dynamodb_item.schedule_item.schedule_id),
+                        message=str(exception),
+                    )
+                    for dynamodb_item in dynamodb_items_batch
+                ]
+
+            dispatched += len(dynamodb_items_batch) - len(batch_errors or [])
+            errors.extend(batch_errors or [])
+
+        dispatch_report = DispatchReport(dispatched=dispatched, errors=errors)
+        logger.info(f"Dispatch finished: {dispatch_report}", extra=request_context)
+        return dispatch_report
+
+    @classmethod
+    def _dispatch_batch(cls, dynamodb_items: List[DynamodbItem]) -> List[DispatchError]:
+        if len(dynamodb_items) > 1:
+            return cls.dispatch_dynamodb_item_batch(dynamodb_items)
+
+        cls.dispatch_dynamodb_item(dynamodb_items[0])
+        return []
+
+    @classmethod
+    def trigger_lambda_workflow(
+        cls, dynamodb_item: DynamodbItem, time_budget: Optional[TimeBudget] = None
+    ) -> None:
 
         logger.info(f"Starting lambda workflow: {dynamodb_item}", extra=request_context)
         schedule_item = dynamodb_item.schedule_item
 
+        # item due after the deadline is handed over without idling, a fresh
+        # invocation waits the remaining delay from its schedule time
+        wait_time = max(schedule_item.schedule_time - int(time.time()), 0)
+        if time_budget is not None and not time_budget.fits(1, wait_time):
+            cls.continue_dynamodb_item(dynamodb_item)
+            return
+
         # waint untill its time
-        wait_time = schedule_item.schedule_time - int(time.time())
         logger.info(f"Waiting: {wait_time}", extra=request_context)
         time.sleep(wait_time)
 
+        cls.start_lambda_workflow(dynamodb_item)
+
+    @classmethod
+    def continue_dynamodb_item(cls, dynamodb_item: DynamodbItem) -> None:
+        logger.info(
+            f"Publishing continuation of: {dynamodb_item}", extra=request_context
+        )
+
+        # message is queued by sns and retried until a dispatcher takes it
+        sns_payload = DataMapper.dynamodb_item_to_sns_payload(dynamodb_item)
+        cls.sns_topic.meta.client.publish(
+            TopicArn=cls.sns_topic.arn, Message=sns_payload
+        )
+
+    @classmethod
+    def start_lambda_workflow(cls, dynamodb_item: DynamodbItem) -> bool:
+        schedule_item = dynamodb_item.schedule_item
+
         # start lambda workflow
         logger.info(
             f"Starting lambda function workflow: {schedule_item.workflow_arn}",
             extra=request_context,
         )
         try:
-            response = lambda_client.invoke(
+            response = AwsClients.client("lambda").invoke(
                 FunctionName=schedule_item.workflow_arn,
                 InvocationType="Event",
-                Payload=json.dumps(schedule_item.workflow_payload),
+                Payload=json.dumps(PayloadStore.load(dynamodb_item)),
             )
-        except ClientError as e:
+        except (ClientError, OperationsError) as e:
             logger.error(
                 f"Error during invocation of lambda function: {e}",
                 extra=request_context,
@@ -69,9 +419,141 @@ class Dispatcher:
             DynamoScheduler.update_dynamodb_item_status(
                 dynamodb_item, ScheduleStatus.ERROR
             )
-            return
+            PayloadStore.delete(dynamodb_item.payload_ref)
+            return False
 
+        # finished items never load their offloaded payload again
         DynamoScheduler.update_dynamodb_item_status(
             dynamodb_item, ScheduleStatus.COMPLETED
         )
+        PayloadStore.delete(dynamodb_item.payload_ref)
         logger.info(f"Lambda function started successfully: {response}")
+        return True
+
+    @classmethod
+    def start_due_workflows(
+        cls,
+        dynamodb_items: Iterable[DynamodbItem],
+        time_budget: Optional[TimeBudget] = None,
+    ) -> DispatchReport:
+
+        # items past the horizon are left for the next poll, items within it
+        # but past the deadline are left for a continuation
+        horizon_seconds = cls.environment.direct_dispatch_horizon
+        hold_seconds = cls._bounded_seconds(horizon_seconds, time_budget)
+        current_time = time.time()
+        horizon = int((current_time + horizon_seconds) * 10**6)
+        hold_horizon = int((current_time + hold_seconds) * 10**6)
+
+        pending_items = []
+        deferred = 0
+        for dynamodb_item in dynamodb_items:
+            if dynamodb_item.trigger_time <= hold_horizon:
+                pending_items.append(dynamodb_item)
+            elif dynamodb_item.trigger_time <= horizon:
+                deferred += 1
+        if time_budget is not None and deferred:
+            time_budget.fits(deferred, horizon_seconds)
+
+        logger.info(
+            f"Starting {len(pending_items)} workflows directly", extra=request_context
+        )
+
+        # lease outlives the hold, a stopped process leaves it to expire
+        due_queue = cls._create_due_queue()
+        claimed_items, errors = cls._lease_dynamodb_items(pending_items, hold_seconds)
+        for dynamodb_item in claimed_items:
+            due_queue.push(dynamodb_item)
+
+        # one process waits for every held item instead of one lambda per item
+        dispatched = 0
+        while due_queue:
+            next_trigger_time = due_queue.next_trigger_time() or 0
+            wait_time = next_trigger_time / 10**6 - time.time()
+            if wait_time > 0:
+                time.sleep(wait_time)
+
+            due_items = due_queue.pop_due(int(time.time() * 10**6))
+            start_errors = cls._start_lambda_workflows(due_items)
+            dispatched += len(due_items) - len(start_errors)
+            errors.extend(start_errors)
+
+        dispatch_report = DispatchReport(dispatched=dispatched, errors=errors)
+        logger.info(f"Direct start finished: {dispatch_report}", extra=request_context)
+        return dispatch_report
+
+    @classmethod
+    def run_due_queue_engine(
+        cls, time_budget: Optional[TimeBudget] = None
+    ) -> DispatchReport:
+
+        # only items due before the deadline are held, the next tick loads the rest
+        run_seconds = cls._bounded_seconds(
+            cls.environment.engine_run_seconds, time_budget
+        )
+        logger.info(
+            f"Running due queue engine for {run_seconds}s", extra=request_context
+        )
+
+        engine = DueQueueEngine(
+            load_items=lambda query_range: DynamoScheduler.get_dynamodb_items(
+                query_range, ScheduleStatus.NOT_STARTED
+            ),
+            claim_items=cls._lease_engine_items,
+            fire_items=cls._start_lambda_workflows,
+            lookahead=cls.engine_lookahead,
+            reload_interval=cls.environment.engine_reload_interval,
+            due_queue=cls._create_due_queue(),
+        )
+        return engine.run(run_seconds)
+
+    @classmethod
+    def _bounded_seconds(
+        cls, seconds: float, time_budget: Optional[TimeBudget] = None
+    ) -> float:
+        if time_budget is None:
+            return seconds
+        return max(min(seconds, time_budget.remaining_seconds()), 0)
+
+    @classmethod
+    def _create_due_queue(cls) -> DueQueue:
+        if cls.environment.due_queue_backend == "wheel":
+            return TimingWheel(int(time.time() * 10**6))
+        return HeapDueQueue()
+
+    @classmethod
+    def _lease_engine_items(
+        cls, dynamodb_items: List[DynamodbItem]
+    ) -> List[DynamodbItem]:
+
+        # items of a window are held until their trigger time at the latest
+        claimed_items, errors = cls._lease_dynamodb_items(
+            dynamodb_items, cls.engine_lookahead
+        )
+        for error in errors:
+            logger.warning(
+                f"Claim failed for {error.schedule_id}: {error.message}",
+                extra=request_context,
+            )
+        return claimed_items
+
+    @classmethod
+    def _start_lambda_workflows(
+        cls, dynamodb_items: List[DynamodbItem]
+    ) -> List[DispatchError]:
+
+        errors: List[DispatchError] = []
+        for dynamodb_item, started, exception in bounded_map(
+            cls.start_lambda_workflow,
+            dynamodb_items,
+            max_workers=cls.environment.dispatch_max_workers,
+        ):
+            if started:
+                continue
+            errors.append(
+                DispatchError(
+                    schedule_id=str(dynamodb_item.schedule_item.schedule_id),
+                    message=str(exception or "Lambda invocation failed"),
+                )
+            )
+        return errors
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+import heapq
+import itertools
+import logging
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from lib.logging import request_context
+from lib.protocols import DueQueue
+from lib.scheduler import DynamodbItem, QueryRange
+
+from .data import DispatchError, DispatchLateness, DispatchReport
+
+# resources
+logger = logging.getLogger(__name__)
+
+
+ItemKey = Tuple[str, int]
+
+
+def item_key(dynamodb_item: DynamodbItem) -> ItemKey:
+    return dynamodb_item.time_period_hash, int(dynamodb_item.trigger_time)
+
+
+class HeapDueQueue:
+    """Min heap of dynamodb items ordered by trigger time in microseconds"""
+
+    def __init__(self) -> None:
+        self._heap: List[list] = []
+        self._entries: Dict[ItemKey, list] = {}
+        self._counter: Iterator[int] = itertools.count()
+
+    def push(self, dynamodb_item: DynamodbItem) -> None:
+        self.cancel(dynamodb_item)
+
+        # counter keeps insertion order for equal trigger times
+        entry = [int(dynamodb_item.trigger_time), next(self._counter), dynamodb_item]
+        self._entries[item_key(dynamodb_item)] = entry
+        heapq.heappush(self._heap, entry)
+
+    def cancel(self, dynamodb_item: DynamodbItem) -> bool:
+
+        # cancelled entries stay in the heap until they reach the top
+        entry = self._entries.pop(item_key(dynamodb_item), None)
+        if entry is None:
+            return False
+        entry[2] = None
+        return True
+
+    def next_trigger_time(self) -> Optional[int]:
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, current_time: int) -> List[DynamodbItem]:
+        due_items = []
+        while self._heap and self._heap[0][0] <= current_time:
+            dynamodb_item = heapq.heappop(self._heap)[2]
+            if dynamodb_item is None:
+                continue
+            del self._entries[item_key(dynamodb_item)]
+            due_items.append(dynamodb_item)
+        return due_items
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DueQueueEngine:
+    """Fires items of periodically loaded windows at their trigger time"""
+
+    def __init__(
+        self,
+        load_items: Callable[[QueryRange], Iterable[DynamodbItem]],
+        claim_items: Callable[[List[DynamodbItem]], List[DynamodbItem]],
+        fire_items: Callable[[List[DynamodbItem]], List[DispatchError]],
+        lookahead: int = 60,
+        reload_interval: float = 30,
+        due_queue: Optional[DueQueue] = None,
+    ) -> None:
+        self.load_items = load_items
+        self.claim_items = claim_items
+        self.fire_items = fire_items
+        self.lookahead = lookahead
+        self.reload_interval = reload_interval
+
+        self.due_queue = due_queue if due_queue is not None else HeapDueQueue()
+        self._seen: Dict[ItemKey, int] = {}
+        self._lateness: List[int] = []
+
+    def load(self, current_time: float, end_time: float) -> int:
+
+        # windows overlap, items already seen are skipped
+        window_start = int(current_time) - self.lookahead
+        window_end = int(min(current_time + self.lookahead, end_time))
+        if window_end < window_start:
+            return 0
+
+        new_items = []
+        for dynamodb_item in self.load_items(
+            QueryRange(start_time=window_start, end_time=window_end)
+        ):
+            key = item_key(dynamodb_item)
+            if key in self._seen:
+                continue
+            self._seen[key] = key[1]
+            new_items.append(dynamodb_item)
+
+        # older windows are never loaded again
+        self._seen = {
+            key: trigger_time
+            for key, trigger_time in self._seen.items()
+            if trigger_time >= window_start * 10**6
+        }
+
+        claimed_items = self.claim_items(new_items) if new_items else []
+        for dynamodb_item in claimed_items:
+            self.due_queue.push(dynamodb_item)
+
+        logger.info(
+            f"Loaded {len(claimed_items)} of {len(new_items)} new items",
+            extra=request_context,
+        )
+        return len(claimed_items)
+
+    def run(self, duration: float) -> DispatchReport:
+
+        # only items due before the end of the run are held
+        end_time = time.time() + duration
+        next_load_time: Optional[float] = time.time()
+
+        dispatched = 0
+        errors: List[DispatchError] = []
+        while True:
+            current_time = time.time()
+            if next_load_time is not None and current_time >= next_load_time:
+                self.load(current_time, end_time)
+                next_load_time = current_time + self.reload_interval
+                if next_load_time >= end_time:
+                    next_load_time = None
+
+            due_items = self.due_queue.pop_due(int(current_time * 10**6))
+            if due_items:
+                fired_at = int(time.time() * 10**6)
+                self._lateness.extend(
+                    fired_at - int(dynamodb_item.trigger_time)
+                    for dynamodb_item in due_items
+                )
+                fire_errors = self.fire_items(due_items)
+                dispatched += len(due_items) - len(fire_errors)
+                errors.extend(fire_errors)
+
+            # wake up for the next item or the next window load
+            wake_times = [] if next_load_time is None else [next_load_time]
+            next_trigger_time = self.due_queue.next_trigger_time()
+            if next_trigger_time is not None:
+                wake_times.append(next_trigger_time / 10**6)
+            if not wake_times:
+                break
+
+            wait_time = min(wake_times) - time.time()
+            if wait_time > 0:
+                time.sleep(wait_time)
+
+        dispatch_report = DispatchReport(
+            dispatched=dispatched, errors=errors, lateness=self.lateness()
+        )
+        logger.info(f"Engine run finished: {dispatch_report}", extra=request_context)
+        return dispatch_report
+
+    def lateness(self) -> DispatchLateness:
+        if not self._lateness:
+            return DispatchLateness()
+
+        samples = sorted(self._lateness)
+        return DispatchLateness(
+            count=len(samples),
+            mean_ms=sum(samples) / len(samples) / 1000,
+            p50_ms=samples[int(0.5 * (len(samples) - 1))] / 1000,
+            p99_ms=samples[int(0.99 * (len(samples) - 1))] / 1000,
+            max_ms=samples[-1] / 1000,
+        )
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+import logging
+import time
+from typing import Optional
+
+from botocore.exceptions import ClientError  # type: ignore
+from lib.aws import AwsClients, cached_classproperty
+from lib.environment import Environment
+from lib.exceptions import EnvironmentConfigError, OperationsError
+from lib.logging import request_context
+from lib.scheduler import QueryRange
+
+# resources
+logger = logging.getLogger(__name__)
+
+
+class RangeLeases:
+    """Leases of query sub ranges, one worker at a time dispatches a sub range
+
+    A lease is held until its expiry and renewed while the worker makes
+    progress. A worker that stops leaves the lease to expire, after which any
+    other worker takes the sub range over. Finished sub ranges are never
+    leased again.
+    """
+
+    # resources
+    environment = Environment.dispatcher_env()
+
+    # constants
+    lease_key = "lease_key"
+    owner_key = "lease_owner"
+    expiry_key = "lease_expiry"
+    status_key = "lease_status"
+    leased = "LEASED"
+    done = "DONE"
+    lease_ttl = 24 * 60 * 60
+
+    @cached_classproperty
+    def table(cls):
+        if not cls.environment.lease_table_name:
+            raise EnvironmentConfigError(message="Lease table name not configured")
+        return AwsClients.resource("dynamodb").Table(cls.environment.lease_table_name)
+
+    @classmethod
+    def range_key(cls, query_range: QueryRange) -> str:
+        return f"{query_range.start_time}:{query_range.end_time}"
+
+    @classmethod
+    def acquire(cls, range_key: str, lease_owner: str, lease_expiry: int) -> bool:
+        logger.info(
+            f"Acquiring lease of range {range_key} for {lease_owner}",
+            extra=request_context,
+        )
+
+        # new ranges, own ranges and ranges of stopped workers, never finished ones
+        return cls._conditional_update(
+            range_key,
+            "SET #owner = :owner, #expiry = :expiry, #status = :leased, #ttl = :ttl",
+            "attribute_not_exists(#key) OR (#status = :leased "
+            "AND (#owner = :owner OR #expiry < :now))",
+            {
+                ":owner": lease_owner,
+                ":expiry": lease_expiry,
+                ":leased": cls.leased,
+                ":ttl": lease_expiry + cls.lease_ttl,
+                ":now": int(time.time()),
+            },
+        )
+
+    @classmethod
+    def renew(cls, range_key: str, lease_owner: str, lease_expiry: int) -> bool:
+        logger.info(f"Renewing lease of range {range_key}", extra=request_context)
+
+        return cls._conditional_update(
+            range_key,
+            "SET #expiry = :expiry, #ttl = :ttl",
+            "#owner = :owner AND #status = :leased",
+            {
+                ":owner": lease_owner,
+                ":expiry": lease_expiry,
+                ":leased": cls.leased,
+                ":ttl": lease_expiry + cls.lease_ttl,
+            },
+        )
+
+    @classmethod
+    def complete(cls, range_key: str, lease_owner: str) -> bool:
+        logger.info(f"Completing lease of range {range_key}", extra=request_context)
+
+        return cls._conditional_update(
+            range_key,
+            "SET #status = :done",
+            "#owner = :owner AND #status = :leased",
+            {":owner": lease_owner, ":leased": cls.leased, ":done": cls.done},
+        )
+
+    @classmethod
+    def held_until(cls, range_key: str) -> Optional[int]:
+
+        # expiry of a range still leased, finished ranges are held by no one
+        response = cls.table.get_item(
+            Key={cls.lease_key: range_key}, ConsistentRead=True
+        )
+        lease = response.get("Item")
+        if lease is None or lease[cls.status_key] != cls.leased:
+            return None
+        return int(lease[cls.expiry_key])
+
+    @classmethod
+    def _conditional_update(
+        cls,
+        range_key: str,
+        update_expression: str,
+        condition_expression: str,
+        attribute_values: dict,
+    ) -> bool:
+        names = {
+            "#key": cls.lease_key,
+            "#owner": cls.owner_key,
+            "#expiry": cls.expiry_key,
+            "#status": cls.status_key,
+            "#ttl": "ttl",
+        }
+
+        # expressions reject names they do not use
+        expressions = update_expression + condition_expression
+        try:
+            cls.table.update_item(
+                Key={cls.lease_key: range_key},
+                UpdateExpression=update_expression,
+                ConditionExpression=condition_expression,
+                ExpressionAttributeNames={
+                    k: v for k, v in names.items() if k in expressions
+                },
+                ExpressionAttributeValues=attribute_values,
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise OperationsError(value=range_key, message=str(e))
+        return True
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+import logging
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from lib.logging import request_context
+from lib.scheduler import DynamodbItem, QueryRange, ScheduleStatus
+from lib.scheduler.payload_store import PayloadStore
+from lib.scheduler.scheduler import DynamoScheduler
+
+from .data import DispatchReport
+from .dispatcher import Dispatcher
+from .time_budget import TimeBudget
+
+# resources
+logger = logging.getLogger(__name__)
+
+
+class RetryWindow:
+    """Dispatches again the items the cursor moved past while they failed
+
+    The cursor never waits for failed items, they are released to NOT_STARTED
+    and read again while their trigger time is in the window behind the
+    cursor. An item failing on its last read is set to ERROR, so one bad item
+    neither stops the cursor nor waits for dispatch forever.
+    """
+
+    # constants
+    window_seconds = 600
+
+    @classmethod
+    def run(
+        cls,
+        cursor: int,
+        next_cursor: int,
+        time_budget: Optional[TimeBudget] = None,
+    ) -> DispatchReport:
+
+        # without the sparse index every item of the window is read, the window
+        # is then read on one tick of every interval and only once per item
+        current_time = int(time.time())
+        if not DynamoScheduler.environment.pending_index_name:
+            if current_time % cls.window_seconds >= Dispatcher.tick_seconds:
+                return DispatchReport()
+
+        query_range = QueryRange(
+            start_time=cursor - cls.window_seconds, end_time=cursor
+        )
+        return cls.retry(query_range, cls.expire_before(next_cursor), time_budget)
+
+    @classmethod
+    def expire_before(cls, next_cursor: int) -> int:
+
+        # items behind the window of the next read are not read again
+        if not DynamoScheduler.environment.pending_index_name:
+            return next_cursor
+        return next_cursor - cls.window_seconds
+
+    @classmethod
+    def retry(
+        cls,
+        query_range: QueryRange,
+        expire_before: int,
+        time_budget: Optional[TimeBudget] = None,
+    ) -> DispatchReport:
+        logger.info(
+            f"Retrying items of {query_range}, last read before {expire_before}",
+            extra=request_context,
+        )
+
+        last_items: Dict[str, DynamodbItem] = {}
+        dispatch_report = Dispatcher.dispatch_dynamodb_items(
+            cls._tracking_last_items(
+                DynamoScheduler.get_dynamodb_items(
+                    query_range, ScheduleStatus.NOT_STARTED
+                ),
+                expire_before,
+                last_items,
+            ),
+            time_budget,
+        )
+
+        expired_items = [
+            last_items[error.schedule_id]
+            for error in dispatch_report.errors
+            if error.schedule_id in last_items
+        ]
+        if expired_items:
+            cls._expire(expired_items)
+        return dispatch_report
+
+    @classmethod
+    def _tracking_last_items(
+        cls,
+        dynamodb_items: Iterable[DynamodbItem],
+        expire_before: int,
+        last_items: Dict[str, DynamodbItem],
+    ) -> Iterator[DynamodbItem]:
+        for dynamodb_item in dynamodb_items:
+            if dynamodb_item.trigger_time < expire_before * 10**6:
+                schedule_id = str(dynamodb_item.schedule_item.schedule_id)
+                last_items[schedule_id] = dynamodb_item
+            yield dynamodb_item
+
+    @classmethod
+    def _expire(cls, dynamodb_items: List[DynamodbItem]) -> None:
+
+        # items claimed elsewhere in the meantime keep their status
+        results = DynamoScheduler.update_dynamodb_items_status(
+            dynamodb_items,
+            ScheduleStatus.ERROR,
+            expected_status=ScheduleStatus.NOT_STARTED,
+        )
+        for result in results:
+            if not result.success:
+                continue
+            logger.error(
+                f"Dispatch retries exhausted for {result.schedule_item.schedule_id}",
+                extra=request_context,
+            )
+            PayloadStore.delete(dynamodb_items[result.index].payload_ref)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+import logging
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, TypeVar
+
+from lib.logging import request_context
+
+# resources
+logger = logging.getLogger(__name__)
+
+ItemType = TypeVar("ItemType")
+
+
+class TimeBudget:
+    """Predicts from the observed dispatch latency whether more work fits
+
+    Latency is measured as wall time per completed item, so concurrent
+    batches and the reads feeding them are accounted for. Work is only
+    started when its predicted time plus the margin fits the time left.
+    """
+
+    def __init__(
+        self,
+        remaining_seconds: Callable[[], float],
+        margin_seconds: float,
+        smoothing: float = 0.3,
+    ) -> None:
+        self._remaining_seconds = remaining_seconds
+        self._margin_seconds = margin_seconds
+        self._smoothing = smoothing
+        self._last_time = time.monotonic()
+        self.seconds_per_item: Optional[float] = None
+        self.exhausted = False
+
+    @classmethod
+    def from_context(cls, context, margin_seconds: float) -> "TimeBudget":
+
+        # local runs and tests have no deadline
+        if context is None:
+            return cls(lambda: float("inf"), margin_seconds)
+        return cls(
+            lambda: context.get_remaining_time_in_millis() / 1000, margin_seconds
+        )
+
+    def remaining_seconds(self) -> float:
+        return self._remaining_seconds() - self._margin_seconds
+
+    def fits(self, items: int = 0, seconds: float = 0) -> bool:
+        predicted = seconds + items * (self.seconds_per_item or 0)
+        remaining_seconds = self.remaining_seconds()
+        if remaining_seconds >= predicted:
+            return True
+
+        logger.info(
+            f"Time budget exhausted, {predicted:.2f}s predicted "
+            f"for {remaining_seconds:.2f}s left",
+            extra=request_context,
+        )
+        self.exhausted = True
+        return False
+
+    def record(self, items: int) -> None:
+        current_time = time.monotonic()
+        elapsed, self._last_time = current_time - self._last_time, current_time
+        if items <= 0:
+            return
+
+        # moving average follows throttling without jumping on one slow batch
+        latency = elapsed / items
+        self.seconds_per_item = (
+            latency
+            if self.seconds_per_item is None
+            else self._smoothing * latency
+            + (1 - self._smoothing) * self.seconds_per_item
+        )
+
+    def limit(self, batches: Iterable[List[ItemType]]) -> Iterator[List[ItemType]]:
+        for batch in batches:
+            if not self.fits(len(batch)):
+                return
+            yield batch
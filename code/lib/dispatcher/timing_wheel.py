@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+import time
+from typing import Dict, List, Optional, Tuple
+
+from lib.scheduler import DynamodbItem
+
+from .due_queue import ItemKey, item_key
+
+Slot = Dict[ItemKey, DynamodbItem]
+
+
+class TimingWheel:
+    """Hierarchical timing wheel with second, minute and hour wheels
+
+    Second wheel holds items of the current minute, minute wheel items of the
+    current hour and hour wheel items of the current day, later items wait in
+    per day overflow slots. Slots cascade down as the wheel advances. Next
+    trigger time beyond the current minute is the start of the earliest
+    occupied slot, waking up there cascades the slot and gives the exact time.
+    """
+
+    # constants
+    minute = 60
+    hour = 60 * 60
+    day = 24 * 60 * 60
+    ready_level = -1
+    overflow_level = 3
+
+    def __init__(self, start_time: Optional[int] = None) -> None:
+
+        # wheel turns with the clock, items are only ever placed relative to it
+        if start_time is None:
+            start_time = int(time.time() * 10**6)
+        self._current = start_time // 10**6
+        self._wheels: List[List[Slot]] = [
+            [{} for _ in range(60)],
+            [{} for _ in range(60)],
+            [{} for _ in range(24)],
+        ]
+        self._counts = [0, 0, 0]
+        self._overflow: Dict[int, Slot] = {}
+        self._ready: Slot = {}
+        self._locations: Dict[ItemKey, Tuple[int, Slot]] = {}
+
+    def push(self, dynamodb_item: DynamodbItem) -> None:
+        self.cancel(dynamodb_item)
+        self._place(item_key(dynamodb_item), dynamodb_item)
+
+    def cancel(self, dynamodb_item: DynamodbItem) -> bool:
+        location = self._locations.pop(item_key(dynamodb_item), None)
+        if location is None:
+            return False
+
+        level, slot = location
+        del slot[item_key(dynamodb_item)]
+        self._discount(level, slot)
+        return True
+
+    def next_trigger_time(self) -> Optional[int]:
+
+        # exact within the current minute, start of the earliest slot beyond it
+        current = self._current
+        trigger_times = [int(i.trigger_time) for i in self._ready.values()]
+        if self._counts[0]:
+            slot = next(s for s in self._wheels[0][current % 60 :] if s)
+            trigger_times.extend(int(i.trigger_time) for i in slot.values())
+        elif self._counts[1]:
+            index = next(
+                index
+                for index in range(current // self.minute % 60, 60)
+                if self._wheels[1][index]
+            )
+            trigger_times.append(
+                (current // self.hour * self.hour + index * self.minute) * 10**6
+            )
+        elif self._counts[2]:
+            index = next(
+                index
+                for index in range(current // self.hour % 24, 24)
+                if self._wheels[2][index]
+            )
+            trigger_times.append(
+                (current // self.day * self.day + index * self.hour) * 10**6
+            )
+        elif self._overflow:
+            trigger_times.append(min(self._overflow) * self.day * 10**6)
+
+        return min(trigger_times) if trigger_times else None
+
+    def pop_due(self, current_time: int) -> List[DynamodbItem]:
+        self._advance(current_time // 10**6)
+
+        # items of passed seconds, checked as the wheel may be ahead of the time
+        due_items = []
+        for key, dynamodb_item in list(self._ready.items()):
+            if int(dynamodb_item.trigger_time) > current_time:
+                continue
+            del self._locations[key]
+            del self._ready[key]
+            due_items.append(dynamodb_item)
+
+        slot = self._wheels[0][self._current % 60]
+        for key, dynamodb_item in list(slot.items()):
+            if int(dynamodb_item.trigger_time) > current_time:
+                continue
+            del self._locations[key]
+            del slot[key]
+            self._counts[0] -= 1
+            due_items.append(dynamodb_item)
+
+        due_items.sort(key=lambda dynamodb_item: int(dynamodb_item.trigger_time))
+        return due_items
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def _place(self, key: ItemKey, dynamodb_item: DynamodbItem) -> None:
+        current = self._current
+        second = int(dynamodb_item.trigger_time) // 10**6
+
+        if second < current:
+            level, slot = self.ready_level, self._ready
+        elif second // self.minute == current // self.minute:
+            level, slot = 0, self._wheels[0][second % 60]
+        elif second // self.hour == current // self.hour:
+            level, slot = 1, self._wheels[1][second // self.minute % 60]
+        elif second // self.day == current // self.day:
+            level, slot = 2, self._wheels[2][second // self.hour % 24]
+        else:
+            level = self.overflow_level
+            slot = self._overflow.setdefault(second // self.day, {})
+
+        slot[key] = dynamodb_item
+        self._locations[key] = (level, slot)
+        if 0 <= level < self.overflow_level:
+            self._counts[level] += 1
+
+    def _discount(self, level: int, slot: Slot) -> None:
+        if 0 <= level < self.overflow_level:
+            self._counts[level] -= 1
+        elif level == self.overflow_level and not slot:
+            for day, overflow_slot in list(self._overflow.items()):
+                if overflow_slot is slot:
+                    del self._overflow[day]
+
+    def _replace(self, slot: Slot, level: int) -> None:
+        items = list(slot.items())
+        slot.clear()
+        if 0 <= level < self.overflow_level:
+            self._counts[level] -= len(items)
+        for key, dynamodb_item in items:
+            self._place(key, dynamodb_item)
+
+    def _advance(self, second: int) -> None:
+        while self._current < second:
+            current = self._current
+
+            # empty levels are skipped up to the next boundary that matters
+            if self._counts[0]:
+                next_second = current + 1
+                if not self._wheels[0][current % 60]:
+                    next_second = current - current % 60
+                    next_second += next(
+                        index
+                        for index in range(current % 60, 60)
+                        if self._wheels[0][index]
+                    )
+            elif self._counts[1]:
+                next_second = (current // self.minute + 1) * self.minute
+            elif self._counts[2]:
+                next_second = (current // self.hour + 1) * self.hour
+            elif self._overflow:
+                next_second = (current // self.day + 1) * self.day
+            else:
+                next_second = second
+            next_second = min(next_second, second)
+            self._current = next_second
+
+            # items of the passed second are due
+            slot = self._wheels[0][current % 60]
+            if slot:
+                self._counts[0] -= len(slot)
+                for key in slot:
+                    self._locations[key] = (self.ready_level, self._ready)
+                self._ready.update(slot)
+                slot.clear()
+
+            # cascade from the coarsest level that crossed a boundary
+            if next_second // self.day != current // self.day:
+                self._replace(
+                    self._overflow.pop(next_second // self.day, {}),
+                    self.overflow_level,
+                )
+            if next_second // self.hour != current // self.hour:
+                self._replace(self._wheels[2][next_second // self.hour % 24], 2)
+            if next_second // self.minute != current // self.minute:
+                self._replace(self._wheels[1][next_second // self.minute % 60], 1)
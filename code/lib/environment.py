@@ -1,7 +1,9 @@
 #!/usr/bin/env python
+import json
 import logging
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
 
 from .exceptions import EnvironmentConfigError
 from .logging import request_context
@@ -14,11 +16,53 @@ class DynamodbSchedulerEnvironment:
     hash_table_name: str
     items_table_name: str
     schedule_id_index_name: str
+    period_cache_size: int = 64
+    period_cache_ttl: Optional[float] = None
+    pending_index_name: Optional[str] = None
+    leased_index_name: Optional[str] = None
+    period_shard_count: int = 1
+    period_granularity: str = "quarter"
+    period_migration_granularities: Tuple[str, ...] = ()
+    dynamodb_engine: str = "resource"
+    payload_codec: str = "json"
+    payload_bucket_name: Optional[str] = None
+    payload_offload_threshold: int = 64 * 1024
 
 
 @dataclass
 class DispatcherEnvironment:
     dispatch_topic_arn: str
+    dispatch_max_workers: int = 1
+    publish_batch_size: int = 10
+    dispatch_mode: str = "sns"
+    direct_dispatch_horizon: float = 50
+    engine_run_seconds: float = 50
+    engine_reload_interval: float = 10
+    due_queue_backend: str = "heap"
+    io_mode: str = "sync"
+    async_max_in_flight: int = 100
+    claim_lease_seconds: float = 30
+    lease_table_name: Optional[str] = None
+    coordinator_workers: int = 2
+    range_partitions: int = 4
+    range_lease_seconds: float = 30
+    worker_function_name: Optional[str] = None
+    dispatch_cursor: bool = False
+    cursor_lookahead_seconds: int = 60
+    catch_up: bool = False
+    catch_up_rate: float = 0
+    deadline_margin_seconds: float = 10
+
+
+@dataclass
+class AwsClientEnvironment:
+    max_pool_connections: int = 50
+    retry_mode: str = "adaptive"
+    max_attempts: int = 5
+    connect_timeout: float = 5
+    read_timeout: float = 30
+    tcp_keepalive: bool = True
+    client_overrides: Dict[str, Dict[str, Any]] = field(default_factory=dict)
 
 
 class Environment:
@@ -27,6 +71,44 @@ class Environment:
     items_table_env_name = "SCHEDULE_ITEMS_TABLE_NAME"
     schedule_id_index_env_name = "SCHEDULE_ID_INDEX_NAME"
     dispatch_sns_env_name = "DISPATCHER_SNS_ARN"
+    period_cache_size_env_name = "PERIOD_CACHE_SIZE"
+    period_cache_ttl_env_name = "PERIOD_CACHE_TTL"
+    pending_index_env_name = "PENDING_INDEX_NAME"
+    leased_index_env_name = "LEASED_INDEX_NAME"
+    period_shard_count_env_name = "PERIOD_SHARD_COUNT"
+    period_granularity_env_name = "PERIOD_GRANULARITY"
+    period_migration_granularities_env_name = "PERIOD_MIGRATION_GRANULARITIES"
+    dynamodb_engine_env_name = "DYNAMODB_ENGINE"
+    payload_codec_env_name = "PAYLOAD_CODEC"
+    payload_bucket_env_name = "PAYLOAD_BUCKET_NAME"
+    payload_offload_threshold_env_name = "PAYLOAD_OFFLOAD_THRESHOLD"
+    dispatch_max_workers_env_name = "DISPATCH_MAX_WORKERS"
+    publish_batch_size_env_name = "DISPATCH_PUBLISH_BATCH_SIZE"
+    dispatch_mode_env_name = "DISPATCH_MODE"
+    direct_dispatch_horizon_env_name = "DIRECT_DISPATCH_HORIZON"
+    engine_run_seconds_env_name = "ENGINE_RUN_SECONDS"
+    engine_reload_interval_env_name = "ENGINE_RELOAD_INTERVAL"
+    due_queue_backend_env_name = "DUE_QUEUE_BACKEND"
+    io_mode_env_name = "IO_MODE"
+    async_max_in_flight_env_name = "ASYNC_MAX_IN_FLIGHT"
+    claim_lease_seconds_env_name = "CLAIM_LEASE_SECONDS"
+    lease_table_env_name = "LEASE_TABLE_NAME"
+    coordinator_workers_env_name = "COORDINATOR_WORKERS"
+    range_partitions_env_name = "RANGE_PARTITIONS"
+    range_lease_seconds_env_name = "RANGE_LEASE_SECONDS"
+    worker_function_env_name = "WORKER_FUNCTION_NAME"
+    dispatch_cursor_env_name = "DISPATCH_CURSOR"
+    cursor_lookahead_seconds_env_name = "CURSOR_LOOKAHEAD_SECONDS"
+    catch_up_env_name = "CATCH_UP"
+    catch_up_rate_env_name = "CATCH_UP_RATE"
+    deadline_margin_seconds_env_name = "DEADLINE_MARGIN_SECONDS"
+    max_pool_connections_env_name = "AWS_MAX_POOL_CONNECTIONS"
+    retry_mode_env_name = "AWS_RETRY_MODE"
+    max_attempts_env_name = "AWS_MAX_ATTEMPTS"
+    connect_timeout_env_name = "AWS_CONNECT_TIMEOUT"
+    read_timeout_env_name = "AWS_READ_TIMEOUT"
+    tcp_keepalive_env_name = "AWS_TCP_KEEPALIVE"
+    client_overrides_env_name = "AWS_CLIENT_OVERRIDES"
 
     @classmethod
     def dynamodb_scheduler_env(cls) -> DynamodbSchedulerEnvironment:
@@ -36,20 +118,127 @@ class Environment:
                 hash_table_name=os.environ[cls.hash_table_env_name],
                 items_table_name=os.environ[cls.items_table_env_name],
                 schedule_id_index_name=os.environ[cls.schedule_id_index_env_name],
+                period_cache_size=int(
+                    os.environ.get(cls.period_cache_size_env_name, 64)
+                ),
+                period_cache_ttl=cls._optional_float(cls.period_cache_ttl_env_name),
+                pending_index_name=os.environ.get(cls.pending_index_env_name) or None,
+                leased_index_name=os.environ.get(cls.leased_index_env_name) or None,
+                period_shard_count=int(
+                    os.environ.get(cls.period_shard_count_env_name, 1)
+                ),
+                period_granularity=os.environ.get(
+                    cls.period_granularity_env_name, "quarter"
+                ),
+                period_migration_granularities=tuple(
+                    granularity.strip()
+                    for granularity in os.environ.get(
+                        cls.period_migration_granularities_env_name, ""
+                    ).split(",")
+                    if granularity.strip()
+                ),
+                dynamodb_engine=os.environ.get(
+                    cls.dynamodb_engine_env_name, "resource"
+                ),
+                payload_codec=os.environ.get(cls.payload_codec_env_name, "json"),
+                payload_bucket_name=os.environ.get(cls.payload_bucket_env_name) or None,
+                payload_offload_threshold=int(
+                    os.environ.get(cls.payload_offload_threshold_env_name, 64 * 1024)
+                ),
             )
             logger.info(f"Environment retrieved: {env}", extra=request_context)
             return env
-        except KeyError as e:
+        except (KeyError, ValueError) as e:
             raise EnvironmentConfigError(message=str(e))
 
     @classmethod
-    def dispatcher_env(cls):
+    def dispatcher_env(cls) -> DispatcherEnvironment:
         logger.info("Retrieving environment for the dispatcher", extra=request_context)
         try:
             env = DispatcherEnvironment(
                 dispatch_topic_arn=os.environ[cls.dispatch_sns_env_name],
+                dispatch_max_workers=int(
+                    os.environ.get(cls.dispatch_max_workers_env_name, 1)
+                ),
+                publish_batch_size=int(
+                    os.environ.get(cls.publish_batch_size_env_name, 10)
+                ),
+                dispatch_mode=os.environ.get(cls.dispatch_mode_env_name, "sns"),
+                direct_dispatch_horizon=float(
+                    os.environ.get(cls.direct_dispatch_horizon_env_name, 50)
+                ),
+                engine_run_seconds=float(
+                    os.environ.get(cls.engine_run_seconds_env_name, 50)
+                ),
+                engine_reload_interval=float(
+                    os.environ.get(cls.engine_reload_interval_env_name, 10)
+                ),
+                due_queue_backend=os.environ.get(
+                    cls.due_queue_backend_env_name, "heap"
+                ),
+                io_mode=os.environ.get(cls.io_mode_env_name, "sync"),
+                async_max_in_flight=int(
+                    os.environ.get(cls.async_max_in_flight_env_name, 100)
+                ),
+                claim_lease_seconds=float(
+                    os.environ.get(cls.claim_lease_seconds_env_name, 30)
+                ),
+                lease_table_name=os.environ.get(cls.lease_table_env_name) or None,
+                coordinator_workers=int(
+                    os.environ.get(cls.coordinator_workers_env_name, 2)
+                ),
+                range_partitions=int(os.environ.get(cls.range_partitions_env_name, 4)),
+                range_lease_seconds=float(
+                    os.environ.get(cls.range_lease_seconds_env_name, 30)
+                ),
+                worker_function_name=os.environ.get(cls.worker_function_env_name)
+                or None,
+                dispatch_cursor=cls._flag(cls.dispatch_cursor_env_name, False),
+                cursor_lookahead_seconds=int(
+                    os.environ.get(cls.cursor_lookahead_seconds_env_name, 60)
+                ),
+                catch_up=cls._flag(cls.catch_up_env_name, False),
+                catch_up_rate=float(os.environ.get(cls.catch_up_rate_env_name, 0)),
+                deadline_margin_seconds=float(
+                    os.environ.get(cls.deadline_margin_seconds_env_name, 10)
+                ),
+            )
+            logger.info(f"Environment retrieved: {env}", extra=request_context)
+            return env
+        except (KeyError, ValueError) as e:
+            raise EnvironmentConfigError(message=str(e))
+
+    @classmethod
+    def aws_client_env(cls) -> AwsClientEnvironment:
+        logger.info("Retrieving environment for aws clients", extra=request_context)
+        try:
+            env = AwsClientEnvironment(
+                max_pool_connections=int(
+                    os.environ.get(cls.max_pool_connections_env_name, 50)
+                ),
+                retry_mode=os.environ.get(cls.retry_mode_env_name, "adaptive"),
+                max_attempts=int(os.environ.get(cls.max_attempts_env_name, 5)),
+                connect_timeout=float(os.environ.get(cls.connect_timeout_env_name, 5)),
+                read_timeout=float(os.environ.get(cls.read_timeout_env_name, 30)),
+                tcp_keepalive=cls._flag(cls.tcp_keepalive_env_name, True),
+                # per service botocore config values, e.g. {"sns": {"read_timeout": 5}}
+                client_overrides=json.loads(
+                    os.environ.get(cls.client_overrides_env_name) or "{}"
+                ),
             )
             logger.info(f"Environment retrieved: {env}", extra=request_context)
             return env
-        except KeyError as e:
+        except (KeyError, ValueError) as e:
             raise EnvironmentConfigError(message=str(e))
+
+    @classmethod
+    def _flag(cls, env_name: str, default: bool) -> bool:
+        value = os.environ.get(env_name)
+        if not value:
+            return default
+        return value.strip().lower() in ("1", "true", "yes")
+
+    @classmethod
+    def _optional_float(cls, env_name: str) -> Optional[float]:
+        value = os.environ.get(env_name)
+        return float(value) if value else None
@@ -1,8 +1,32 @@
 #!/usr/bin/env python
-from typing import Generator, Protocol
+from typing import AsyncGenerator, Generator, List, Optional, Protocol
 
 from .requests_handler.data import ScheduleRequest
-from .scheduler import DynamodbItem, QueryRange, ScheduleItem, ScheduleStatus
+from .scheduler import (
+    BatchWriteResult,
+    DynamodbItem,
+    QueryRange,
+    ScheduleItem,
+    ScheduleStatus,
+)
+
+
+class DueQueue(Protocol):
+    def push(self, dynamodb_item: DynamodbItem) -> None:
+        ...
+
+    def cancel(self, dynamodb_item: DynamodbItem) -> bool:
+        ...
+
+    def next_trigger_time(self) -> Optional[int]:
+        # may be earlier than the first item, never later
+        ...
+
+    def pop_due(self, current_time: int) -> List[DynamodbItem]:
+        ...
+
+    def __len__(self) -> int:
+        ...
 
 
 class Scheduler(Protocol):
@@ -18,6 +42,12 @@ class Scheduler(Protocol):
     def add_to_schedule(self, schedule_item: ScheduleRequest) -> ScheduleItem:
         ...
 
+    @classmethod
+    def add_many(
+        self, schedule_requests: List[ScheduleRequest]
+    ) -> List[BatchWriteResult]:
+        ...
+
     @classmethod
     def remove_from_schedule(self, schedule_id: str) -> None:
         ...
@@ -34,6 +64,38 @@ class Scheduler(Protocol):
     ) -> None:
         ...
 
+    @classmethod
+    def update_dynamodb_items_status(
+        cls,
+        dynamodb_items: List[DynamodbItem],
+        status: ScheduleStatus,
+        expected_status: Optional[ScheduleStatus] = None,
+        max_workers: int = 1,
+    ) -> List[BatchWriteResult]:
+        ...
+
+    @classmethod
+    def claim_dynamodb_items(
+        cls,
+        dynamodb_items: List[DynamodbItem],
+        lease_owner: str,
+        lease_expiry: int,
+        max_workers: int = 1,
+    ) -> List[BatchWriteResult]:
+        ...
+
+    @classmethod
+    def complete_claims(
+        cls, dynamodb_items: List[DynamodbItem], max_workers: int = 1
+    ) -> List[BatchWriteResult]:
+        ...
+
+    @classmethod
+    def release_claims(
+        cls, dynamodb_items: List[DynamodbItem], max_workers: int = 1
+    ) -> List[BatchWriteResult]:
+        ...
+
     @classmethod
     def get_schedule_items(
         self, query_range: QueryRange, status: ScheduleStatus
@@ -42,6 +104,90 @@ class Scheduler(Protocol):
 
     @classmethod
     def get_dynamodb_items(
-        self, query_range: QueryRange, status: ScheduleStatus
+        self,
+        query_range: QueryRange,
+        status: ScheduleStatus,
     ) -> Generator[DynamodbItem, None, None]:
         ...
+
+
+class AsyncScheduler(Protocol):
+    @classmethod
+    async def get_schedule_item(cls, schedule_id: str) -> ScheduleItem:
+        ...
+
+    @classmethod
+    async def get_dynamodb_item(cls, schedule_id: str) -> DynamodbItem:
+        ...
+
+    @classmethod
+    async def add_to_schedule(cls, schedule_request: ScheduleRequest) -> ScheduleItem:
+        ...
+
+    @classmethod
+    async def add_many(
+        cls, schedule_requests: List[ScheduleRequest], max_in_flight: int = 10
+    ) -> List[BatchWriteResult]:
+        ...
+
+    @classmethod
+    async def remove_from_schedule(cls, schedule_id: str) -> None:
+        ...
+
+    @classmethod
+    async def update_schedule_item(
+        cls, schedule_id: str, schedule_request: ScheduleRequest
+    ) -> ScheduleItem:
+        ...
+
+    @classmethod
+    async def update_dynamodb_item_status(
+        cls, dynamodb_item: DynamodbItem, status: ScheduleStatus
+    ) -> None:
+        ...
+
+    @classmethod
+    async def update_dynamodb_items_status(
+        cls,
+        dynamodb_items: List[DynamodbItem],
+        status: ScheduleStatus,
+        expected_status: Optional[ScheduleStatus] = None,
+        max_in_flight: int = 10,
+    ) -> List[BatchWriteResult]:
+        ...
+
+    @classmethod
+    async def claim_dynamodb_items(
+        cls,
+        dynamodb_items: List[DynamodbItem],
+        lease_owner: str,
+        lease_expiry: int,
+        max_in_flight: int = 10,
+    ) -> List[BatchWriteResult]:
+        ...
+
+    @classmethod
+    async def complete_claims(
+        cls, dynamodb_items: List[DynamodbItem], max_in_flight: int = 10
+    ) -> List[BatchWriteResult]:
+        ...
+
+    @classmethod
+    async def release_claims(
+        cls, dynamodb_items: List[DynamodbItem], max_in_flight: int = 10
+    ) -> List[BatchWriteResult]:
+        ...
+
+    @classmethod
+    def get_schedule_items(
+        cls, query_range: QueryRange, status: ScheduleStatus
+    ) -> AsyncGenerator[ScheduleItem, None]:
+        ...
+
+    @classmethod
+    def get_dynamodb_items(
+        cls,
+        query_range: QueryRange,
+        status: ScheduleStatus,
+    ) -> AsyncGenerator[DynamodbItem, None]:
+        ...
@@ -35,10 +35,10 @@ class ScheduleRequest:
     def validate_workflow_payload(cls, value):
         if value is not None:
             try:
-                json.loads(value)
-            except json.decoder.JSONDecodeError:
+                json.dumps(value)
+            except (TypeError, ValueError):
                 raise ValidationError(
-                    value=value, message=f"Unable to decode workflow payload: {value}"
+                    value=value, message=f"Unable to encode workflow payload: {value}"
                 )
         return value
 
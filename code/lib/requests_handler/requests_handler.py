@@ -2,7 +2,7 @@
 import functools
 import logging
 from dataclasses import asdict
-from typing import Callable, Optional
+from typing import Callable, List, Optional
 
 import simplejson as json  # type: ignore
 from lib.exceptions import (
@@ -48,6 +48,11 @@ def handle_exceptions(function: Callable[..., Response]):
 
 
 class RequestsHandler:
+
+    # constants
+    schedule_items_key = "schedule_items"
+    max_batch_size = 10000
+
     @classmethod
     @handle_exceptions
     def add_schedule_item(cls, request_payload: dict, scheduler: Scheduler) -> Response:
@@ -63,6 +68,57 @@ class RequestsHandler:
         # create response
         return create_response(asdict(schedule_item))
 
+    @classmethod
+    @handle_exceptions
+    def add_schedule_items(
+        cls, request_payload: dict, scheduler: Scheduler
+    ) -> Response:
+
+        logger.info("Adding schedule items in batch", extra=request_context)
+
+        # validation
+        schedule_payloads = request_payload.get(cls.schedule_items_key)
+        if not isinstance(schedule_payloads, list) or not schedule_payloads:
+            raise ValidationError(
+                value=str(request_payload), message="Request not valid"
+            )
+        if len(schedule_payloads) > cls.max_batch_size:
+            raise ValidationError(
+                value=str(len(schedule_payloads)),
+                message=f"Batch larger than {cls.max_batch_size} items",
+            )
+
+        # initialize schedule requests, invalid ones are reported per item
+        schedule_requests: List[ScheduleRequest] = []
+        request_indexes: List[int] = []
+        results: List[Optional[dict]] = [None] * len(schedule_payloads)
+        for index, schedule_payload in enumerate(schedule_payloads):
+            try:
+                schedule_requests.append(ScheduleRequest(**schedule_payload))
+                request_indexes.append(index)
+            except ValidationError as e:
+                results[index] = cls._failed_result(index, e.message)
+            except (TypeError, ValueError) as e:
+                results[index] = cls._failed_result(index, str(e))
+
+        # create schedule items
+        if schedule_requests:
+            for result in scheduler.add_many(schedule_requests):
+                index = request_indexes[result.index]
+                results[index] = {**asdict(result), "index": index}
+
+        # create response
+        return create_response({"results": results})
+
+    @classmethod
+    def _failed_result(cls, index: int, message: str) -> dict:
+        return {
+            "index": index,
+            "success": False,
+            "schedule_item": None,
+            "message": message,
+        }
+
     @classmethod
     @handle_exceptions
     def get_schedule_item(cls, request_payload: dict, scheduler: Scheduler) -> Response:
@@ -1 +1,7 @@
-from .data import DynamodbItem, QueryRange, ScheduleItem, ScheduleStatus  # noqa
+from .data import (  # noqa
+    BatchWriteResult,
+    DynamodbItem,
+    QueryRange,
+    ScheduleItem,
+    ScheduleStatus,
+)
@@ -0,0 +1,480 @@
+#!/usr/bin/env python
+import asyncio
+import logging
+import time
+from dataclasses import asdict
+from typing import AsyncGenerator, Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError  # type: ignore
+from lib.aws import AsyncAwsClients
+from lib.concurrency import async_merge
+from lib.environment import Environment
+from lib.exceptions import NotFound, OperationsError
+from lib.logging import request_context
+from lib.requests_handler.data import ScheduleRequest
+from lib.scheduler.data_mapper import DataMapper
+
+from .data import (
+    BatchWriteResult,
+    DynamodbItem,
+    DynamodbQueryRange,
+    QueryRange,
+    ScheduleItem,
+    ScheduleStatus,
+)
+from .payload_store import PayloadStore
+from .schedule_reader import DynamoScheduleReader
+from .schedule_writer import DynamoScheduleWriter
+
+# resources
+logger = logging.getLogger(__name__)
+
+
+class AsyncDynamoScheduler:
+    """Scheduler on aiobotocore clients, every request shares one connection pool
+
+    Period hashes and the payload store stay on boto3, their calls are cached
+    or rare and run in worker threads.
+    """
+
+    # resources
+    environment = Environment.dynamodb_scheduler_env()
+
+    # constants
+    time_period_hash_key = "time_period_hash"
+    trigger_time_key = "trigger_time"
+    status_key = "status"
+
+    @classmethod
+    async def get_dynamodb_item(cls, schedule_id: str) -> DynamodbItem:
+        logger.info(f"Retrieving dynamodb item: {schedule_id}", extra=request_context)
+
+        client = await AsyncAwsClients.client("dynamodb")
+        response = await client.query(
+            TableName=cls.environment.items_table_name,
+            IndexName=cls.environment.schedule_id_index_name,
+            KeyConditionExpression="#schedule_id = :schedule_id",
+            ExpressionAttributeNames={"#schedule_id": "schedule_id"},
+            ExpressionAttributeValues={":schedule_id": {"S": schedule_id}},
+        )
+        try:
+            record = response["Items"][0]
+        except IndexError:
+            raise NotFound(value=schedule_id, message="Schedule item not found")
+
+        dynamodb_item = DataMapper.attribute_record_to_dynamodb_item(record)
+        logger.info(
+            f"Item successfully retrieved: {dynamodb_item}", extra=request_context
+        )
+        return dynamodb_item
+
+    @classmethod
+    async def get_schedule_item(cls, schedule_id: str) -> ScheduleItem:
+        logger.info(f"Retrieving schedule item: {schedule_id}", extra=request_context)
+
+        # payloads of finished items are deleted once their workflow started
+        dynamodb_item = await cls.get_dynamodb_item(schedule_id)
+        if dynamodb_item.status not in (ScheduleStatus.COMPLETED, ScheduleStatus.ERROR):
+            dynamodb_item = await asyncio.to_thread(PayloadStore.resolve, dynamodb_item)
+        return dynamodb_item.schedule_item
+
+    @classmethod
+    async def add_to_schedule(cls, schedule_request: ScheduleRequest) -> ScheduleItem:
+        logger.info(
+            f"Adding schedule item to the schedule: {schedule_request}",
+            extra=request_context,
+        )
+
+        dynamodb_item = await asyncio.to_thread(
+            DynamoScheduleWriter._create_dynamodb_item, schedule_request
+        )
+
+        client = await AsyncAwsClients.client("dynamodb")
+        try:
+            await client.put_item(
+                TableName=cls.environment.items_table_name,
+                Item=DataMapper.dynamodb_item_to_transact_record(dynamodb_item),
+                ConditionExpression="attribute_not_exists(#tph)",
+                ExpressionAttributeNames={"#tph": cls.time_period_hash_key},
+            )
+        except ClientError as e:
+            raise OperationsError(value=str(asdict(dynamodb_item)), message=str(e))
+
+        logger.info("Item added to the schedule successfully", extra=request_context)
+        return dynamodb_item.schedule_item
+
+    @classmethod
+    async def add_many(
+        cls, schedule_requests: List[ScheduleRequest], max_in_flight: int = 10
+    ) -> List[BatchWriteResult]:
+        logger.info(
+            f"Adding {len(schedule_requests)} schedule items to the schedule",
+            extra=request_context,
+        )
+
+        dynamodb_items = await asyncio.to_thread(
+            DynamoScheduleWriter._create_dynamodb_items, schedule_requests
+        )
+
+        # chunks are written concurrently, results keep the request order
+        batch_write_size = DynamoScheduleWriter.batch_write_size
+        semaphore = asyncio.Semaphore(max_in_flight)
+
+        async def write_chunk(chunk_start: int) -> List[BatchWriteResult]:
+            chunk = dynamodb_items[chunk_start : chunk_start + batch_write_size]
+            async with semaphore:
+                failed = await cls._batch_write_chunk(chunk)
+            return DynamoScheduleWriter._batch_write_results(chunk, chunk_start, failed)
+
+        chunk_results = await asyncio.gather(
+            *(
+                write_chunk(chunk_start)
+                for chunk_start in range(0, len(dynamodb_items), batch_write_size)
+            )
+        )
+        results = [result for chunk in chunk_results for result in chunk]
+
+        logger.info(
+            f"Items added to the schedule: {sum(r.success for r in results)}",
+            extra=request_context,
+        )
+        return results
+
+    @classmethod
+    async def _batch_write_chunk(
+        cls, dynamodb_items: List[DynamodbItem]
+    ) -> Dict[Tuple[str, int], str]:
+
+        # failure messages are returned by item key
+        table_name = cls.environment.items_table_name
+        pending = {
+            DynamoScheduleWriter._item_key(
+                dynamodb_item
+            ): DataMapper.dynamodb_item_to_transact_record(dynamodb_item)
+            for dynamodb_item in dynamodb_items
+        }
+
+        client = await AsyncAwsClients.client("dynamodb")
+        for attempt in range(DynamoScheduleWriter.batch_write_max_retries + 1):
+            if attempt > 0:
+                await asyncio.sleep(
+                    DynamoScheduleWriter.batch_write_backoff * 2 ** (attempt - 1)
+                )
+
+            request_items = [{"PutRequest": {"Item": r}} for r in pending.values()]
+            try:
+                response = await client.batch_write_item(
+                    RequestItems={table_name: request_items}
+                )
+            except ClientError as e:
+                logger.error(f"Batch write failed: {e}", extra=request_context)
+                return {key: str(e) for key in pending}
+
+            unprocessed = response.get("UnprocessedItems", {}).get(table_name, [])
+            unprocessed_keys = {
+                DynamoScheduleWriter._record_key(r["PutRequest"]["Item"])
+                for r in unprocessed
+            }
+            pending = {k: v for k, v in pending.items() if k in unprocessed_keys}
+            if not pending:
+                return {}
+
+        return {key: "Item not processed" for key in pending}
+
+    @classmethod
+    async def remove_from_schedule(cls, schedule_id: str) -> None:
+        dynamodb_item = await cls.get_dynamodb_item(schedule_id)
+        logger.info(
+            f"Removing item from the schedule: {dynamodb_item}", extra=request_context
+        )
+
+        client = await AsyncAwsClients.client("dynamodb")
+        await client.delete_item(
+            TableName=cls.environment.items_table_name,
+            Key=cls._key_record(dynamodb_item),
+        )
+        await asyncio.to_thread(PayloadStore.delete, dynamodb_item.payload_ref)
+        logger.info("Item successfully deleted", extra=request_context)
+
+    @classmethod
+    async def update_schedule_item(
+        cls, schedule_id: str, schedule_request: ScheduleRequest
+    ) -> ScheduleItem:
+        dynamodb_item = await cls.get_dynamodb_item(schedule_id)
+        logger.info(
+            f"Updating dynamodb item: {dynamodb_item}: {schedule_request}",
+            extra=request_context,
+        )
+
+        new_dynamodb_item = await asyncio.to_thread(
+            DynamoScheduleWriter._create_dynamodb_item,
+            schedule_request,
+            dynamodb_item.schedule_item.schedule_id,
+        )
+
+        # payload of a failed update is never referenced
+        client = await AsyncAwsClients.client("dynamodb")
+        try:
+            await client.transact_write_items(
+                TransactItems=[
+                    {
+                        "Delete": {
+                            "TableName": cls.environment.items_table_name,
+                            "Key": cls._key_record(dynamodb_item),
+                        },
+                    },
+                    {
+                        "Put": {
+                            "TableName": cls.environment.items_table_name,
+                            "Item": DataMapper.dynamodb_item_to_transact_record(
+                                new_dynamodb_item
+                            ),
+                        }
+                    },
+                ]
+            )
+        except Exception:
+            await asyncio.to_thread(PayloadStore.delete, new_dynamodb_item.payload_ref)
+            raise
+
+        # old payload is dropped only once the item points at the new one
+        await asyncio.to_thread(PayloadStore.delete, dynamodb_item.payload_ref)
+
+        logger.info("Item updated successfully", extra=request_context)
+        return new_dynamodb_item.schedule_item
+
+    @classmethod
+    async def update_dynamodb_item_status(
+        cls, dynamodb_item: DynamodbItem, status: ScheduleStatus
+    ) -> None:
+        logger.info(
+            f"Updating status of dynamodb item: {dynamodb_item}", extra=request_context
+        )
+
+        update = DynamoScheduleWriter._status_transact_item(dynamodb_item, status, None)
+        client = await AsyncAwsClients.client("dynamodb")
+        await client.update_item(**update["Update"])
+        logger.info("Update completed successfully", extra=request_context)
+
+    @classmethod
+    async def update_dynamodb_items_status(
+        cls,
+        dynamodb_items: List[DynamodbItem],
+        status: ScheduleStatus,
+        expected_status: Optional[ScheduleStatus] = None,
+        max_in_flight: int = 10,
+    ) -> List[BatchWriteResult]:
+        logger.info(
+            f"Updating status of {len(dynamodb_items)} dynamodb items to {status}",
+            extra=request_context,
+        )
+
+        results = await cls._transact_update_items(
+            dynamodb_items,
+            lambda dynamodb_item: DynamoScheduleWriter._status_transact_item(
+                dynamodb_item, status, expected_status
+            ),
+            max_in_flight=max_in_flight,
+        )
+
+        logger.info(
+            f"Status updated for {sum(r.success for r in results)} items",
+            extra=request_context,
+        )
+        return results
+
+    @classmethod
+    async def claim_dynamodb_items(
+        cls,
+        dynamodb_items: List[DynamodbItem],
+        lease_owner: str,
+        lease_expiry: int,
+        max_in_flight: int = 10,
+    ) -> List[BatchWriteResult]:
+        logger.info(
+            f"Claiming {len(dynamodb_items)} dynamodb items for {lease_owner}",
+            extra=request_context,
+        )
+
+        current_time = int(time.time())
+        results = await cls._transact_update_items(
+            dynamodb_items,
+            lambda dynamodb_item: DynamoScheduleWriter._claim_transact_item(
+                dynamodb_item, lease_owner, lease_expiry, current_time
+            ),
+            max_in_flight=max_in_flight,
+        )
+
+        logger.info(
+            f"Claimed {sum(r.success for r in results)} items", extra=request_context
+        )
+        return results
+
+    @classmethod
+    async def complete_claims(
+        cls, dynamodb_items: List[DynamodbItem], max_in_flight: int = 10
+    ) -> List[BatchWriteResult]:
+        logger.info(
+            f"Completing claims of {len(dynamodb_items)} dynamodb items",
+            extra=request_context,
+        )
+
+        return await cls._transact_update_items(
+            dynamodb_items,
+            DynamoScheduleWriter._complete_transact_item,
+            max_in_flight=max_in_flight,
+        )
+
+    @classmethod
+    async def release_claims(
+        cls, dynamodb_items: List[DynamodbItem], max_in_flight: int = 10
+    ) -> List[BatchWriteResult]:
+        logger.info(
+            f"Releasing claims of {len(dynamodb_items)} dynamodb items",
+            extra=request_context,
+        )
+
+        return await cls._transact_update_items(
+            dynamodb_items,
+            DynamoScheduleWriter._release_transact_item,
+            max_in_flight=max_in_flight,
+        )
+
+    @classmethod
+    async def _transact_update_items(
+        cls,
+        dynamodb_items: List[DynamodbItem],
+        transact_item: Callable[[DynamodbItem], dict],
+        max_in_flight: int = 10,
+    ) -> List[BatchWriteResult]:
+
+        chunks, messages = DynamoScheduleWriter._status_update_chunks(dynamodb_items)
+        semaphore = asyncio.Semaphore(max_in_flight)
+
+        async def update_chunk(chunk: List[int]) -> Dict[int, str]:
+            async with semaphore:
+                failed = await cls._transact_write(
+                    [transact_item(dynamodb_items[index]) for index in chunk]
+                )
+            return {chunk[position]: message for position, message in failed.items()}
+
+        for chunk, failed in zip(
+            chunks,
+            await asyncio.gather(
+                *(update_chunk(chunk) for chunk in chunks), return_exceptions=True
+            ),
+        ):
+            if isinstance(failed, Exception):
+                failed = {index: str(failed) for index in chunk}
+            messages.update(failed)  # type: ignore
+
+        return [
+            BatchWriteResult(
+                index=index,
+                success=index not in messages,
+                schedule_item=dynamodb_item.schedule_item,
+                message=messages.get(index),
+            )
+            for index, dynamodb_item in enumerate(dynamodb_items)
+        ]
+
+    @classmethod
+    async def _transact_write(cls, transact_items: List[dict]) -> Dict[int, str]:
+
+        # failure messages are returned by position in the chunk
+        pending = list(range(len(transact_items)))
+        failed: Dict[int, str] = {}
+
+        client = await AsyncAwsClients.client("dynamodb")
+        for attempt in range(DynamoScheduleWriter.batch_write_max_retries + 1):
+            if attempt > 0:
+                await asyncio.sleep(
+                    DynamoScheduleWriter.batch_write_backoff * 2 ** (attempt - 1)
+                )
+
+            try:
+                await client.transact_write_items(
+                    TransactItems=[transact_items[position] for position in pending]
+                )
+                return failed
+            except ClientError as e:
+                reasons = e.response.get("CancellationReasons")
+                if not reasons:
+                    failed.update({position: str(e) for position in pending})
+                    return failed
+
+            pending = DynamoScheduleWriter._retry_positions(pending, reasons, failed)
+            if not pending:
+                return failed
+
+        failed.update({position: "Transaction not completed" for position in pending})
+        return failed
+
+    @classmethod
+    async def get_dynamodb_items(
+        cls,
+        query_range: QueryRange,
+        status: ScheduleStatus,
+    ) -> AsyncGenerator[DynamodbItem, None]:
+        logger.info(
+            f"Retrieving dynamodb items for range: {query_range}", extra=request_context
+        )
+
+        # every period partition is queried concurrently, merged by trigger time
+        dynamodb_query_ranges = await asyncio.to_thread(
+            DynamoScheduleReader._get_dynamodb_query_ranges, query_range
+        )
+        async for dynamodb_item in async_merge(
+            [
+                cls._get_dynamodb_items_for_ddb_query_range(
+                    dynamodb_query_range, status
+                )
+                for dynamodb_query_range in dynamodb_query_ranges
+            ],
+            key=lambda dynamodb_item: dynamodb_item.trigger_time,
+        ):
+            yield dynamodb_item
+
+        logger.info("Dynamodb items retrieved succesfully", extra=request_context)
+
+    @classmethod
+    async def _get_dynamodb_items_for_ddb_query_range(
+        cls,
+        query_range: DynamodbQueryRange,
+        status: ScheduleStatus,
+    ) -> AsyncGenerator[DynamodbItem, None]:
+        logger.info(
+            f"Retrieving dynamodb items for ddb range: {query_range}",
+            extra=request_context,
+        )
+
+        query_arguments = DynamoScheduleReader._client_query_arguments(
+            DynamoScheduleReader._query_arguments(query_range, status)
+        )
+
+        client = await AsyncAwsClients.client("dynamodb")
+        while True:
+            response = await client.query(**query_arguments)
+            for dynamodb_record in response["Items"]:
+                if dynamodb_record[cls.status_key]["S"] != status.value:
+                    continue
+
+                yield DataMapper.attribute_record_to_dynamodb_item(dynamodb_record)
+
+            if "LastEvaluatedKey" not in response:
+                break
+            query_arguments["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    @classmethod
+    async def get_schedule_items(
+        cls, query_range: QueryRange, status: ScheduleStatus
+    ) -> AsyncGenerator[ScheduleItem, None]:
+        async for dynamodb_item in cls.get_dynamodb_items(query_range, status):
+            yield dynamodb_item.schedule_item
+
+    @classmethod
+    def _key_record(cls, dynamodb_item: DynamodbItem) -> dict:
+        return {
+            cls.time_period_hash_key: {"S": dynamodb_item.time_period_hash},
+            cls.trigger_time_key: {"N": str(int(dynamodb_item.trigger_time))},
+        }
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+import base64
+import zlib
+from enum import Enum
+from typing import Any, Union
+
+import simplejson as json  # type: ignore
+from lib.exceptions import EnvironmentConfigError, OperationsError
+
+# optional dependencies
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+class PayloadCodec(str, Enum):
+    JSON: str = "json"
+    FAST_JSON: str = "fast_json"
+    ZLIB: str = "zlib"
+    ZSTD: str = "zstd"
+
+
+class PayloadCodecs:
+
+    # constants
+    binary_codecs = (PayloadCodec.ZLIB, PayloadCodec.ZSTD)
+    zlib_level = 6
+    zstd_level = 3
+
+    @classmethod
+    def is_binary(cls, codec: PayloadCodec) -> bool:
+        return codec in cls.binary_codecs
+
+    @classmethod
+    def check_available(cls, codec: PayloadCodec) -> None:
+        if codec == PayloadCodec.ZSTD and zstandard is None:
+            raise EnvironmentConfigError(message="zstandard is not installed")
+
+    @classmethod
+    def encode(cls, codec: PayloadCodec, payload: dict) -> Union[str, bytes]:
+        if codec == PayloadCodec.FAST_JSON:
+            return cls._dumps(payload).decode()
+        if codec == PayloadCodec.ZLIB:
+            return zlib.compress(cls._dumps(payload), cls.zlib_level)
+        if codec == PayloadCodec.ZSTD:
+            cls.check_available(codec)
+            return zstandard.ZstdCompressor(level=cls.zstd_level).compress(
+                cls._dumps(payload)
+            )
+        return json.dumps(payload)
+
+    @classmethod
+    def decode(cls, codec: PayloadCodec, value: Any) -> dict:
+
+        if codec == PayloadCodec.JSON:
+            return json.loads(value)
+        if codec == PayloadCodec.FAST_JSON:
+            return cls._loads(value)
+
+        # binary values arrive as boto3 binary, bytes or base64 text from sns
+        data = base64.b64decode(value) if isinstance(value, str) else bytes(value)
+        if codec == PayloadCodec.ZLIB:
+            return cls._loads(zlib.decompress(data))
+        if zstandard is None:
+            raise OperationsError(value=codec.value, message="Unable to decode payload")
+        return cls._loads(zstandard.ZstdDecompressor().decompress(data))
+
+    @classmethod
+    def to_text(cls, value: Union[str, bytes]) -> str:
+
+        # sns messages are text, binary payloads travel base64 encoded
+        if isinstance(value, bytes):
+            return base64.b64encode(value).decode()
+        return value
+
+    @classmethod
+    def _dumps(cls, payload: dict) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(payload)
+        return json.dumps(payload).encode()
+
+    @classmethod
+    def _loads(cls, value: Union[str, bytes]) -> dict:
+        if orjson is not None:
+            return orjson.loads(value)
+        return json.loads(value)
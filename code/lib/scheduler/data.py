@@ -1,24 +1,49 @@
 #!/usr/bin/env python
 import random
 import uuid
+import zlib
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Any, List, Optional, Type, TypeVar
 
 from lib.exceptions import ValidationError
 from pydantic.dataclasses import Field, dataclass
 
+DataclassType = TypeVar("DataclassType")
+
 
 class Config:
     frozen = True
     use_enum_values = True
 
 
+# trusted construction without validation, only for data validated on write
+def construct(dataclass_type: Type[DataclassType], **values: Any) -> DataclassType:
+    instance = object.__new__(dataclass_type)
+    instance.__dict__.update(values, __pydantic_initialised__=True)
+    return instance
+
+
 # data class for mapping of time period to a hash for dynamodb
 @dataclass(config=Config)
 class TimePeriodMap:
     time_period: str
     time_period_hash: str
+    shard_count: int = 1
+
+    @property
+    def shard_hashes(self) -> List[str]:
+        if self.shard_count <= 1:
+            return [self.time_period_hash]
+        return [self._shard_hash(shard) for shard in range(self.shard_count)]
+
+    def get_shard_hash(self, schedule_id: str) -> str:
+        if self.shard_count <= 1:
+            return self.time_period_hash
+        return self._shard_hash(zlib.crc32(schedule_id.encode()) % self.shard_count)
+
+    def _shard_hash(self, shard: int) -> str:
+        return f"{self.time_period_hash}#{shard}"
 
 
 class ScheduleStatus(str, Enum):
@@ -50,6 +75,9 @@ class DynamodbItem:
     schedule_item: ScheduleItem
     trigger_time: Optional[int] = None
     status: str = ScheduleStatus.NOT_STARTED
+    payload_ref: Optional[str] = None
+    lease_owner: Optional[str] = None
+    lease_expiry: Optional[int] = None
 
     def __post_init_post_parse__(self):
         if self.trigger_time is None:
@@ -58,6 +86,14 @@ class DynamodbItem:
             object.__setattr__(self, "trigger_time", trigger_time)
 
 
+@dataclass(config=Config)
+class BatchWriteResult:
+    index: int
+    success: bool
+    schedule_item: Optional[ScheduleItem] = None
+    message: Optional[str] = None
+
+
 @dataclass(config=Config)
 class QueryRange:
     start_time: int
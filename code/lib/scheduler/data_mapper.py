@@ -1,17 +1,39 @@
 #!/usr/bin/env python
 import logging
 from dataclasses import asdict, fields
+from typing import Any, Optional
 
 import simplejson as json  # type: ignore
+from lib.aws import cached_classproperty
 from lib.dispatcher import LambdaProxySnsEvent
+from lib.environment import Environment
 from lib.logging import request_context
 
-from .data import DynamodbItem, ScheduleItem, ScheduleStatus
+from .codecs import PayloadCodec, PayloadCodecs
+from .data import DynamodbItem, ScheduleItem, ScheduleStatus, construct
 
 logger = logging.getLogger(__name__)
 
 
 class DataMapper:
+
+    # resources
+    @cached_classproperty
+    def payload_codec(cls) -> PayloadCodec:
+
+        # codec for new records, records are tagged so mixed data decodes
+        payload_codec = PayloadCodec(Environment.dynamodb_scheduler_env().payload_codec)
+        PayloadCodecs.check_available(payload_codec)
+        return payload_codec
+
+    # constants
+    pending_period_hash_key = "pending_period_hash"
+    leased_period_hash_key = "leased_period_hash"
+    payload_codec_key = "payload_codec"
+    payload_ref_key = "payload_ref"
+    lease_owner_key = "lease_owner"
+    lease_expiry_key = "lease_expiry"
+
     @classmethod
     def dynamodb_item_to_record(cls, dynamodb_item: DynamodbItem) -> dict:
 
@@ -23,22 +45,49 @@ class DataMapper:
         schedule_item_payload = asdict(dynamodb_item.schedule_item)
         dynamodb_item_payload = asdict(dynamodb_item)
 
-        schedule_item_payload["workflow_payload"] = json.dumps(
-            schedule_item_payload["workflow_payload"]
+        # offloaded payloads are persisted only as a reference
+        if dynamodb_item.payload_ref is not None:
+            schedule_item_payload["workflow_payload"] = {}
+        else:
+            del dynamodb_item_payload[cls.payload_ref_key]
+
+        schedule_item_payload["workflow_payload"] = PayloadCodecs.encode(
+            cls.payload_codec, schedule_item_payload["workflow_payload"]
         )
+        dynamodb_item_payload[cls.payload_codec_key] = cls.payload_codec.value
         dynamodb_item_payload["trigger_time"] = int(
             dynamodb_item_payload["trigger_time"]
         )
         dynamodb_item_payload.update(schedule_item_payload)
         del dynamodb_item_payload["schedule_item"]
 
+        # lease attributes exist only while a dispatcher holds a claim
+        for key in (cls.lease_owner_key, cls.lease_expiry_key):
+            if dynamodb_item_payload[key] is None:
+                del dynamodb_item_payload[key]
+        if dynamodb_item.lease_owner is not None:
+            dynamodb_item_payload[
+                cls.leased_period_hash_key
+            ] = dynamodb_item.time_period_hash
+
+        # sparse index attribute, present only while the item waits for dispatch
+        if dynamodb_item.status == ScheduleStatus.NOT_STARTED:
+            dynamodb_item_payload[
+                cls.pending_period_hash_key
+            ] = dynamodb_item.time_period_hash
+
         logger.debug(
             f"Conversion successfull: {dynamodb_item_payload}", extra=request_context
         )
         return dynamodb_item_payload
 
     @classmethod
-    def record_to_dynamodb_item(cls, record: dict) -> DynamodbItem:
+    def record_to_dynamodb_item(
+        cls, record: dict, validate: bool = True
+    ) -> DynamodbItem:
+        if not validate:
+            return cls._trusted_record_to_dynamodb_item(record)
+
         logger.debug(
             f"Converting record to dynamodb item: {record}", extra=request_context
         )
@@ -47,8 +96,8 @@ class DataMapper:
         schedule_item_payload["schedule_time"] = int(
             schedule_item_payload["schedule_time"]
         )
-        schedule_item_payload["workflow_payload"] = json.loads(
-            schedule_item_payload["workflow_payload"]
+        schedule_item_payload["workflow_payload"] = PayloadCodecs.decode(
+            cls._record_codec(record), schedule_item_payload["workflow_payload"]
         )
         schedule_item = ScheduleItem(**schedule_item_payload)
 
@@ -58,18 +107,75 @@ class DataMapper:
             trigger_time=record["trigger_time"],
             status=ScheduleStatus(record["status"]),
             schedule_item=schedule_item,
+            payload_ref=record.get(cls.payload_ref_key),
+            lease_owner=record.get(cls.lease_owner_key),
+            lease_expiry=record.get(cls.lease_expiry_key),
         )
 
         logger.debug(f"Conversion successfull: {dynamodb_item}", extra=request_context)
         return dynamodb_item
 
+    @classmethod
+    def _trusted_record_to_dynamodb_item(cls, record: dict) -> DynamodbItem:
+
+        # records from our own table were validated when they were written
+        schedule_item = construct(
+            ScheduleItem,
+            schedule_time=int(record["schedule_time"]),
+            workflow_arn=record["workflow_arn"],
+            workflow_payload=PayloadCodecs.decode(
+                cls._record_codec(record), record["workflow_payload"]
+            ),
+            schedule_id=record["schedule_id"],
+        )
+        return construct(
+            DynamodbItem,
+            time_period_hash=record["time_period_hash"],
+            schedule_item=schedule_item,
+            trigger_time=int(record["trigger_time"]),
+            status=record["status"],
+            payload_ref=record.get(cls.payload_ref_key),
+            lease_owner=record.get(cls.lease_owner_key),
+            lease_expiry=cls._optional_int(record.get(cls.lease_expiry_key)),
+        )
+
+    @classmethod
+    def attribute_record_to_dynamodb_item(cls, record: dict) -> DynamodbItem:
+
+        # low level client attribute values decoded in one pass, trusted as well
+        codec = record.get(cls.payload_codec_key, {}).get("S", PayloadCodec.JSON)
+        (workflow_payload,) = record["workflow_payload"].values()
+        schedule_item = construct(
+            ScheduleItem,
+            schedule_time=int(record["schedule_time"]["N"]),
+            workflow_arn=record["workflow_arn"]["S"],
+            workflow_payload=PayloadCodecs.decode(
+                PayloadCodec(codec), workflow_payload
+            ),
+            schedule_id=record["schedule_id"]["S"],
+        )
+        return construct(
+            DynamodbItem,
+            time_period_hash=record["time_period_hash"]["S"],
+            schedule_item=schedule_item,
+            trigger_time=int(record["trigger_time"]["N"]),
+            status=record["status"]["S"],
+            payload_ref=record.get(cls.payload_ref_key, {}).get("S"),
+            lease_owner=record.get(cls.lease_owner_key, {}).get("S"),
+            lease_expiry=cls._optional_int(
+                record.get(cls.lease_expiry_key, {}).get("N")
+            ),
+        )
+
     @classmethod
     def dynamodb_item_to_sns_payload(cls, dynamodb_item: DynamodbItem) -> str:
         logger.debug(
             f"Converting dynamodb item to sns payload: {dynamodb_item}",
             extra=request_context,
         )
-        payload = json.dumps(cls.dynamodb_item_to_record(dynamodb_item))
+        record = cls.dynamodb_item_to_record(dynamodb_item)
+        record["workflow_payload"] = PayloadCodecs.to_text(record["workflow_payload"])
+        payload = json.dumps(record)
 
         logger.debug(f"Conversion successfull: {payload}", extra=request_context)
         return payload
@@ -105,6 +211,17 @@ class DataMapper:
     def _dynamodb_record_to_transact_record(cls, dynamodb_record: dict) -> dict:
         field_map = {str(int): "N", str(str): "S"}
         tr_record = {
-            k: {field_map[str(type(v))]: str(v)} for k, v in dynamodb_record.items()
+            k: {"B": v} if isinstance(v, bytes) else {field_map[str(type(v))]: str(v)}
+            for k, v in dynamodb_record.items()
         }
         return tr_record
+
+    @classmethod
+    def _record_codec(cls, record: dict) -> PayloadCodec:
+
+        # records written before codecs were introduced are json
+        return PayloadCodec(record.get(cls.payload_codec_key, PayloadCodec.JSON))
+
+    @classmethod
+    def _optional_int(cls, value: Any) -> Optional[int]:
+        return None if value is None else int(value)
@@ -2,28 +2,43 @@
 import logging
 import uuid
 from dataclasses import asdict
-from datetime import datetime
 from typing import Optional
 
-import boto3  # type: ignore
 from boto3.dynamodb.conditions import Attr, Key  # type: ignore
 from botocore.exceptions import ClientError  # type: ignore
+from lib.aws import AwsClients, cached_classproperty
+from lib.cache import TTLCache
 from lib.environment import Environment
 from lib.exceptions import OperationsError
 from lib.logging import request_context
 
 from .data import TimePeriodMap
+from .periods import PeriodGranularity, PeriodKeys
 
 # resources
 logger = logging.getLogger(__name__)
-dynamodb_resource = boto3.resource("dynamodb")
 
 
 class DSPeriodHasher:
 
     # resources
     environment = Environment.dynamodb_scheduler_env()
-    table = dynamodb_resource.Table(environment.hash_table_name)
+
+    @cached_classproperty
+    def table(cls):
+        return AwsClients.resource("dynamodb").Table(cls.environment.hash_table_name)
+
+    # period maps are immutable once written, keep them across warm invocations
+    cache: TTLCache[TimePeriodMap] = TTLCache(
+        max_size=environment.period_cache_size, ttl=environment.period_cache_ttl
+    )
+
+    # period granularity for new items, migration ones are read as well
+    granularity = PeriodGranularity(environment.period_granularity)
+    migration_granularities = tuple(
+        PeriodGranularity(granularity)
+        for granularity in environment.period_migration_granularities
+    )
 
     # constants
     period_key_key = "time_period"
@@ -47,8 +62,11 @@ class DSPeriodHasher:
     @classmethod
     def _add_period_hash(cls, period_key: str) -> TimePeriodMap:
 
+        # shard count is fixed per period so reads survive configuration changes
         time_period_hash = TimePeriodMap(
-            time_period=period_key, time_period_hash=str(uuid.uuid4())
+            time_period=period_key,
+            time_period_hash=str(uuid.uuid4()),
+            shard_count=cls.environment.period_shard_count,
         )
 
         logger.info(f"Writing new period hash to the table: {time_period_hash}")
@@ -62,18 +80,58 @@ class DSPeriodHasher:
         return time_period_hash
 
     @classmethod
-    def get_time_period_hash(cls, schedule_time: int) -> TimePeriodMap:
+    def get_period_key(
+        cls, schedule_time: int, granularity: Optional[PeriodGranularity] = None
+    ) -> str:
+        return PeriodKeys.get_period_key(granularity or cls.granularity, schedule_time)
+
+    @classmethod
+    def invalidate_cache(cls, schedule_time: Optional[int] = None) -> None:
+        if schedule_time is None:
+            logger.info("Clearing time period map cache", extra=request_context)
+            cls.cache.clear()
+            return
+
+        for granularity in (cls.granularity, *cls.migration_granularities):
+            period_key = cls.get_period_key(schedule_time, granularity)
+            logger.info(
+                f"Invalidating cached period: {period_key}", extra=request_context
+            )
+            cls.cache.invalidate(period_key)
+
+    @classmethod
+    def find_time_period_hash(
+        cls, schedule_time: int, granularity: Optional[PeriodGranularity] = None
+    ) -> Optional[TimePeriodMap]:
         logger.info(
-            f"Retrieving time period map for: {schedule_time}", extra=request_context
+            f"Looking up time period map for: {schedule_time}", extra=request_context
         )
 
-        date = datetime.fromtimestamp(schedule_time)
-        period_key = f"{date.year}-{str(int((date.month - 1) / 3))}"
+        period_key = cls.get_period_key(schedule_time, granularity)
+        time_period_map = cls.cache.get(period_key)
+        if time_period_map is not None:
+            logger.debug(
+                f"Time period map cache hit: {time_period_map}", extra=request_context
+            )
+            return time_period_map
 
-        # load period key
+        # missing periods are not cached, writers may create them later
         time_period_map = cls._load_period_hash(period_key)
+        if time_period_map is not None:
+            cls.cache.put(period_key, time_period_map)
+        return time_period_map
+
+    @classmethod
+    def get_time_period_hash(cls, schedule_time: int) -> TimePeriodMap:
+        logger.info(
+            f"Retrieving time period map for: {schedule_time}", extra=request_context
+        )
+
+        time_period_map = cls.find_time_period_hash(schedule_time)
         if time_period_map is None:
+            period_key = cls.get_period_key(schedule_time)
             time_period_map = cls._add_period_hash(period_key)
+            cls.cache.put(period_key, time_period_map)
 
         logger.info(
             f"Time period map retrieved: {time_period_map}", extra=request_context
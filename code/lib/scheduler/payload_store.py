@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+import logging
+import uuid
+from dataclasses import replace
+from typing import Optional, Tuple
+
+import simplejson as json  # type: ignore
+from botocore.exceptions import ClientError  # type: ignore
+from lib.aws import AwsClients
+from lib.environment import Environment
+from lib.exceptions import OperationsError
+from lib.logging import request_context
+
+from .data import DynamodbItem
+
+# resources
+logger = logging.getLogger(__name__)
+
+
+class PayloadStore:
+    """Claim check store for workflow payloads too large for the items table"""
+
+    # resources
+    environment = Environment.dynamodb_scheduler_env()
+
+    # constants
+    ref_prefix = "s3://"
+    key_prefix = "payloads/"
+
+    @classmethod
+    def offload(cls, dynamodb_item: DynamodbItem) -> DynamodbItem:
+
+        # small payloads and deployments without a bucket stay inline
+        bucket_name = cls.environment.payload_bucket_name
+        if not bucket_name:
+            return dynamodb_item
+
+        schedule_item = dynamodb_item.schedule_item
+        body = json.dumps(schedule_item.workflow_payload).encode()
+        if len(body) <= cls.environment.payload_offload_threshold:
+            return dynamodb_item
+
+        # every write gets its own object, a failed update keeps the stored one
+        key = f"{cls.key_prefix}{schedule_item.schedule_id}/{uuid.uuid4().hex}"
+        logger.info(
+            f"Offloading workflow payload of {len(body)} bytes: {key}",
+            extra=request_context,
+        )
+        try:
+            AwsClients.client("s3").put_object(Bucket=bucket_name, Key=key, Body=body)
+        except ClientError as e:
+            raise OperationsError(value=key, message=str(e))
+
+        # payload stays on the item in memory, only the reference is persisted
+        return replace(
+            dynamodb_item, payload_ref=f"{cls.ref_prefix}{bucket_name}/{key}"
+        )
+
+    @classmethod
+    def load(cls, dynamodb_item: DynamodbItem) -> dict:
+        if dynamodb_item.payload_ref is None:
+            return dynamodb_item.schedule_item.workflow_payload or {}
+
+        bucket_name, key = cls._parse_ref(dynamodb_item.payload_ref)
+        logger.info(
+            f"Loading workflow payload: {dynamodb_item.payload_ref}",
+            extra=request_context,
+        )
+        try:
+            response = AwsClients.client("s3").get_object(Bucket=bucket_name, Key=key)
+        except ClientError as e:
+            raise OperationsError(value=dynamodb_item.payload_ref, message=str(e))
+        return json.loads(response["Body"].read())
+
+    @classmethod
+    def resolve(cls, dynamodb_item: DynamodbItem) -> DynamodbItem:
+        if dynamodb_item.payload_ref is None:
+            return dynamodb_item
+
+        schedule_item = replace(
+            dynamodb_item.schedule_item, workflow_payload=cls.load(dynamodb_item)
+        )
+        return replace(dynamodb_item, schedule_item=schedule_item)
+
+    @classmethod
+    def delete(cls, payload_ref: Optional[str]) -> None:
+        if payload_ref is None:
+            return
+
+        bucket_name, key = cls._parse_ref(payload_ref)
+        logger.info(f"Deleting workflow payload: {payload_ref}", extra=request_context)
+        try:
+            AwsClients.client("s3").delete_object(Bucket=bucket_name, Key=key)
+        except ClientError as e:
+            logger.error(
+                f"Unable to delete workflow payload: {payload_ref}: {e}",
+                extra=request_context,
+            )
+
+    @classmethod
+    def _parse_ref(cls, payload_ref: str) -> Tuple[str, str]:
+        bucket_name, _, key = payload_ref[len(cls.ref_prefix) :].partition("/")
+        return bucket_name, key
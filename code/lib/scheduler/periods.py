@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+from datetime import datetime
+from enum import Enum
+from typing import List
+
+
+class PeriodGranularity(str, Enum):
+    QUARTER: str = "quarter"
+    WEEK: str = "week"
+    DAY: str = "day"
+    HOUR: str = "hour"
+
+
+class PeriodKeys:
+
+    # constants
+    fixed_period_seconds = {
+        PeriodGranularity.WEEK: 7 * 24 * 60 * 60,
+        PeriodGranularity.DAY: 24 * 60 * 60,
+        PeriodGranularity.HOUR: 60 * 60,
+    }
+
+    # unix epoch is a thursday, weeks start on monday
+    week_offset_seconds = 4 * 24 * 60 * 60
+
+    @classmethod
+    def get_period_key(cls, granularity: PeriodGranularity, timestamp: int) -> str:
+
+        # legacy quarter keys, kept in local time for existing data
+        if granularity == PeriodGranularity.QUARTER:
+            date = datetime.fromtimestamp(timestamp)
+            return f"{date.year}-{str(int((date.month - 1) / 3))}"
+
+        period_start = cls.get_period_start(granularity, timestamp)
+        date = datetime.utcfromtimestamp(period_start)
+        return f"{granularity.value}-{date.strftime('%Y-%m-%dT%H')}"
+
+    @classmethod
+    def get_period_start(cls, granularity: PeriodGranularity, timestamp: int) -> int:
+        if granularity == PeriodGranularity.QUARTER:
+            date = datetime.fromtimestamp(timestamp)
+            month = 3 * int((date.month - 1) / 3) + 1
+            return int(datetime(date.year, month, 1).timestamp())
+
+        period_seconds = cls.fixed_period_seconds[granularity]
+        offset = cls.week_offset_seconds if granularity == PeriodGranularity.WEEK else 0
+        return (timestamp - offset) // period_seconds * period_seconds + offset
+
+    @classmethod
+    def get_next_period_start(
+        cls, granularity: PeriodGranularity, timestamp: int
+    ) -> int:
+        period_start = cls.get_period_start(granularity, timestamp)
+        if granularity != PeriodGranularity.QUARTER:
+            return period_start + cls.fixed_period_seconds[granularity]
+
+        date = datetime.fromtimestamp(period_start)
+        year, month = (
+            (date.year + 1, 1) if date.month == 10 else (date.year, date.month + 3)
+        )
+        return int(datetime(year, month, 1).timestamp())
+
+    @classmethod
+    def get_period_times(
+        cls, granularity: PeriodGranularity, start_time: int, end_time: int
+    ) -> List[int]:
+
+        # one timestamp inside every period touched by the range
+        period_times = []
+        period_time = start_time
+        while period_time <= end_time:
+            period_times.append(period_time)
+            period_time = cls.get_next_period_start(granularity, period_time)
+        return period_times
@@ -1,9 +1,15 @@
 #!/usr/bin/env python
 import logging
-from typing import Generator
+from typing import Any, Dict, Generator, List
 
-import boto3  # type: ignore
-from boto3.dynamodb.conditions import Key  # type: ignore
+from boto3.dynamodb.conditions import (  # type: ignore
+    Attr,
+    ConditionExpressionBuilder,
+    Key,
+)
+from boto3.dynamodb.types import TypeSerializer  # type: ignore
+from lib.aws import AwsClients, cached_classproperty
+from lib.concurrency import concurrent_merge
 from lib.environment import Environment
 from lib.exceptions import NotFound
 from lib.logging import request_context
@@ -17,21 +23,30 @@ from .data import (
     ScheduleStatus,
 )
 from .ds_hash import DSPeriodHasher
+from .payload_store import PayloadStore
+from .periods import PeriodKeys
 
 # resources
 logger = logging.getLogger(__name__)
-dynamodb_resource = boto3.resource("dynamodb")
 
 
 class DynamoScheduleReader:
 
     # resources
     environment = Environment.dynamodb_scheduler_env()
-    table = dynamodb_resource.Table(environment.items_table_name)
+
+    @cached_classproperty
+    def table(cls):
+        return AwsClients.resource("dynamodb").Table(cls.environment.items_table_name)
+
+    @cached_classproperty
+    def client(cls):
+        return AwsClients.client("dynamodb")
 
     # constants
     time_period_hash_key = "time_period_hash"
     trigger_time_key = "trigger_time"
+    status_key = "status"
 
     @classmethod
     def get_dynamodb_item(cls, schedule_id: str) -> DynamodbItem:
@@ -58,12 +73,17 @@ class DynamoScheduleReader:
     def get_schedule_item(cls, schedule_id: str) -> ScheduleItem:
         logger.info(f"Retrieving schedule item: {schedule_id}", extra=request_context)
 
+        # payloads of finished items are deleted once their workflow started
         dynamodb_item = cls.get_dynamodb_item(schedule_id)
+        if dynamodb_item.status not in (ScheduleStatus.COMPLETED, ScheduleStatus.ERROR):
+            dynamodb_item = PayloadStore.resolve(dynamodb_item)
         return dynamodb_item.schedule_item
 
     @classmethod
     def _get_schedule_items_for_ddb_query_range(
-        cls, query_range: DynamodbQueryRange, status: ScheduleStatus
+        cls,
+        query_range: DynamodbQueryRange,
+        status: ScheduleStatus,
     ) -> Generator[DynamodbItem, None, None]:
 
         logger.info(
@@ -71,77 +91,193 @@ class DynamoScheduleReader:
             extra=request_context,
         )
 
-        next_key = None
-        query_arguments = {
-            "KeyConditionExpression": Key(cls.time_period_hash_key).eq(
-                query_range.time_period_hash
-            )
-            & Key(cls.trigger_time_key).between(
-                query_range.start_trigger_time, query_range.end_trigger_time - 1
-            )
-        }
+        query_arguments = cls._query_arguments(query_range, status)
+        if cls.environment.dynamodb_engine == "client":
+            yield from cls._client_query(query_arguments, status)
+        else:
+            yield from cls._resource_query(query_arguments, status)
+        logger.info("Dynamodb items retrieved succesfully", extra=request_context)
+
+    @classmethod
+    def _query_arguments(
+        cls,
+        query_range: DynamodbQueryRange,
+        status: ScheduleStatus,
+    ) -> Dict[str, Any]:
+
+        query_arguments: Dict[str, Any] = {}
+        partition_key = Key(cls.time_period_hash_key)
+
+        # sparse index holds only items waiting for dispatch
+        pending_index_name = cls.environment.pending_index_name
+        if pending_index_name and status == ScheduleStatus.NOT_STARTED:
+            query_arguments["IndexName"] = pending_index_name
+            partition_key = Key(DataMapper.pending_period_hash_key)
+
+        # sparse index holds only items a dispatcher claimed and still leases
+        leased_index_name = cls.environment.leased_index_name
+        if leased_index_name and status == ScheduleStatus.PROCESSING:
+            query_arguments["IndexName"] = leased_index_name
+            partition_key = Key(DataMapper.leased_period_hash_key)
+
+        query_arguments["KeyConditionExpression"] = partition_key.eq(
+            query_range.time_period_hash
+        ) & Key(cls.trigger_time_key).between(
+            query_range.start_trigger_time, query_range.end_trigger_time - 1
+        )
+
+        # skip other statuses on the server side
+        query_arguments["FilterExpression"] = Attr(cls.status_key).eq(status.value)
+        return query_arguments
+
+    @classmethod
+    def _resource_query(
+        cls, query_arguments: Dict[str, Any], status: ScheduleStatus
+    ) -> Generator[DynamodbItem, None, None]:
 
+        next_key = None
         while True:
 
             if next_key is not None:
                 query_arguments["ExclusiveStartKey"] = next_key
 
-            response = cls.table.query(**query_arguments)
+            # partitions are read from worker threads, resources are not thread
+            # safe while their client is
+            response = cls.table.meta.client.query(
+                TableName=cls.environment.items_table_name, **query_arguments
+            )
             dynamodb_items = response["Items"]
             next_key = response.get("LastEvaluatedKey")
 
             for dynamodb_record in dynamodb_items:
-                dynamodb_item = DataMapper.record_to_dynamodb_item(dynamodb_record)
-                if dynamodb_item.status != status.value:
+                if dynamodb_record[cls.status_key] != status.value:
                     continue
 
-                yield dynamodb_item
+                yield DataMapper.record_to_dynamodb_item(
+                    dynamodb_record, validate=False
+                )
 
             if next_key is None:
                 break
-        logger.info("Dynamodb items retrieved succesfully", extra=request_context)
+
+    @classmethod
+    def _client_query(
+        cls, query_arguments: Dict[str, Any], status: ScheduleStatus
+    ) -> Generator[DynamodbItem, None, None]:
+
+        query_arguments = cls._client_query_arguments(query_arguments)
+        next_key = None
+        while True:
+
+            if next_key is not None:
+                query_arguments["ExclusiveStartKey"] = next_key
+
+            response = cls.client.query(**query_arguments)
+            next_key = response.get("LastEvaluatedKey")
+
+            for dynamodb_record in response["Items"]:
+                if dynamodb_record[cls.status_key]["S"] != status.value:
+                    continue
+
+                yield DataMapper.attribute_record_to_dynamodb_item(dynamodb_record)
+
+            if next_key is None:
+                break
+
+    @classmethod
+    def _client_query_arguments(cls, query_arguments: Dict[str, Any]) -> Dict[str, Any]:
+
+        # build the expressions once, items skip the resource type deserializer
+        builder = ConditionExpressionBuilder()
+        key_condition = builder.build_expression(
+            query_arguments.pop("KeyConditionExpression"), is_key_condition=True
+        )
+        item_filter = builder.build_expression(query_arguments.pop("FilterExpression"))
+
+        serializer = TypeSerializer()
+        query_arguments.update(
+            TableName=cls.environment.items_table_name,
+            KeyConditionExpression=key_condition.condition_expression,
+            FilterExpression=item_filter.condition_expression,
+            ExpressionAttributeNames={
+                **key_condition.attribute_name_placeholders,
+                **item_filter.attribute_name_placeholders,
+            },
+            ExpressionAttributeValues={
+                placeholder: serializer.serialize(value)
+                for placeholder, value in {
+                    **key_condition.attribute_value_placeholders,
+                    **item_filter.attribute_value_placeholders,
+                }.items()
+            },
+        )
+        return query_arguments
 
     @classmethod
     def get_dynamodb_items(
-        cls, query_range: QueryRange, status: ScheduleStatus
+        cls,
+        query_range: QueryRange,
+        status: ScheduleStatus,
     ) -> Generator[DynamodbItem, None, None]:
 
         logger.info(
             f"Retrieving dynamodb items for range: {query_range}", extra=request_context
         )
 
-        # get start query dynamodb range
-        start_period_map = DSPeriodHasher.get_time_period_hash(query_range.start_time)
-        start_dynamodb_query_range = DynamodbQueryRange(
-            time_period_hash=start_period_map.time_period_hash, query_range=query_range
-        )
-
-        # get end query dynamodb range
-        end_period_map = DSPeriodHasher.get_time_period_hash(query_range.end_time)
-        end_dynamodb_query_range = DynamodbQueryRange(
-            time_period_hash=end_period_map.time_period_hash, query_range=query_range
+        # every period partition is queried concurrently, merged by trigger time
+        dynamodb_query_ranges = cls._get_dynamodb_query_ranges(query_range)
+        yield from concurrent_merge(
+            [
+                cls._get_schedule_items_for_ddb_query_range(
+                    dynamodb_query_range, status
+                )
+                for dynamodb_query_range in dynamodb_query_ranges
+            ],
+            key=lambda dynamodb_item: dynamodb_item.trigger_time,
         )
 
-        # retrieving items from the dynamodb
-        for item in cls._get_schedule_items_for_ddb_query_range(
-            start_dynamodb_query_range, status
-        ):
-            yield item
-
-        if start_dynamodb_query_range == end_dynamodb_query_range:
-            logger.info("Dynamodb items retrieved succesfully", extra=request_context)
-            return
+        logger.info("Dynamodb items retrieved succesfully", extra=request_context)
 
-        # special case
-        logger.info("Retrieving items for the next period", extra=request_context)
-        for item in cls._get_schedule_items_for_ddb_query_range(
-            end_dynamodb_query_range, status
-        ):
-            yield item
+    @classmethod
+    def _get_dynamodb_query_ranges(
+        cls, query_range: QueryRange
+    ) -> List[DynamodbQueryRange]:
+
+        # range can span several periods, every shard of a period is queried
+        period_maps = [
+            DSPeriodHasher.get_time_period_hash(period_time)
+            for period_time in PeriodKeys.get_period_times(
+                DSPeriodHasher.granularity, query_range.start_time, query_range.end_time
+            )
+        ]
+
+        # periods of previous granularities stay readable during migration
+        for granularity in DSPeriodHasher.migration_granularities:
+            for period_time in PeriodKeys.get_period_times(
+                granularity, query_range.start_time, query_range.end_time
+            ):
+                period_map = DSPeriodHasher.find_time_period_hash(
+                    period_time, granularity
+                )
+                if period_map is not None:
+                    period_maps.append(period_map)
+
+        period_hashes: List[str] = []
+        for period_map in period_maps:
+            for shard_hash in period_map.shard_hashes:
+                if shard_hash not in period_hashes:
+                    period_hashes.append(shard_hash)
+
+        dynamodb_query_ranges = [
+            DynamodbQueryRange(time_period_hash=period_hash, query_range=query_range)
+            for period_hash in period_hashes
+        ]
 
         logger.info(
-            "Items for the next period retrieved successfully", extra=request_context
+            f"Query ranges for {query_range}: {dynamodb_query_ranges}",
+            extra=request_context,
         )
+        return dynamodb_query_ranges
 
     @classmethod
     def get_schedule_items(
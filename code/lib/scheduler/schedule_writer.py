@@ -1,35 +1,53 @@
 #!/usr/bin/env python
 import logging
+import time
 from dataclasses import asdict
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
-import boto3  # type: ignore
 from boto3.dynamodb.conditions import Attr  # type: ignore
 from botocore.exceptions import ClientError  # type: ignore
+from lib.aws import AwsClients, cached_classproperty
+from lib.concurrency import bounded_map
 from lib.environment import Environment
 from lib.exceptions import OperationsError
 from lib.logging import request_context
 from lib.requests_handler.data import ScheduleRequest
 from lib.scheduler.data_mapper import DataMapper
 
-from .data import DynamodbItem, ScheduleItem, ScheduleStatus
+from .data import (
+    BatchWriteResult,
+    DynamodbItem,
+    ScheduleItem,
+    ScheduleStatus,
+    TimePeriodMap,
+)
 from .ds_hash import DSPeriodHasher
+from .payload_store import PayloadStore
 
 # resources
 logger = logging.getLogger(__name__)
-dynamodb_resource = boto3.resource("dynamodb")
-dynamodb_client = boto3.client("dynamodb")
 
 
 class DynamoScheduleWriter:
 
     # resources
     environment = Environment.dynamodb_scheduler_env()
-    table = dynamodb_resource.Table(environment.items_table_name)
+
+    @cached_classproperty
+    def table(cls):
+        return AwsClients.resource("dynamodb").Table(cls.environment.items_table_name)
+
+    @cached_classproperty
+    def client(cls):
+        return AwsClients.client("dynamodb")
 
     # constants
     time_period_hash_key = "time_period_hash"
     trigger_time_key = "trigger_time"
+    batch_write_size = 25
+    batch_write_max_retries = 5
+    batch_write_backoff = 0.05
+    transact_write_size = 100
 
     @classmethod
     def _remove_dynamodb_item_from_schedule(cls, dynamodb_item: DynamodbItem) -> None:
@@ -66,23 +84,160 @@ class DynamoScheduleWriter:
                 ),
             )
         except ClientError as e:
+            PayloadStore.delete(dynamodb_item.payload_ref)
             raise OperationsError(value=str(asdict(dynamodb_item)), message=str(e))
 
         logger.info("Item added to the schedule successfully", extra=request_context)
         return dynamodb_item.schedule_item
 
+    @classmethod
+    def add_many(
+        cls, schedule_requests: List[ScheduleRequest]
+    ) -> List[BatchWriteResult]:
+
+        logger.info(
+            f"Adding {len(schedule_requests)} schedule items to the schedule",
+            extra=request_context,
+        )
+
+        dynamodb_items = cls._create_dynamodb_items(schedule_requests)
+        results: List[BatchWriteResult] = []
+        for chunk_start in range(0, len(dynamodb_items), cls.batch_write_size):
+            chunk = dynamodb_items[chunk_start : chunk_start + cls.batch_write_size]
+            failed = cls._batch_write_chunk(chunk)
+            results.extend(cls._batch_write_results(chunk, chunk_start, failed))
+
+        logger.info(
+            f"Items added to the schedule: {sum(r.success for r in results)}",
+            extra=request_context,
+        )
+        return results
+
+    @classmethod
+    def _create_dynamodb_items(
+        cls, schedule_requests: List[ScheduleRequest]
+    ) -> List[DynamodbItem]:
+
+        # resolve every distinct period once
+        time_period_maps: Dict[str, TimePeriodMap] = {}
+        for schedule_request in schedule_requests:
+            period_key = DSPeriodHasher.get_period_key(schedule_request.schedule_time)
+            if period_key not in time_period_maps:
+                time_period_maps[period_key] = DSPeriodHasher.get_time_period_hash(
+                    schedule_request.schedule_time
+                )
+
+        # create items, batch write rejects duplicate keys
+        dynamodb_items: List[DynamodbItem] = []
+        keys = set()
+        for schedule_request in schedule_requests:
+            period_key = DSPeriodHasher.get_period_key(schedule_request.schedule_time)
+            while True:
+                dynamodb_item = cls._create_dynamodb_item(
+                    schedule_request, time_period_map=time_period_maps[period_key]
+                )
+                if cls._item_key(dynamodb_item) not in keys:
+                    break
+            keys.add(cls._item_key(dynamodb_item))
+            dynamodb_items.append(dynamodb_item)
+        return dynamodb_items
+
+    @classmethod
+    def _batch_write_results(
+        cls,
+        dynamodb_items: List[DynamodbItem],
+        chunk_start: int,
+        failed: Dict[Tuple[str, int], str],
+    ) -> List[BatchWriteResult]:
+        results = []
+        for index, dynamodb_item in enumerate(dynamodb_items, start=chunk_start):
+            message = failed.get(cls._item_key(dynamodb_item))
+            results.append(
+                BatchWriteResult(
+                    index=index,
+                    success=message is None,
+                    schedule_item=dynamodb_item.schedule_item,
+                    message=message,
+                )
+            )
+        return results
+
+    @classmethod
+    def _item_key(cls, dynamodb_item: DynamodbItem) -> Tuple[str, int]:
+        return dynamodb_item.time_period_hash, int(dynamodb_item.trigger_time)
+
+    @classmethod
+    def _record_key(cls, record: dict) -> Tuple[str, int]:
+        time_period_hash = record[cls.time_period_hash_key]
+        trigger_time = record[cls.trigger_time_key]
+
+        # low level client records are in attribute value format
+        if isinstance(time_period_hash, dict):
+            time_period_hash, trigger_time = time_period_hash["S"], trigger_time["N"]
+        return time_period_hash, int(trigger_time)
+
+    @classmethod
+    def _batch_write_chunk(
+        cls, dynamodb_items: List[DynamodbItem]
+    ) -> Dict[Tuple[str, int], str]:
+
+        # failure messages are returned by item key
+        table_name = cls.environment.items_table_name
+        if cls.environment.dynamodb_engine == "client":
+            client = cls.client
+            to_record = DataMapper.dynamodb_item_to_transact_record
+        else:
+            client = cls.table.meta.client
+            to_record = DataMapper.dynamodb_item_to_record
+
+        pending = {
+            cls._item_key(dynamodb_item): to_record(dynamodb_item)
+            for dynamodb_item in dynamodb_items
+        }
+
+        for attempt in range(cls.batch_write_max_retries + 1):
+            if attempt > 0:
+                time.sleep(cls.batch_write_backoff * 2 ** (attempt - 1))
+
+            request_items = [{"PutRequest": {"Item": r}} for r in pending.values()]
+            try:
+                response = client.batch_write_item(
+                    RequestItems={table_name: request_items}
+                )
+            except ClientError as e:
+                logger.error(f"Batch write failed: {e}", extra=request_context)
+                return {key: str(e) for key in pending}
+
+            unprocessed = response.get("UnprocessedItems", {}).get(table_name, [])
+            unprocessed_keys = {
+                cls._record_key(r["PutRequest"]["Item"]) for r in unprocessed
+            }
+            pending = {k: v for k, v in pending.items() if k in unprocessed_keys}
+            if not pending:
+                return {}
+
+            logger.info(
+                f"Retrying {len(pending)} unprocessed items", extra=request_context
+            )
+
+        return {key: "Item not processed" for key in pending}
+
     @classmethod
     def _create_dynamodb_item(
-        cls, schedule_request: ScheduleRequest, schedule_id: Optional[str] = None
+        cls,
+        schedule_request: ScheduleRequest,
+        schedule_id: Optional[str] = None,
+        time_period_map: Optional[TimePeriodMap] = None,
     ) -> DynamodbItem:
         logger.info(
             f"Creating dynamodb item from: {schedule_request}", extra=request_context
         )
 
         # get schedule period mapping
-        time_period_map = DSPeriodHasher.get_time_period_hash(
-            schedule_request.schedule_time
-        )
+        if time_period_map is None:
+            time_period_map = DSPeriodHasher.get_time_period_hash(
+                schedule_request.schedule_time
+            )
 
         schedule_item = ScheduleItem(
             schedule_time=schedule_request.schedule_time,
@@ -91,11 +246,17 @@ class DynamoScheduleWriter:
             schedule_id=schedule_id,
         )
 
+        # spread writes of the period across its shards
         dynamodb_item = DynamodbItem(
-            time_period_hash=time_period_map.time_period_hash,
+            time_period_hash=time_period_map.get_shard_hash(
+                str(schedule_item.schedule_id)
+            ),
             schedule_item=schedule_item,
         )
 
+        # large payloads go to the payload store, the item keeps a reference
+        dynamodb_item = PayloadStore.offload(dynamodb_item)
+
         logger.info(
             f"Dynamodb item created successfully: {dynamodb_item}",
             extra=request_context,
@@ -115,12 +276,388 @@ class DynamoScheduleWriter:
             "trigger_time": dynamodb_item.trigger_time,
         }
 
-        cls.table.update_item(
+        pending_update = (
+            {"Value": dynamodb_item.time_period_hash, "Action": "PUT"}
+            if status == ScheduleStatus.NOT_STARTED
+            else {"Action": "DELETE"}
+        )
+        # a new status ends the claim of the dispatcher holding the item, the
+        # client is used as workflows are started from worker threads
+        cls.table.meta.client.update_item(
+            TableName=cls.environment.items_table_name,
             Key=key_payload,
-            AttributeUpdates={"status": {"Value": status.value, "Action": "PUT"}},
+            AttributeUpdates={
+                "status": {"Value": status.value, "Action": "PUT"},
+                DataMapper.pending_period_hash_key: pending_update,
+                DataMapper.lease_owner_key: {"Action": "DELETE"},
+                DataMapper.lease_expiry_key: {"Action": "DELETE"},
+                DataMapper.leased_period_hash_key: {"Action": "DELETE"},
+            },
         )
         logger.info("Update completed successfully")
 
+    @classmethod
+    def update_dynamodb_items_status(
+        cls,
+        dynamodb_items: List[DynamodbItem],
+        status: ScheduleStatus,
+        expected_status: Optional[ScheduleStatus] = None,
+        max_workers: int = 1,
+    ) -> List[BatchWriteResult]:
+        logger.info(
+            f"Updating status of {len(dynamodb_items)} dynamodb items to {status}",
+            extra=request_context,
+        )
+
+        results = cls._transact_update_items(
+            dynamodb_items,
+            lambda dynamodb_item: cls._status_transact_item(
+                dynamodb_item, status, expected_status
+            ),
+            max_workers=max_workers,
+        )
+
+        logger.info(
+            f"Status updated for {sum(r.success for r in results)} items",
+            extra=request_context,
+        )
+        return results
+
+    @classmethod
+    def _transact_update_items(
+        cls,
+        dynamodb_items: List[DynamodbItem],
+        transact_item: Callable[[DynamodbItem], dict],
+        max_workers: int = 1,
+    ) -> List[BatchWriteResult]:
+        chunks, messages = cls._status_update_chunks(dynamodb_items)
+
+        def update_chunk(chunk: List[int]) -> Dict[int, str]:
+            failed = cls._transact_write(
+                [transact_item(dynamodb_items[index]) for index in chunk]
+            )
+            return {chunk[position]: message for position, message in failed.items()}
+
+        for chunk, failed, exception in bounded_map(
+            update_chunk, chunks, max_workers=max_workers
+        ):
+            if exception is not None:
+                failed = {index: str(exception) for index in chunk}
+            messages.update(failed or {})
+
+        return [
+            BatchWriteResult(
+                index=index,
+                success=index not in messages,
+                schedule_item=dynamodb_item.schedule_item,
+                message=messages.get(index),
+            )
+            for index, dynamodb_item in enumerate(dynamodb_items)
+        ]
+
+    @classmethod
+    def _status_update_chunks(
+        cls, dynamodb_items: List[DynamodbItem]
+    ) -> Tuple[List[List[int]], Dict[int, str]]:
+
+        # transaction can not touch the same item twice
+        messages: Dict[int, str] = {}
+        indexes: Dict[Tuple[str, int], int] = {}
+        for index, dynamodb_item in enumerate(dynamodb_items):
+            if cls._item_key(dynamodb_item) in indexes:
+                messages[index] = "Duplicate item in batch"
+                continue
+            indexes[cls._item_key(dynamodb_item)] = index
+
+        chunks = []
+        unique_indexes = list(indexes.values())
+        for chunk_start in range(0, len(unique_indexes), cls.transact_write_size):
+            chunks.append(
+                unique_indexes[chunk_start : chunk_start + cls.transact_write_size]
+            )
+        return chunks, messages
+
+    @classmethod
+    def _transact_write(cls, transact_items: List[dict]) -> Dict[int, str]:
+
+        # failure messages are returned by position in the chunk
+        pending = list(range(len(transact_items)))
+        failed: Dict[int, str] = {}
+
+        for attempt in range(cls.batch_write_max_retries + 1):
+            if attempt > 0:
+                time.sleep(cls.batch_write_backoff * 2 ** (attempt - 1))
+
+            try:
+                cls.client.transact_write_items(
+                    TransactItems=[transact_items[position] for position in pending]
+                )
+                return failed
+            except ClientError as e:
+                reasons = e.response.get("CancellationReasons")
+                if not reasons:
+                    failed.update({position: str(e) for position in pending})
+                    return failed
+
+            pending = cls._retry_positions(pending, reasons, failed)
+            if not pending:
+                return failed
+
+        failed.update({position: "Transaction not completed" for position in pending})
+        return failed
+
+    @classmethod
+    def _retry_positions(
+        cls, pending: List[int], reasons: List[dict], failed: Dict[int, str]
+    ) -> List[int]:
+
+        # drop items failing on their own, retry the rest of the transaction
+        retry = []
+        for position, reason in zip(pending, reasons):
+            code = reason.get("Code", "None")
+            if code in ("None", "TransactionConflict", "ThrottlingError"):
+                retry.append(position)
+            else:
+                failed[position] = f"{code}: {reason.get('Message', '')}"
+        return retry
+
+    @classmethod
+    def _status_transact_item(
+        cls,
+        dynamodb_item: DynamodbItem,
+        status: ScheduleStatus,
+        expected_status: Optional[ScheduleStatus],
+    ) -> dict:
+        key_payload = {
+            cls.time_period_hash_key: {"S": dynamodb_item.time_period_hash},
+            cls.trigger_time_key: {"N": str(int(dynamodb_item.trigger_time))},
+        }
+
+        update = {
+            "TableName": cls.environment.items_table_name,
+            "Key": key_payload,
+            "UpdateExpression": (
+                "SET #status = :status REMOVE #pending, #owner, #expiry, #leased"
+            ),
+            "ExpressionAttributeNames": {
+                "#status": "status",
+                "#pending": DataMapper.pending_period_hash_key,
+                "#owner": DataMapper.lease_owner_key,
+                "#expiry": DataMapper.lease_expiry_key,
+                "#leased": DataMapper.leased_period_hash_key,
+            },
+            "ExpressionAttributeValues": {":status": {"S": status.value}},
+        }
+        if status == ScheduleStatus.NOT_STARTED:
+            update["UpdateExpression"] = (
+                "SET #status = :status, #pending = :pending "
+                "REMOVE #owner, #expiry, #leased"
+            )
+            update["ExpressionAttributeValues"][":pending"] = {  # type: ignore
+                "S": dynamodb_item.time_period_hash
+            }
+
+        # never create items that were removed in the meantime
+        if expected_status is None:
+            update["ConditionExpression"] = "attribute_exists(#status)"
+        else:
+            update["ConditionExpression"] = "#status = :expected_status"
+            update["ExpressionAttributeValues"][":expected_status"] = {  # type: ignore
+                "S": expected_status.value
+            }
+        return {"Update": update}
+
+    @classmethod
+    def claim_dynamodb_items(
+        cls,
+        dynamodb_items: List[DynamodbItem],
+        lease_owner: str,
+        lease_expiry: int,
+        max_workers: int = 1,
+    ) -> List[BatchWriteResult]:
+        logger.info(
+            f"Claiming {len(dynamodb_items)} dynamodb items for {lease_owner}",
+            extra=request_context,
+        )
+
+        current_time = int(time.time())
+        results = cls._transact_update_items(
+            dynamodb_items,
+            lambda dynamodb_item: cls._claim_transact_item(
+                dynamodb_item, lease_owner, lease_expiry, current_time
+            ),
+            max_workers=max_workers,
+        )
+
+        logger.info(
+            f"Claimed {sum(r.success for r in results)} items", extra=request_context
+        )
+        return results
+
+    @classmethod
+    def complete_claims(
+        cls, dynamodb_items: List[DynamodbItem], max_workers: int = 1
+    ) -> List[BatchWriteResult]:
+        logger.info(
+            f"Completing claims of {len(dynamodb_items)} dynamodb items",
+            extra=request_context,
+        )
+
+        return cls._transact_update_items(
+            dynamodb_items, cls._complete_transact_item, max_workers=max_workers
+        )
+
+    @classmethod
+    def release_claims(
+        cls, dynamodb_items: List[DynamodbItem], max_workers: int = 1
+    ) -> List[BatchWriteResult]:
+        logger.info(
+            f"Releasing claims of {len(dynamodb_items)} dynamodb items",
+            extra=request_context,
+        )
+
+        return cls._transact_update_items(
+            dynamodb_items, cls._release_transact_item, max_workers=max_workers
+        )
+
+    @classmethod
+    def _claim_transact_item(
+        cls,
+        dynamodb_item: DynamodbItem,
+        lease_owner: str,
+        lease_expiry: int,
+        current_time: int,
+    ) -> dict:
+
+        # waiting items, expired leases and retries of the same claim succeed
+        return cls._lease_transact_item(
+            dynamodb_item,
+            "SET #status = :processing, #owner = :owner, #expiry = :expiry, "
+            "#leased = :leased REMOVE #pending",
+            "#status = :not_started OR (#status = :processing "
+            "AND (#owner = :owner OR #expiry < :now))",
+            {
+                ":processing": {"S": ScheduleStatus.PROCESSING.value},
+                ":not_started": {"S": ScheduleStatus.NOT_STARTED.value},
+                ":owner": {"S": lease_owner},
+                ":expiry": {"N": str(lease_expiry)},
+                ":leased": {"S": dynamodb_item.time_period_hash},
+                ":now": {"N": str(current_time)},
+            },
+        )
+
+    @classmethod
+    def _complete_transact_item(cls, dynamodb_item: DynamodbItem) -> dict:
+
+        # lease is dropped, a published item is never claimed again
+        return cls._lease_transact_item(
+            dynamodb_item,
+            "REMOVE #owner, #expiry, #leased",
+            "#owner = :owner",
+            {":owner": {"S": str(dynamodb_item.lease_owner)}},
+        )
+
+    @classmethod
+    def _release_transact_item(cls, dynamodb_item: DynamodbItem) -> dict:
+
+        # item waits for dispatch again unless the lease changed hands
+        return cls._lease_transact_item(
+            dynamodb_item,
+            "SET #status = :not_started, #pending = :pending "
+            "REMOVE #owner, #expiry, #leased",
+            "#owner = :owner AND #expiry = :expiry",
+            {
+                ":not_started": {"S": ScheduleStatus.NOT_STARTED.value},
+                ":pending": {"S": dynamodb_item.time_period_hash},
+                ":owner": {"S": str(dynamodb_item.lease_owner)},
+                ":expiry": {"N": str(dynamodb_item.lease_expiry)},
+            },
+        )
+
+    @classmethod
+    def _lease_transact_item(
+        cls,
+        dynamodb_item: DynamodbItem,
+        update_expression: str,
+        condition_expression: str,
+        attribute_values: Dict[str, dict],
+    ) -> dict:
+        names = {
+            "#status": "status",
+            "#pending": DataMapper.pending_period_hash_key,
+            "#owner": DataMapper.lease_owner_key,
+            "#expiry": DataMapper.lease_expiry_key,
+            "#leased": DataMapper.leased_period_hash_key,
+        }
+
+        # expressions reject names they do not use
+        expressions = update_expression + condition_expression
+        return {
+            "Update": {
+                "TableName": cls.environment.items_table_name,
+                "Key": {
+                    cls.time_period_hash_key: {"S": dynamodb_item.time_period_hash},
+                    cls.trigger_time_key: {"N": str(int(dynamodb_item.trigger_time))},
+                },
+                "UpdateExpression": update_expression,
+                "ConditionExpression": condition_expression,
+                "ExpressionAttributeNames": {
+                    k: v for k, v in names.items() if k in expressions
+                },
+                "ExpressionAttributeValues": attribute_values,
+            }
+        }
+
+    @classmethod
+    def backfill_pending_period_hash(cls) -> int:
+        logger.info(
+            "Backfilling pending index attribute for waiting items",
+            extra=request_context,
+        )
+
+        # items written before the sparse index was introduced
+        scan_arguments = {
+            "FilterExpression": Attr("status").eq(ScheduleStatus.NOT_STARTED.value)
+            & Attr(DataMapper.pending_period_hash_key).not_exists(),
+            "ProjectionExpression": "#tph, #tt",
+            "ExpressionAttributeNames": {
+                "#tph": cls.time_period_hash_key,
+                "#tt": cls.trigger_time_key,
+            },
+        }
+
+        updated = 0
+        while True:
+            response = cls.table.scan(**scan_arguments)
+            for key_payload in response["Items"]:
+                try:
+                    cls.table.update_item(
+                        Key=key_payload,
+                        UpdateExpression="SET #pending = :pending",
+                        ConditionExpression="#status = :status",
+                        ExpressionAttributeNames={
+                            "#pending": DataMapper.pending_period_hash_key,
+                            "#status": "status",
+                        },
+                        ExpressionAttributeValues={
+                            ":pending": key_payload[cls.time_period_hash_key],
+                            ":status": ScheduleStatus.NOT_STARTED.value,
+                        },
+                    )
+                    updated += 1
+                except ClientError as e:
+                    logger.info(
+                        f"Item skipped during backfill: {key_payload}: {e}",
+                        extra=request_context,
+                    )
+
+            if "LastEvaluatedKey" not in response:
+                break
+            scan_arguments["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+        logger.info(f"Backfilled items: {updated}", extra=request_context)
+        return updated
+
     @classmethod
     def update_dynamodb_item(
         cls, dynamodb_item: DynamodbItem, schedule_request: ScheduleRequest
@@ -145,22 +682,30 @@ class DynamoScheduleWriter:
             for k in (cls.time_period_hash_key, cls.trigger_time_key)
         }
 
-        dynamodb_client.transact_write_items(
-            TransactItems=[
-                {
-                    "Delete": {
-                        "TableName": cls.environment.items_table_name,
-                        "Key": old_key_payload,
+        # payload of a failed update is never referenced
+        try:
+            cls.client.transact_write_items(
+                TransactItems=[
+                    {
+                        "Delete": {
+                            "TableName": cls.environment.items_table_name,
+                            "Key": old_key_payload,
+                        },
                     },
-                },
-                {
-                    "Put": {
-                        "TableName": cls.environment.items_table_name,
-                        "Item": new_transact_record,
-                    }
-                },
-            ]
-        )
+                    {
+                        "Put": {
+                            "TableName": cls.environment.items_table_name,
+                            "Item": new_transact_record,
+                        }
+                    },
+                ]
+            )
+        except Exception:
+            PayloadStore.delete(new_dynamodb_item.payload_ref)
+            raise
+
+        # old payload is dropped only once the item points at the new one
+        PayloadStore.delete(dynamodb_item.payload_ref)
 
         logger.info("Item updated successfully", extra=request_context)
         return new_dynamodb_item
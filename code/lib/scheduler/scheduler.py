@@ -2,6 +2,7 @@
 from lib.requests_handler import ScheduleRequest
 
 from .data import ScheduleItem
+from .payload_store import PayloadStore
 from .schedule_reader import DynamoScheduleReader
 from .schedule_writer import DynamoScheduleWriter
 
@@ -11,6 +12,7 @@ class DynamoScheduler(DynamoScheduleWriter, DynamoScheduleReader):
     def remove_from_schedule(cls, schedule_id: str) -> None:
         dynamodb_item = DynamoScheduleReader.get_dynamodb_item(schedule_id)
         DynamoScheduleWriter._remove_dynamodb_item_from_schedule(dynamodb_item)
+        PayloadStore.delete(dynamodb_item.payload_ref)
 
     @classmethod
     def update_schedule_item(
@@ -1,10 +1,14 @@
 #!/usr/bin/env python
 from lib.dispatcher.data import LambdaProxySnsEvent
 from lib.dispatcher.dispatcher import Dispatcher
+from lib.dispatcher.time_budget import TimeBudget
 from lib.scheduler.data_mapper import DataMapper
 
 
 def lambda_handler(event, context):
     sns_event = LambdaProxySnsEvent(lambda_event=event)
     dynamodb_item = DataMapper.sns_payload_todynamodb_item(sns_event)
-    Dispatcher.trigger_lambda_workflow(dynamodb_item)
+    time_budget = TimeBudget.from_context(
+        context, Dispatcher.environment.deadline_margin_seconds
+    )
+    Dispatcher.trigger_lambda_workflow(dynamodb_item, time_budget)
@@ -1,18 +1,166 @@
 #!/usr/bin/env python
+import asyncio
 import time
+import uuid
+from dataclasses import asdict
+from typing import Optional
 
+from lib.dispatcher.async_dispatcher import AsyncDispatcher
+from lib.dispatcher.catch_up import CatchUp
+from lib.dispatcher.continuation import Continuation
+from lib.dispatcher.coordinator import RangeCoordinator
+from lib.dispatcher.cursor import DispatchCursor
+from lib.dispatcher.data import DispatchReport
 from lib.dispatcher.dispatcher import Dispatcher
+from lib.dispatcher.retry_window import RetryWindow
+from lib.dispatcher.time_budget import TimeBudget
 from lib.scheduler.data import QueryRange, ScheduleStatus
 from lib.scheduler.scheduler import DynamoScheduler
 
 
 def lambda_handler(event, context):
+    event = event or {}
+    environment = Dispatcher.environment
+    time_budget = TimeBudget.from_context(context, environment.deadline_margin_seconds)
+
+    # worker of a coordinated tick dispatches the sub ranges it leases
+    worker_event = event.get(RangeCoordinator.worker_event_key)
+    if worker_event:
+        return asdict(run_worker(worker_event, time_budget, context))
+
+    # continuation dispatches what an invocation out of time left behind
+    continuation = event.get(Continuation.event_key)
+    if continuation and continuation.get("catch_up"):
+        return asdict(catch_up(time_budget, context))
+    if continuation:
+        query_range = QueryRange(
+            start_time=continuation["start_time"], end_time=continuation["end_time"]
+        )
+        return asdict(
+            dispatch_tick(
+                query_range,
+                continuation["use_cursor"],
+                continuation["cursor"],
+                time_budget,
+                context,
+            )
+        )
+
     current_time = int(time.time())
-    start_time = current_time - 60
-    end_time = current_time + 60
-    query_range = QueryRange(start_time=start_time, end_time=end_time)
+    use_cursor = environment.dispatch_cursor and environment.dispatch_mode == "sns"
+
+    # with the cursor every item is read by one tick instead of two
+    cursor = DispatchCursor.load() if use_cursor else None
+    if use_cursor:
+        query_range = DispatchCursor.query_range(cursor, current_time)
+    else:
+        start_time = current_time - 60
+        end_time = current_time + 60
+        query_range = QueryRange(start_time=start_time, end_time=end_time)
+
+    # leases left by stopped pollers are dispatched again in this run
+    Dispatcher.release_expired_claims(query_range)
+
+    # engine loads its own windows for the whole run
+    if environment.dispatch_mode == "engine":
+        return asdict(Dispatcher.run_due_queue_engine(time_budget))
+
+    # workers publish the range, dispatch scales with their number
+    if environment.dispatch_mode == "coordinator":
+        workers = RangeCoordinator.fan_out(query_range, context.function_name)
+        return {"workers": workers}
+
+    # backlog behind the cursor is drained page by page until the deadline
+    if use_cursor and environment.catch_up:
+        return asdict(catch_up(time_budget, context, cursor, current_time))
+
+    return asdict(dispatch_tick(query_range, use_cursor, cursor, time_budget, context))
+
+
+def dispatch_tick(
+    query_range: QueryRange,
+    use_cursor: bool,
+    cursor: Optional[int],
+    time_budget: TimeBudget,
+    context,
+) -> DispatchReport:
+    dispatch_report = dispatch_query_range(query_range, time_budget)
+
+    # out of time, a fresh invocation dispatches the rest of the range
+    if time_budget.exhausted:
+        Continuation.invoke(
+            context.function_name,
+            {
+                "start_time": query_range.start_time,
+                "end_time": query_range.end_time,
+                "use_cursor": use_cursor,
+                "cursor": cursor,
+            },
+        )
+        return dispatch_report
+
+    # failed items are released, the window behind the cursor retries them
+    if use_cursor and DispatchCursor.advance(cursor, query_range.end_time):
+        retry_report = RetryWindow.run(
+            query_range.start_time, query_range.end_time, time_budget
+        )
+        dispatch_report = DispatchReport(
+            dispatched=dispatch_report.dispatched + retry_report.dispatched,
+            errors=dispatch_report.errors + retry_report.errors,
+        )
+    return dispatch_report
+
+
+def catch_up(
+    time_budget: TimeBudget,
+    context,
+    cursor: Optional[int] = None,
+    current_time: Optional[int] = None,
+) -> DispatchReport:
+
+    # continuation resumes at the cursor the previous invocation advanced
+    if current_time is None:
+        cursor = DispatchCursor.load()
+        current_time = int(time.time())
+
+    dispatch_report = CatchUp.run(cursor, current_time, time_budget)
+    if time_budget.exhausted:
+        Continuation.invoke(context.function_name, {"catch_up": True})
+    return dispatch_report
+
+
+def run_worker(worker_event: dict, time_budget: TimeBudget, context) -> DispatchReport:
+    query_range = QueryRange(
+        start_time=worker_event["start_time"], end_time=worker_event["end_time"]
+    )
+    lease_owner = worker_event.get("lease_owner") or str(uuid.uuid4())
+    dispatch_report = RangeCoordinator.run_worker(
+        query_range, worker_event["worker"], lease_owner, time_budget
+    )
+
+    # continuing worker takes over its own leases right away
+    if time_budget.exhausted:
+        RangeCoordinator.invoke_worker(
+            Dispatcher.environment.worker_function_name or context.function_name,
+            query_range,
+            worker_event["worker"],
+            lease_owner,
+        )
+    return dispatch_report
+
+
+def dispatch_query_range(
+    query_range: QueryRange, time_budget: TimeBudget
+) -> DispatchReport:
+
+    # query and publish of sns dispatch on one event loop
+    environment = Dispatcher.environment
+    if environment.io_mode == "async" and environment.dispatch_mode == "sns":
+        return asyncio.run(
+            AsyncDispatcher.dispatch_query_range(query_range, time_budget)
+        )
 
-    for dynamodb_item in DynamoScheduler.get_dynamodb_items(
+    dynamodb_items = DynamoScheduler.get_dynamodb_items(
         query_range, ScheduleStatus.NOT_STARTED
-    ):
-        Dispatcher.dispatch_dynamodb_item(dynamodb_item)
+    )
+    return Dispatcher.dispatch_dynamodb_items(dynamodb_items, time_budget)
@@ -2,12 +2,21 @@
 import io
 import json
 import os
+import socket
+import threading
+import urllib.request
 import zipfile
 
 import boto3  # type: ignore
 import pytest  # type: ignore
 from lib.environment import Environment
-from moto import mock_dynamodb, mock_iam, mock_lambda, mock_sns  # type: ignore
+from moto import (  # type: ignore
+    mock_dynamodb,
+    mock_iam,
+    mock_lambda,
+    mock_s3,
+    mock_sns,
+)
 from pytest_mock import MockerFixture  # type: ignore
 
 
@@ -31,6 +40,8 @@ def patch_environment(mocker: MockerFixture, aws_credentials):
     items_table_name = "schedule_items"
     hash_table_name = "period_hashes"
     index_name = "gsi_id"
+    pending_index_name = "gsi_pending"
+    leased_index_name = "gsi_leased"
     dispatcher_topic_name = "dispatcher_sns"
 
     mocker.patch.dict(
@@ -41,60 +52,127 @@ def patch_environment(mocker: MockerFixture, aws_credentials):
             Environment.schedule_id_index_env_name: index_name,
         },
     )
-    return items_table_name, index_name, hash_table_name, dispatcher_topic_name
+    return (
+        items_table_name,
+        index_name,
+        hash_table_name,
+        dispatcher_topic_name,
+        pending_index_name,
+        leased_index_name,
+    )
+
+
+def create_schedule_tables(dynamodb, patch_environment):
+    # create items table
+    dynamodb.create_table(
+        TableName=patch_environment[0],
+        KeySchema=[
+            {"AttributeName": "time_period_hash", "KeyType": "HASH"},
+            {"AttributeName": "trigger_time", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "time_period_hash", "AttributeType": "S"},
+            {"AttributeName": "trigger_time", "AttributeType": "N"},
+            {"AttributeName": "schedule_id", "AttributeType": "S"},
+            {"AttributeName": "pending_period_hash", "AttributeType": "S"},
+            {"AttributeName": "leased_period_hash", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+        SSESpecification={
+            "Enabled": True,
+        },
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": patch_environment[1],
+                "KeySchema": [
+                    {"AttributeName": "schedule_id", "KeyType": "HASH"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+            {
+                "IndexName": patch_environment[4],
+                "KeySchema": [
+                    {"AttributeName": "pending_period_hash", "KeyType": "HASH"},
+                    {"AttributeName": "trigger_time", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+            {
+                "IndexName": patch_environment[5],
+                "KeySchema": [
+                    {"AttributeName": "leased_period_hash", "KeyType": "HASH"},
+                    {"AttributeName": "trigger_time", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+        ],
+    )
+
+    # create hash table
+    dynamodb.create_table(
+        TableName=patch_environment[2],
+        KeySchema=[
+            {"AttributeName": "time_period", "KeyType": "HASH"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "time_period", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+        SSESpecification={
+            "Enabled": True,
+        },
+    )
+
+
+def serialize_transactions(mocker: MockerFixture):
+    """Moto copies the tables on every transaction, which is not thread safe"""
+    from moto.dynamodb.models import DynamoDBBackend  # type: ignore
+
+    lock = threading.Lock()
+    transact_write_items = DynamoDBBackend.transact_write_items
+
+    def locked_transact_write_items(self, *args, **kwargs):
+        with lock:
+            return transact_write_items(self, *args, **kwargs)
+
+    mocker.patch.object(
+        DynamoDBBackend, "transact_write_items", locked_transact_write_items
+    )
 
 
 @pytest.fixture(scope="function")
-def dynamo_tables(aws_credentials, patch_environment):
+def dynamo_tables(aws_credentials, patch_environment, mocker: MockerFixture):
     with mock_dynamodb():
+        serialize_transactions(mocker)
         dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
 
-        # Create items table
-        dynamodb.create_table(
-            TableName=patch_environment[0],
-            KeySchema=[
-                {"AttributeName": "time_period_hash", "KeyType": "HASH"},
-                {"AttributeName": "trigger_time", "KeyType": "RANGE"},
-            ],
-            AttributeDefinitions=[
-                {"AttributeName": "time_period_hash", "AttributeType": "S"},
-                {"AttributeName": "trigger_time", "AttributeType": "N"},
-                {"AttributeName": "schedule_id", "AttributeType": "S"},
-            ],
-            BillingMode="PAY_PER_REQUEST",
-            SSESpecification={
-                "Enabled": True,
-            },
-            GlobalSecondaryIndexes=[
-                {
-                    "IndexName": patch_environment[1],
-                    "KeySchema": [
-                        {"AttributeName": "schedule_id", "KeyType": "HASH"},
-                    ],
-                    "Projection": {"ProjectionType": "ALL"},
-                }
-            ],
-        )
-
-        # create hash table
-        dynamodb.create_table(
-            TableName=patch_environment[2],
-            KeySchema=[
-                {"AttributeName": "time_period", "KeyType": "HASH"},
-            ],
-            AttributeDefinitions=[
-                {"AttributeName": "time_period", "AttributeType": "S"},
-            ],
-            BillingMode="PAY_PER_REQUEST",
-            SSESpecification={
-                "Enabled": True,
-            },
-        )
+        create_schedule_tables(dynamodb, patch_environment)
         items_table = dynamodb.Table(patch_environment[0])
         hash_table = dynamodb.Table(patch_environment[2])
+
+        # cached period maps point to the tables of the previous test
+        from lib.scheduler.ds_hash import DSPeriodHasher
+
+        DSPeriodHasher.invalidate_cache()
         yield items_table, hash_table
 
 
+@pytest.fixture(scope="function")
+def lease_table(dynamo_tables, mocker: MockerFixture):
+    dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+    table = dynamodb.create_table(
+        TableName="range_leases",
+        KeySchema=[{"AttributeName": "lease_key", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "lease_key", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+    from lib.dispatcher.range_lease import RangeLeases
+
+    mocker.patch.object(RangeLeases.environment, "lease_table_name", table.name)
+    yield table
+
+
 @pytest.fixture(scope="function")
 def sns(patch_environment, mocker: MockerFixture, aws_credentials):
     with mock_sns():
@@ -110,6 +188,65 @@ def sns(patch_environment, mocker: MockerFixture, aws_credentials):
         yield workflow_topic
 
 
+@pytest.fixture(scope="function")
+def payload_bucket(patch_environment, mocker: MockerFixture, aws_credentials):
+    with mock_s3():
+        s3_resource = boto3.resource("s3", region_name="us-east-1")
+        bucket = s3_resource.create_bucket(Bucket="schedule_payloads")
+
+        # offload every non empty payload
+        from lib.scheduler.payload_store import PayloadStore
+
+        mocker.patch.object(
+            PayloadStore.environment, "payload_bucket_name", bucket.name
+        )
+        mocker.patch.object(PayloadStore.environment, "payload_offload_threshold", 2)
+
+        yield bucket
+
+
+@pytest.fixture(scope="function")
+def moto_server(patch_environment, mocker: MockerFixture, aws_credentials):
+    """Moto in server mode, reached over http by sync and async clients"""
+    moto_server = pytest.importorskip("moto.server")
+    from lib.aws import AwsClients
+    from lib.scheduler.ds_hash import DSPeriodHasher
+
+    with socket.socket() as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        port = free_socket.getsockname()[1]
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=port)
+    server.start()
+
+    # backends are process wide, tables of earlier tests are dropped
+    endpoint_url = f"http://127.0.0.1:{port}"
+    reset_request = urllib.request.Request(
+        f"{endpoint_url}/moto-api/reset", method="POST"
+    )
+    urllib.request.urlopen(reset_request).close()  # nosec
+
+    # clients read the endpoint when they are created
+    mocker.patch.dict(os.environ, {"AWS_ENDPOINT_URL": endpoint_url})
+    AwsClients.reset()
+    DSPeriodHasher.invalidate_cache()
+
+    serialize_transactions(mocker)
+    dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+    create_schedule_tables(dynamodb, patch_environment)
+    sns_resource = boto3.resource("sns", region_name="us-east-1")
+    workflow_topic = sns_resource.create_topic(Name=patch_environment[3])
+    mocker.patch.dict(
+        os.environ, {Environment.dispatch_sns_env_name: workflow_topic.arn}
+    )
+
+    yield endpoint_url, workflow_topic
+
+    AwsClients.reset()
+    DSPeriodHasher.invalidate_cache()
+    urllib.request.urlopen(reset_request).close()  # nosec
+    server.stop()
+
+
 @pytest.fixture(scope="function")
 def workflow_role(aws_credentials):
     with mock_iam():
@@ -117,3 +117,18 @@ def test__update_schedule_item_exists(dynamo_tables):
     }
     response = lambda_handler(lambda_event, None)
     assert response["status_code"] == 200
+
+
+def test__add_many_to_schedule(dynamo_tables):
+    from api_gw.schedule_items import lambda_handler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_items = [
+        {"schedule_time": schedule_time, "workflow_arn": "test"} for _ in range(3)
+    ]
+    lambda_event = {
+        "httpMethod": "POST",
+        "body": json.dumps({"schedule_items": schedule_items}),
+    }
+    response = lambda_handler(lambda_event, None)
+    assert response["status_code"] == 200
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+import asyncio
+import time
+
+import pytest  # type: ignore
+
+pytest.importorskip("aiobotocore")
+
+
+def run(coroutine):
+    from lib.aws import AsyncAwsClients
+
+    async def run_and_close():
+        try:
+            return await coroutine
+        finally:
+            await AsyncAwsClients.close()
+
+    return asyncio.run(run_and_close())
+
+
+def test__async_scheduler_add_get_remove(moto_server):
+    from lib.exceptions import NotFound
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.async_scheduler import AsyncDynamoScheduler
+
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn",
+        schedule_time=int(time.time()) + 3 * 60,
+        workflow_payload={"key": "value"},
+    )
+    schedule_item = run(AsyncDynamoScheduler.add_to_schedule(schedule_request))
+    assert (
+        run(AsyncDynamoScheduler.get_schedule_item(schedule_item.schedule_id))
+        == schedule_item
+    )
+
+    run(AsyncDynamoScheduler.remove_from_schedule(schedule_item.schedule_id))
+    with pytest.raises(NotFound):
+        run(AsyncDynamoScheduler.get_schedule_item(schedule_item.schedule_id))
+
+
+def test__async_scheduler_get_schedule_item_finished(moto_server, mocker):
+    import boto3  # type: ignore
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.async_scheduler import AsyncDynamoScheduler
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.payload_store import PayloadStore
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    bucket = boto3.resource("s3", region_name="us-east-1").create_bucket(
+        Bucket="schedule_payloads"
+    )
+    mocker.patch.object(PayloadStore.environment, "payload_bucket_name", bucket.name)
+    mocker.patch.object(PayloadStore.environment, "payload_offload_threshold", 2)
+
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(
+            workflow_arn="test_arn",
+            schedule_time=int(time.time()) + 3 * 60,
+            workflow_payload={"values": list(range(100))},
+        )
+    )
+    assert run(
+        AsyncDynamoScheduler.get_schedule_item(schedule_item.schedule_id)
+    ) == DynamoScheduler.get_schedule_item(schedule_item.schedule_id)
+
+    # finished item has no payload left, it is read without it
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    DynamoScheduler.update_dynamodb_item_status(dynamodb_item, ScheduleStatus.COMPLETED)
+    PayloadStore.delete(dynamodb_item.payload_ref)
+
+    assert run(
+        AsyncDynamoScheduler.get_schedule_item(schedule_item.schedule_id)
+    ) == DynamoScheduler.get_schedule_item(schedule_item.schedule_id)
+    assert list(bucket.objects.all()) == []
+
+
+def test__async_scheduler_update_schedule_item(moto_server):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.async_scheduler import AsyncDynamoScheduler
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+    )
+
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn_2", schedule_time=schedule_time + 60
+    )
+    updated_item = run(
+        AsyncDynamoScheduler.update_schedule_item(
+            schedule_item.schedule_id, schedule_request
+        )
+    )
+
+    assert updated_item.workflow_arn == "test_arn_2"
+    assert DynamoScheduler.get_schedule_item(schedule_item.schedule_id) == updated_item
+
+
+def test__async_scheduler_get_dynamodb_items(moto_server, mocker):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.async_scheduler import AsyncDynamoScheduler
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.ds_hash import DSPeriodHasher
+
+    # items spread over shards, merged back by trigger time
+    mocker.patch.object(DSPeriodHasher.environment, "period_shard_count", 4)
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_requests = [
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time + i)
+        for i in range(60)
+    ]
+    results = run(AsyncDynamoScheduler.add_many(schedule_requests))
+    assert all(result.success for result in results)
+
+    async def collect():
+        query_range = QueryRange(
+            start_time=schedule_time - 60, end_time=schedule_time + 120
+        )
+        return [
+            dynamodb_item
+            async for dynamodb_item in AsyncDynamoScheduler.get_dynamodb_items(
+                query_range, ScheduleStatus.NOT_STARTED
+            )
+        ]
+
+    dynamodb_items = run(collect())
+    trigger_times = [dynamodb_item.trigger_time for dynamodb_item in dynamodb_items]
+    assert len(dynamodb_items) == 60
+    assert trigger_times == sorted(trigger_times)
+
+
+def test__async_scheduler_update_dynamodb_items_status(moto_server):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.async_scheduler import AsyncDynamoScheduler
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(
+            DynamoScheduler.add_to_schedule(
+                ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+            ).schedule_id
+        )
+        for _ in range(3)
+    ]
+    run(
+        AsyncDynamoScheduler.update_dynamodb_item_status(
+            dynamodb_items[0], ScheduleStatus.COMPLETED
+        )
+    )
+
+    # claimed item fails the expected status, the rest is updated
+    results = run(
+        AsyncDynamoScheduler.update_dynamodb_items_status(
+            dynamodb_items,
+            ScheduleStatus.PROCESSING,
+            expected_status=ScheduleStatus.NOT_STARTED,
+        )
+    )
+
+    assert [result.success for result in results] == [False, True, True]
+    assert [
+        DynamoScheduler.get_dynamodb_item(item.schedule_item.schedule_id).status
+        for item in dynamodb_items
+    ] == [
+        ScheduleStatus.COMPLETED,
+        ScheduleStatus.PROCESSING,
+        ScheduleStatus.PROCESSING,
+    ]
+
+
+def test__async_scheduler_claim_dynamodb_items(moto_server):
+    from dataclasses import replace
+
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.async_scheduler import AsyncDynamoScheduler
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(
+            DynamoScheduler.add_to_schedule(
+                ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+            ).schedule_id
+        )
+        for _ in range(2)
+    ]
+    lease_expiry = int(time.time()) + 60
+    DynamoScheduler.claim_dynamodb_items(dynamodb_items[:1], "owner_1", lease_expiry)
+
+    # item leased by another owner is skipped, released item waits again
+    results = run(
+        AsyncDynamoScheduler.claim_dynamodb_items(
+            dynamodb_items, "owner_2", lease_expiry
+        )
+    )
+    assert [result.success for result in results] == [False, True]
+
+    claimed_item = replace(
+        dynamodb_items[1], lease_owner="owner_2", lease_expiry=lease_expiry
+    )
+    results = run(AsyncDynamoScheduler.release_claims([claimed_item]))
+    assert results[0].success
+    assert (
+        DynamoScheduler.get_dynamodb_item(claimed_item.schedule_item.schedule_id).status
+        == ScheduleStatus.NOT_STARTED
+    )
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+from lib.aws import AwsClients, cached_classproperty
+
+
+def test__aws_clients_reused(aws_credentials):
+    AwsClients.reset()
+    client = AwsClients.client("dynamodb")
+
+    assert AwsClients.client("dynamodb") is client
+    assert AwsClients.resource("dynamodb") is AwsClients.resource("dynamodb")
+    assert AwsClients.client("sns") is not client
+
+
+def test__aws_clients_reset(aws_credentials):
+    client = AwsClients.client("dynamodb")
+    AwsClients.reset()
+    assert AwsClients.client("dynamodb") is not client
+
+
+def test__aws_clients_reset_cached_classproperty(aws_credentials):
+    class Test:
+        @cached_classproperty
+        def client(cls):
+            return AwsClients.client("dynamodb")
+
+    client = Test.client
+    AwsClients.reset()
+    assert Test.client is not client
+    assert Test.client is AwsClients.client("dynamodb")
+
+
+def test__aws_clients_config(aws_credentials, mocker):
+    mocker.patch.object(AwsClients.environment, "max_pool_connections", 64)
+    mocker.patch.object(
+        AwsClients.environment,
+        "client_overrides",
+        {"sns": {"max_pool_connections": 8, "read_timeout": 5}},
+    )
+    AwsClients.reset()
+
+    config = AwsClients.client("dynamodb").meta.config
+    assert config.max_pool_connections == 64
+    assert config.retries["mode"] == "adaptive"
+    assert config.connect_timeout == AwsClients.environment.connect_timeout
+    assert config.read_timeout == AwsClients.environment.read_timeout
+    assert config.tcp_keepalive is True
+
+    # overrides apply to resources of the service as well
+    sns_config = AwsClients.resource("sns").meta.client.meta.config
+    assert sns_config.max_pool_connections == 8
+    assert sns_config.read_timeout == 5
+    assert sns_config.connect_timeout == AwsClients.environment.connect_timeout
+    AwsClients.reset()
+
+
+def test__cached_classproperty():
+    calls = []
+
+    class Test:
+        name = "test"
+
+        @cached_classproperty
+        def value(cls):
+            calls.append(cls)
+            return f"{cls.name}_value"
+
+    assert calls == []
+    assert Test.value == "test_value"
+    assert Test().value == "test_value"
+    assert calls == [Test]
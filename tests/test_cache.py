@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+from lib.cache import TTLCache
+
+
+def test__ttl_cache_get_not_exists():
+    cache: TTLCache[str] = TTLCache()
+    assert cache.get("test") is None
+
+
+def test__ttl_cache_put_get():
+    cache: TTLCache[str] = TTLCache()
+    cache.put("test", "value")
+    assert cache.get("test") == "value"
+
+
+def test__ttl_cache_max_size():
+    cache: TTLCache[str] = TTLCache(max_size=2)
+    cache.put("test_1", "value_1")
+    cache.put("test_2", "value_2")
+
+    # refresh first key so the second one is evicted
+    cache.get("test_1")
+    cache.put("test_3", "value_3")
+
+    assert len(cache) == 2
+    assert cache.get("test_1") == "value_1"
+    assert cache.get("test_2") is None
+
+
+def test__ttl_cache_expired(mocker):
+    cache: TTLCache[str] = TTLCache(ttl=10)
+    monotonic = mocker.patch("lib.cache.time.monotonic", return_value=100.0)
+    cache.put("test", "value")
+
+    monotonic.return_value = 111.0
+    assert cache.get("test") is None
+
+
+def test__ttl_cache_invalidate():
+    cache: TTLCache[str] = TTLCache()
+    cache.put("test", "value")
+    cache.invalidate("test")
+    assert cache.get("test") is None
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+import time
+
+
+def test__catch_up_pages(sns, dynamo_tables):
+    from lib.dispatcher.catch_up import CatchUp
+
+    pages = CatchUp.pages(1000, 2500)
+    assert [(page.start_time, page.end_time) for page in pages] == [
+        (1000, 1600),
+        (1600, 2200),
+        (2200, 2500),
+    ]
+
+
+def test__catch_up_run(sns, dynamo_tables, mocker):
+    from lib.dispatcher.catch_up import CatchUp
+    from lib.dispatcher.cursor import DispatchCursor
+    from lib.dispatcher.time_budget import TimeBudget
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    current_time = int(time.time())
+    schedule_items = [
+        DynamoScheduler.add_to_schedule(
+            ScheduleRequest(
+                workflow_arn="test_arn", schedule_time=current_time + 150 + i * 700
+            )
+        )
+        for i in range(4)
+    ]
+    DispatchCursor.advance(None, current_time)
+
+    # poller was down for most of an hour, the backlog spans several periods
+    mocker.patch("time.time", return_value=current_time + 3000)
+    dispatch_report = CatchUp.run(
+        current_time, current_time + 3000, TimeBudget(lambda: 60, 10)
+    )
+
+    assert dispatch_report.dispatched == 4
+    assert dispatch_report.errors == []
+    assert DispatchCursor.load() == current_time + 3060
+    for schedule_item in schedule_items:
+        dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+        assert dynamodb_item.status == ScheduleStatus.PROCESSING
+
+
+def test__catch_up_run_deadline(sns, dynamo_tables, mocker):
+    from lib.dispatcher.catch_up import CatchUp
+    from lib.dispatcher.cursor import DispatchCursor
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.dispatcher.time_budget import TimeBudget
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    current_time = int(time.time())
+    DynamoScheduler.add_many(
+        [
+            ScheduleRequest(workflow_arn="test_arn", schedule_time=current_time + 150)
+            for _ in range(3)
+        ]
+    )
+    DispatchCursor.advance(None, current_time)
+    mocker.patch("time.time", return_value=current_time + 3000)
+    mocker.patch.object(Dispatcher.environment, "publish_batch_size", 1)
+
+    # time runs out after the first item, the page is read again next tick
+    remaining = iter([60, 60])
+    time_budget = TimeBudget(lambda: next(remaining, 0), 10)
+    dispatch_report = CatchUp.run(current_time, current_time + 3000, time_budget)
+
+    assert dispatch_report.dispatched == 1
+    assert time_budget.exhausted
+    assert DispatchCursor.load() == current_time
+
+
+def test__catch_up_run_failing_item(sns, dynamo_tables, mocker):
+    from lib.dispatcher.catch_up import CatchUp
+    from lib.dispatcher.cursor import DispatchCursor
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.dispatcher.time_budget import TimeBudget
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    current_time = int(time.time())
+    schedule_items = [
+        DynamoScheduler.add_to_schedule(
+            ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+        )
+        for schedule_time in (current_time + 150, current_time + 1500)
+    ]
+    DispatchCursor.advance(None, current_time)
+    mocker.patch("time.time", return_value=current_time + 3000)
+    mocker.patch.object(
+        DynamoScheduler.environment, "pending_index_name", "gsi_pending"
+    )
+
+    # one item always fails, the cursor still reaches the end of the backlog
+    bad_schedule_id = str(schedule_items[0].schedule_id)
+    dispatch_dynamodb_item = Dispatcher.dispatch_dynamodb_item
+
+    def failing_dispatch(dynamodb_item):
+        if str(dynamodb_item.schedule_item.schedule_id) == bad_schedule_id:
+            raise Exception("rejected")
+        dispatch_dynamodb_item(dynamodb_item)
+
+    mocker.patch.object(Dispatcher.environment, "publish_batch_size", 1)
+    mocker.patch.object(
+        Dispatcher, "dispatch_dynamodb_item", side_effect=failing_dispatch
+    )
+    dispatch_report = CatchUp.run(
+        current_time, current_time + 3000, TimeBudget(lambda: 60, 10)
+    )
+
+    # read once more right away, far behind the retry window it is set to error
+    assert dispatch_report.dispatched == 1
+    assert len(dispatch_report.errors) == 2
+    assert DispatchCursor.load() == current_time + 3060
+    assert [
+        DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id).status
+        for schedule_item in schedule_items
+    ] == [ScheduleStatus.ERROR, ScheduleStatus.PROCESSING]
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+import pytest  # type: ignore
+
+
+@pytest.mark.parametrize("codec", ["json", "fast_json", "zlib", "zstd"])
+def test__payload_codec_round_trip(codec):
+    from lib.scheduler.codecs import PayloadCodec, PayloadCodecs
+
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+
+    payload = {"name": "test", "values": list(range(100)), "nested": {"a": 1.5}}
+    value = PayloadCodecs.encode(PayloadCodec(codec), payload)
+
+    assert isinstance(value, bytes) == PayloadCodecs.is_binary(PayloadCodec(codec))
+    assert PayloadCodecs.decode(PayloadCodec(codec), value) == payload
+    assert (
+        PayloadCodecs.decode(PayloadCodec(codec), PayloadCodecs.to_text(value))
+        == payload
+    )
+
+
+def test__payload_codec_compresses():
+    from lib.scheduler.codecs import PayloadCodec, PayloadCodecs
+
+    payload = {"values": ["test_value"] * 1000}
+    assert len(PayloadCodecs.encode(PayloadCodec.ZLIB, payload)) < len(
+        PayloadCodecs.encode(PayloadCodec.JSON, payload)
+    )
+
+
+def test__data_mapper_mixed_codecs(patch_environment, mocker):
+    from lib.scheduler.codecs import PayloadCodec
+    from lib.scheduler.data import DynamodbItem, ScheduleItem
+    from lib.scheduler.data_mapper import DataMapper
+
+    dynamodb_item = DynamodbItem(
+        time_period_hash="test_hash",
+        schedule_item=ScheduleItem(
+            schedule_time=1000, workflow_arn="test_arn", workflow_payload={"a": 1}
+        ),
+    )
+
+    # legacy records carry no codec tag
+    legacy_record = DataMapper.dynamodb_item_to_record(dynamodb_item)
+    del legacy_record[DataMapper.payload_codec_key]
+
+    mocker.patch.object(DataMapper, "payload_codec", PayloadCodec.ZLIB)
+    record = DataMapper.dynamodb_item_to_record(dynamodb_item)
+    assert record[DataMapper.payload_codec_key] == "zlib"
+    assert isinstance(record["workflow_payload"], bytes)
+
+    for mixed_record in (legacy_record, record):
+        assert DataMapper.record_to_dynamodb_item(dict(mixed_record)) == dynamodb_item
+        assert (
+            DataMapper.record_to_dynamodb_item(dict(mixed_record), validate=False)
+            == dynamodb_item
+        )
+
+    transact_record = DataMapper.dynamodb_item_to_transact_record(dynamodb_item)
+    assert transact_record["workflow_payload"] == {"B": record["workflow_payload"]}
+    assert (
+        DataMapper.attribute_record_to_dynamodb_item(transact_record) == dynamodb_item
+    )
+
+
+def test__data_mapper_binary_sns_payload(mocker):
+    from lib.dispatcher import LambdaProxySnsEvent
+    from lib.scheduler.codecs import PayloadCodec
+    from lib.scheduler.data import DynamodbItem, ScheduleItem
+    from lib.scheduler.data_mapper import DataMapper
+
+    mocker.patch.object(DataMapper, "payload_codec", PayloadCodec.ZLIB)
+    dynamodb_item = DynamodbItem(
+        time_period_hash="test_hash",
+        schedule_item=ScheduleItem(
+            schedule_time=1000, workflow_arn="test_arn", workflow_payload={"a": 1}
+        ),
+    )
+
+    sns_event = LambdaProxySnsEvent(
+        lambda_event={
+            "Records": [
+                {
+                    "Sns": {
+                        "Message": DataMapper.dynamodb_item_to_sns_payload(
+                            dynamodb_item
+                        )
+                    }
+                }
+            ]
+        }
+    )
+    assert DataMapper.sns_payload_todynamodb_item(sns_event) == dynamodb_item
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+import threading
+import time
+
+from lib.concurrency import bounded_map, paced
+
+
+def test__bounded_map_serial():
+    results = list(bounded_map(lambda x: x * 2, range(5)))
+    assert [result for _, result, _ in results] == [0, 2, 4, 6, 8]
+
+
+def test__bounded_map_exception():
+    def function(x):
+        if x == 2:
+            raise ValueError("test")
+        return x
+
+    for max_workers in (1, 4):
+        results = list(bounded_map(function, range(5), max_workers=max_workers))
+        errors = [item for item, _, exception in results if exception is not None]
+
+        assert len(results) == 5
+        assert errors == [2]
+
+
+def test__bounded_map_max_in_flight():
+    lock = threading.Lock()
+    counters = {"in_flight": 0, "max_in_flight": 0}
+
+    def function(x):
+        with lock:
+            counters["in_flight"] += 1
+            counters["max_in_flight"] = max(
+                counters["max_in_flight"], counters["in_flight"]
+            )
+        time.sleep(0.01)
+        with lock:
+            counters["in_flight"] -= 1
+        return x
+
+    results = list(bounded_map(function, range(20), max_workers=8, max_in_flight=3))
+
+    assert sorted(result for _, result, _ in results) == list(range(20))
+    assert counters["max_in_flight"] <= 3
+
+
+def test__paced(mocker):
+    sleep = mocker.patch("time.sleep")
+    mocker.patch("time.monotonic", return_value=100.0)
+
+    # clock does not move, every item after the first waits its share
+    assert list(paced(range(4), rate=2)) == [0, 1, 2, 3]
+    assert [call.args[0] for call in sleep.call_args_list] == [0.5, 1.0, 1.5]
+
+    sleep.reset_mock()
+    assert list(paced(range(4), rate=0)) == [0, 1, 2, 3]
+    sleep.assert_not_called()
+
+
+def test__concurrent_merge():
+    from lib.concurrency import concurrent_merge
+
+    iterables = [range(0, 30, 3), range(1, 30, 3), range(2, 30, 3)]
+    merged = list(concurrent_merge(iterables, key=lambda x: x, max_buffer=2))
+    assert merged == list(range(30))
+
+
+def test__concurrent_merge_exception():
+    import pytest  # type: ignore
+    from lib.concurrency import concurrent_merge
+
+    def failing():
+        yield 1
+        raise ValueError("test")
+
+    with pytest.raises(ValueError):
+        list(concurrent_merge([range(10), failing()], key=lambda x: x))
+
+
+def test__concurrent_merge_close():
+    from lib.concurrency import concurrent_merge
+
+    def endless():
+        count = 0
+        while True:
+            yield count
+            count += 1
+
+    merged = concurrent_merge([endless(), endless()], key=lambda x: x, max_buffer=5)
+    assert [next(merged) for _ in range(4)] == [0, 0, 1, 1]
+    merged.close()
+
+
+def test__async_merge():
+    import asyncio
+
+    from lib.concurrency import async_merge
+
+    async def produce(start):
+        for item in range(start, 30, 3):
+            await asyncio.sleep(0)
+            yield item
+
+    async def merge():
+        iterables = [produce(0), produce(1), produce(2)]
+        return [item async for item in async_merge(iterables, key=lambda x: x)]
+
+    assert asyncio.run(merge()) == list(range(30))
+
+
+def test__async_merge_exception():
+    import asyncio
+
+    import pytest  # type: ignore
+    from lib.concurrency import async_merge
+
+    async def produce():
+        for item in range(10):
+            yield item
+
+    async def failing():
+        yield 1
+        raise ValueError("test")
+
+    async def merge():
+        iterables = [produce(), failing()]
+        return [item async for item in async_merge(iterables, key=lambda x: x)]
+
+    with pytest.raises(ValueError):
+        asyncio.run(merge())
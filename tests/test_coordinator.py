@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+import json
+import time
+
+
+def test__coordinator_split_query_range(sns):
+    from lib.dispatcher.coordinator import RangeCoordinator
+    from lib.scheduler.data import QueryRange
+
+    sub_ranges = RangeCoordinator.split_query_range(
+        QueryRange(start_time=100, end_time=220), 4
+    )
+    assert [(r.start_time, r.end_time) for r in sub_ranges] == [
+        (100, 130),
+        (130, 160),
+        (160, 190),
+        (190, 220),
+    ]
+
+    # narrow range has fewer sub ranges than partitions
+    sub_ranges = RangeCoordinator.split_query_range(
+        QueryRange(start_time=100, end_time=102), 4
+    )
+    assert [(r.start_time, r.end_time) for r in sub_ranges] == [(100, 101), (101, 102)]
+
+
+def test__range_leases_acquire_renew_complete(lease_table):
+    from lib.dispatcher.range_lease import RangeLeases
+
+    lease_expiry = int(time.time()) + 30
+
+    # active lease is exclusive, a finished range is never leased again
+    assert RangeLeases.acquire("100:130", "worker_1", lease_expiry)
+    assert RangeLeases.acquire("100:130", "worker_1", lease_expiry)
+    assert not RangeLeases.acquire("100:130", "worker_2", lease_expiry)
+    assert RangeLeases.renew("100:130", "worker_1", lease_expiry + 30)
+    assert not RangeLeases.renew("100:130", "worker_2", lease_expiry + 30)
+    assert RangeLeases.complete("100:130", "worker_1")
+    assert not RangeLeases.acquire("100:130", "worker_2", lease_expiry)
+
+
+def test__range_leases_takeover(lease_table):
+    from lib.dispatcher.range_lease import RangeLeases
+
+    # worker stopped, its expired lease is taken over
+    assert RangeLeases.acquire("100:130", "worker_1", int(time.time()) - 1)
+    assert RangeLeases.acquire("100:130", "worker_2", int(time.time()) + 30)
+    assert not RangeLeases.renew("100:130", "worker_1", int(time.time()) + 30)
+    assert not RangeLeases.complete("100:130", "worker_1")
+
+
+def test__coordinator_run_worker(sns, lease_table, mocker):
+    from lib.dispatcher.coordinator import RangeCoordinator
+    from lib.dispatcher.range_lease import RangeLeases
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_items = [
+        DynamoScheduler.add_to_schedule(
+            ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time + i)
+        )
+        for i in range(0, 120, 10)
+    ]
+    query_range = QueryRange(start_time=schedule_time, end_time=schedule_time + 120)
+
+    # one sub range is held by a running worker, renewed and left to it
+    sub_ranges = RangeCoordinator.split_query_range(query_range, 4)
+    range_key = RangeLeases.range_key(sub_ranges[1])
+    RangeLeases.acquire(range_key, "running_worker", int(time.time()) + 30)
+    sleep = mocker.patch(
+        "time.sleep",
+        side_effect=lambda seconds: RangeLeases.renew(
+            range_key, "running_worker", int(time.time()) + 30
+        ),
+    )
+
+    dispatch_report = RangeCoordinator.run_worker(query_range, 1)
+    sleep.assert_called_once()
+    assert dispatch_report.dispatched == 9
+    assert dispatch_report.errors == []
+    assert [
+        DynamoScheduler.get_dynamodb_item(item.schedule_id).status
+        for item in schedule_items
+    ] == [ScheduleStatus.PROCESSING] * 3 + [ScheduleStatus.NOT_STARTED] * 3 + [
+        ScheduleStatus.PROCESSING
+    ] * 6
+
+    # second worker finds every range leased or finished
+    assert RangeCoordinator.run_worker(query_range, 0).dispatched == 0
+
+
+def test__coordinator_run_worker_takeover(sns, lease_table, mocker):
+    from lib.dispatcher.coordinator import RangeCoordinator
+    from lib.dispatcher.range_lease import RangeLeases
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    DynamoScheduler.add_many(
+        [
+            ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time + i)
+            for i in range(0, 120, 10)
+        ]
+    )
+    query_range = QueryRange(start_time=schedule_time, end_time=schedule_time + 120)
+
+    # worker holding a sub range stopped, its lease expires within the tick
+    sub_ranges = RangeCoordinator.split_query_range(query_range, 4)
+    RangeLeases.acquire(
+        RangeLeases.range_key(sub_ranges[1]), "stopped_worker", int(time.time()) + 30
+    )
+    clock = [time.time()]
+    mocker.patch("time.time", side_effect=lambda: clock[0])
+    sleep = mocker.patch(
+        "time.sleep",
+        side_effect=lambda seconds: clock.__setitem__(0, clock[0] + seconds),
+    )
+
+    dispatch_report = RangeCoordinator.run_worker(query_range, 0)
+    assert dispatch_report.dispatched == 12
+    assert sleep.call_args.args[0] > 29
+    assert RangeLeases.held_until(RangeLeases.range_key(sub_ranges[1])) is None
+
+
+def test__coordinator_run_worker_lease_lost(sns, lease_table, mocker):
+    from lib.dispatcher.coordinator import RangeCoordinator
+    from lib.dispatcher.range_lease import RangeLeases
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    DynamoScheduler.add_many(
+        [
+            ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time + i)
+            for i in range(5)
+        ]
+    )
+
+    # renewal is due for every item and fails, nothing more is read
+    mocker.patch.object(RangeCoordinator.environment, "range_lease_seconds", 0)
+    mocker.patch.object(RangeCoordinator.environment, "range_partitions", 1)
+    mocker.patch.object(RangeLeases, "renew", return_value=False)
+
+    query_range = QueryRange(start_time=schedule_time, end_time=schedule_time + 60)
+    assert RangeCoordinator.run_worker(query_range, 0).dispatched == 0
+
+
+def test__workflow_starter_lambda_coordinator(sns, dynamo_tables, mocker):
+    from lib.aws import AwsClients
+    from lib.dispatcher.coordinator import RangeCoordinator
+    from lib.dispatcher.dispatcher import Dispatcher
+    from src.workflow_starter import lambda_handler
+
+    mocker.patch.object(Dispatcher.environment, "dispatch_mode", "coordinator")
+    mocker.patch.object(RangeCoordinator.environment, "coordinator_workers", 3)
+    invoke = mocker.patch.object(AwsClients.client("lambda"), "invoke")
+    context = mocker.Mock(function_name="workflow_starter")
+
+    assert lambda_handler({}, context) == {"workers": 3}
+
+    assert invoke.call_count == 3
+    payloads = [json.loads(call.kwargs["Payload"]) for call in invoke.call_args_list]
+    assert [payload["range_worker"]["worker"] for payload in payloads] == [0, 1, 2]
+    assert all(
+        call.kwargs["FunctionName"] == "workflow_starter"
+        and call.kwargs["InvocationType"] == "Event"
+        for call in invoke.call_args_list
+    )
+
+
+def test__workflow_starter_lambda_worker_continuation(sns, lease_table, mocker):
+    from lib.aws import AwsClients
+    from lib.dispatcher.coordinator import RangeCoordinator
+    from lib.dispatcher.dispatcher import Dispatcher
+    from src.workflow_starter import lambda_handler
+
+    mocker.patch.object(
+        Dispatcher.environment, "worker_function_name", "dispatch_worker"
+    )
+    invoke = mocker.patch.object(AwsClients.client("lambda"), "invoke")
+    context = mocker.Mock(
+        function_name="workflow_starter", get_remaining_time_in_millis=lambda: 0
+    )
+
+    # worker out of time continues in the configured worker function
+    current_time = int(time.time())
+    worker_event = {
+        "start_time": current_time,
+        "end_time": current_time + 60,
+        "worker": 1,
+        "lease_owner": "worker_1",
+    }
+    lambda_handler({RangeCoordinator.worker_event_key: worker_event}, context)
+
+    assert invoke.call_args.kwargs["FunctionName"] == "dispatch_worker"
+    payload = json.loads(invoke.call_args.kwargs["Payload"])
+    assert payload[RangeCoordinator.worker_event_key] == worker_event
@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+
+
+def test__dispatch_cursor_query_range(sns, dynamo_tables):
+    from lib.dispatcher.cursor import DispatchCursor
+
+    # first tick reads the rolling window, later ones start at the cursor
+    query_range = DispatchCursor.query_range(None, 1000)
+    assert (query_range.start_time, query_range.end_time) == (940, 1060)
+    query_range = DispatchCursor.query_range(1060, 1060)
+    assert (query_range.start_time, query_range.end_time) == (1060, 1120)
+
+    # backlog is drained in ranges the scheduler accepts
+    query_range = DispatchCursor.query_range(1000, 5000)
+    assert (query_range.start_time, query_range.end_time) == (1000, 1600)
+
+
+def test__dispatch_cursor_advance(sns, dynamo_tables):
+    from lib.dispatcher.cursor import DispatchCursor
+
+    assert DispatchCursor.load() is None
+    assert DispatchCursor.advance(None, 1060)
+    assert DispatchCursor.load() == 1060
+
+    # stale tick does not move the cursor back
+    assert not DispatchCursor.advance(None, 1000)
+    assert not DispatchCursor.advance(1000, 1120)
+    assert DispatchCursor.advance(1060, 1120)
+    assert DispatchCursor.load() == 1120
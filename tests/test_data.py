@@ -78,6 +78,23 @@ def test__lambda_proxy_request():
     LambdaProxyRequest(lambda_event=lambda_event)
 
 
+def test__schedule_request_workflow_payload():
+    from lib.requests_handler.data import ScheduleRequest
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        schedule_time=schedule_time, workflow_arn="test", workflow_payload={"a": 1}
+    )
+    assert schedule_request.workflow_payload == {"a": 1}
+
+    with pytest.raises(ValidationError):
+        ScheduleRequest(
+            schedule_time=schedule_time,
+            workflow_arn="test",
+            workflow_payload={"a": object()},
+        )
+
+
 def test__query_range_negative_diff():
     with pytest.raises(ValidationError):
         QueryRange(start_time=1, end_time=0)
@@ -86,3 +103,44 @@ def test__query_range_negative_diff():
 def test__query_range_too_big_range():
     with pytest.raises(ValidationError):
         QueryRange(start_time=0, end_time=11 * 60)
+
+
+def test__time_period_map_not_sharded():
+    from lib.scheduler.data import TimePeriodMap
+
+    period_map = TimePeriodMap(time_period="test", time_period_hash="test_hash")
+    assert period_map.shard_hashes == ["test_hash"]
+    assert period_map.get_shard_hash("test_id") == "test_hash"
+
+
+def test__time_period_map_sharded():
+    from lib.scheduler.data import TimePeriodMap
+
+    period_map = TimePeriodMap(
+        time_period="test", time_period_hash="test_hash", shard_count=4
+    )
+    shard_hash = period_map.get_shard_hash("test_id")
+
+    assert len(period_map.shard_hashes) == 4
+    assert shard_hash in period_map.shard_hashes
+    assert shard_hash == period_map.get_shard_hash("test_id")
+
+
+def test__record_to_dynamodb_item_trusted(patch_environment):
+    from dataclasses import asdict
+
+    from lib.scheduler.data import DynamodbItem, ScheduleItem
+    from lib.scheduler.data_mapper import DataMapper
+
+    dynamodb_item = DynamodbItem(
+        time_period_hash="test_hash",
+        schedule_item=ScheduleItem(
+            schedule_time=1000, workflow_arn="test_arn", workflow_payload={"a": 1}
+        ),
+    )
+    record = DataMapper.dynamodb_item_to_record(dynamodb_item)
+
+    trusted_item = DataMapper.record_to_dynamodb_item(dict(record), validate=False)
+    assert trusted_item == DataMapper.record_to_dynamodb_item(dict(record))
+    assert asdict(trusted_item) == asdict(dynamodb_item)
+    assert trusted_item.schedule_item.schedule_time_formatted == "1970-01-01 00:16"
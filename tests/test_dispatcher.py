@@ -24,6 +24,344 @@ def test__dispatcher_dispatch_schedule_item(sns, dynamo_tables):
     assert dynamodb_item_updated.status == ScheduleStatus.PROCESSING
 
 
+def test__dispatcher_dispatch_schedule_items(sns, dynamo_tables, mocker):
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    mocker.patch.object(Dispatcher.environment, "dispatch_max_workers", 4)
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(
+            DynamoScheduler.add_to_schedule(schedule_request).schedule_id
+        )
+        for _ in range(10)
+    ]
+
+    dispatch_report = Dispatcher.dispatch_dynamodb_items(dynamodb_items)
+
+    assert dispatch_report.dispatched == 10
+    assert dispatch_report.errors == []
+    for dynamodb_item in dynamodb_items:
+        dynamodb_item_updated = DynamoScheduler.get_dynamodb_item(
+            dynamodb_item.schedule_item.schedule_id
+        )
+        assert dynamodb_item_updated.status == ScheduleStatus.PROCESSING
+
+
+def test__dispatcher_dispatch_schedule_items_error(sns, dynamo_tables, mocker):
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(
+            DynamoScheduler.add_to_schedule(schedule_request).schedule_id
+        )
+        for _ in range(3)
+    ]
+
+    # first publish fails, the rest of the items is still dispatched
+    mocker.patch.object(Dispatcher.environment, "publish_batch_size", 1)
+    mocker.patch.object(
+        Dispatcher.sns_topic.meta.client,
+        "publish",
+        side_effect=[Exception("test"), None, None],
+    )
+
+    dispatch_report = Dispatcher.dispatch_dynamodb_items(dynamodb_items)
+
+    assert dispatch_report.dispatched == 2
+    assert len(dispatch_report.errors) == 1
+    assert dispatch_report.errors[0].schedule_id == (
+        dynamodb_items[0].schedule_item.schedule_id
+    )
+
+
+def test__dispatcher_dispatch_schedule_items_batch_partial_failure(
+    sns, dynamo_tables, mocker
+):
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(
+            DynamoScheduler.add_to_schedule(schedule_request).schedule_id
+        )
+        for _ in range(12)
+    ]
+
+    # second entry of every batch fails to publish
+    def publish_batch(TopicArn, PublishBatchRequestEntries):
+        return {
+            "Successful": [
+                {"Id": entry["Id"], "MessageId": "test"}
+                for entry in PublishBatchRequestEntries
+                if entry["Id"] != "1"
+            ],
+            "Failed": [
+                {"Id": "1", "Code": "InternalError", "SenderFault": False},
+            ],
+        }
+
+    publish_batch_mock = mocker.patch.object(
+        Dispatcher.sns_topic.meta.client, "publish_batch", side_effect=publish_batch
+    )
+
+    dispatch_report = Dispatcher.dispatch_dynamodb_items(dynamodb_items)
+
+    assert publish_batch_mock.call_count == 2
+    assert dispatch_report.dispatched == 10
+    assert {error.schedule_id for error in dispatch_report.errors} == {
+        dynamodb_items[1].schedule_item.schedule_id,
+        dynamodb_items[11].schedule_item.schedule_id,
+    }
+
+    failed_ids = {error.schedule_id for error in dispatch_report.errors}
+    for dynamodb_item in dynamodb_items:
+        schedule_id = dynamodb_item.schedule_item.schedule_id
+        dynamodb_item_updated = DynamoScheduler.get_dynamodb_item(schedule_id)
+        expected_status = (
+            ScheduleStatus.NOT_STARTED
+            if schedule_id in failed_ids
+            else ScheduleStatus.PROCESSING
+        )
+        assert dynamodb_item_updated.status == expected_status
+
+
+def test__dispatcher_dispatch_schedule_items_batch_request_error(
+    sns, dynamo_tables, mocker
+):
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(
+            DynamoScheduler.add_to_schedule(schedule_request).schedule_id
+        )
+        for _ in range(4)
+    ]
+
+    # second request raises, items of the first one are still completed
+    mocker.patch.object(Dispatcher, "publish_batch_max_entries", 2)
+    publish_batch = mocker.patch.object(
+        Dispatcher.sns_topic.meta.client,
+        "publish_batch",
+        side_effect=[
+            {"Successful": [{"Id": "0"}, {"Id": "1"}]},
+            Exception("test"),
+        ],
+    )
+
+    errors = Dispatcher.dispatch_dynamodb_item_batch(dynamodb_items)
+
+    assert publish_batch.call_count == 2
+    assert [error.schedule_id for error in errors] == [
+        dynamodb_item.schedule_item.schedule_id for dynamodb_item in dynamodb_items[2:]
+    ]
+    for index, dynamodb_item in enumerate(dynamodb_items):
+        dynamodb_item_updated = DynamoScheduler.get_dynamodb_item(
+            dynamodb_item.schedule_item.schedule_id
+        )
+        expected_status = (
+            ScheduleStatus.PROCESSING if index < 2 else ScheduleStatus.NOT_STARTED
+        )
+        assert dynamodb_item_updated.status == expected_status
+        assert dynamodb_item_updated.lease_owner is None
+
+
+def test__dispatcher_dispatch_schedule_items_claimed(sns, dynamo_tables, mocker):
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(
+            DynamoScheduler.add_to_schedule(schedule_request).schedule_id
+        )
+        for _ in range(3)
+    ]
+
+    # item leased by another poller is not published twice
+    DynamoScheduler.claim_dynamodb_items(
+        dynamodb_items[:1], "other_poller", int(time.time()) + 60
+    )
+    publish_batch = mocker.spy(Dispatcher.sns_topic.meta.client, "publish_batch")
+
+    dispatch_report = Dispatcher.dispatch_dynamodb_items(dynamodb_items)
+
+    assert dispatch_report.dispatched == 2
+    assert [error.schedule_id for error in dispatch_report.errors] == [
+        dynamodb_items[0].schedule_item.schedule_id
+    ]
+    assert len(publish_batch.call_args.kwargs["PublishBatchRequestEntries"]) == 2
+    for dynamodb_item in dynamodb_items[1:]:
+        dynamodb_item_updated = DynamoScheduler.get_dynamodb_item(
+            dynamodb_item.schedule_item.schedule_id
+        )
+        assert dynamodb_item_updated.status == ScheduleStatus.PROCESSING
+        assert dynamodb_item_updated.lease_owner is None
+
+
+def test__dispatcher_dispatch_schedule_item_publish_error(sns, dynamo_tables, mocker):
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+    )
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+
+    # claim is released when publish fails, the next poll retries the item
+    mocker.patch.object(
+        Dispatcher.sns_topic.meta.client, "publish", side_effect=Exception("test")
+    )
+    with pytest.raises(Exception, match="test"):
+        Dispatcher.dispatch_dynamodb_item(dynamodb_item)
+
+    dynamodb_item_updated = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert dynamodb_item_updated.status == ScheduleStatus.NOT_STARTED
+    assert dynamodb_item_updated.lease_owner is None
+
+
+def test__dispatcher_release_expired_claims(sns, dynamo_tables, mocker):
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    mocker.patch.object(DynamoScheduler.environment, "leased_index_name", "gsi_leased")
+    query_spy = mocker.spy(DynamoScheduler.table.meta.client, "query")
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(
+            DynamoScheduler.add_to_schedule(schedule_request).schedule_id
+        )
+        for _ in range(3)
+    ]
+
+    # poller stopped after the claim, only its expired lease is released
+    DynamoScheduler.claim_dynamodb_items(
+        dynamodb_items[:1], "stopped_poller", schedule_time + 60
+    )
+    DynamoScheduler.claim_dynamodb_items(
+        dynamodb_items[1:2], "running_poller", schedule_time + 10 * 60
+    )
+    DynamoScheduler.update_dynamodb_item_status(
+        dynamodb_items[2], ScheduleStatus.PROCESSING
+    )
+
+    # items are behind the range of the tick that finds the lease expired
+    mocker.patch("time.time", return_value=schedule_time + 90)
+    query_range = QueryRange(
+        start_time=schedule_time + 30, end_time=schedule_time + 150
+    )
+    query_spy.reset_mock()
+    assert Dispatcher.release_expired_claims(query_range) == 1
+    assert query_spy.call_args_list
+    assert all(
+        call.kwargs["IndexName"] == "gsi_leased" for call in query_spy.call_args_list
+    )
+
+    assert [
+        DynamoScheduler.get_dynamodb_item(item.schedule_item.schedule_id).status
+        for item in dynamodb_items
+    ] == [
+        ScheduleStatus.NOT_STARTED,
+        ScheduleStatus.PROCESSING,
+        ScheduleStatus.PROCESSING,
+    ]
+
+    # only the running lease is left in the index
+    response = dynamo_tables[0].scan(IndexName="gsi_leased")
+    assert [item["schedule_id"] for item in response["Items"]] == [
+        dynamodb_items[1].schedule_item.schedule_id
+    ]
+
+
+def test__dispatcher_release_expired_claims_interval(sns, dynamo_tables, mocker):
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+    )
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    DynamoScheduler.claim_dynamodb_items(
+        [dynamodb_item], "stopped_poller", schedule_time - 60
+    )
+
+    # without the leased index the window is read once per interval
+    get_dynamodb_items = mocker.spy(DynamoScheduler, "get_dynamodb_items")
+    interval = Dispatcher.release_interval_seconds
+    sweep_time = (schedule_time // interval + 1) * interval
+    for current_time in (sweep_time - 1, sweep_time + 60):
+        mocker.patch("time.time", return_value=current_time)
+        query_range = QueryRange(
+            start_time=current_time - 60, end_time=current_time + 60
+        )
+        assert Dispatcher.release_expired_claims(query_range) == 0
+    get_dynamodb_items.assert_not_called()
+
+    # sweep covers the ticks since the last one
+    mocker.patch("time.time", return_value=sweep_time + 30)
+    query_range = QueryRange(start_time=sweep_time - 30, end_time=sweep_time + 90)
+    assert Dispatcher.release_expired_claims(query_range) == 1
+    assert (
+        DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id).status
+        == ScheduleStatus.NOT_STARTED
+    )
+
+
+def test__dispatcher_split_publish_entries(sns):
+    from lib.dispatcher.dispatcher import Dispatcher
+
+    large_message = "x" * (100 * 1024)
+    entries = [{"Id": str(i), "Message": large_message} for i in range(5)]
+    entries += [{"Id": str(i), "Message": "x"} for i in range(5, 20)]
+
+    batches = Dispatcher._split_publish_entries(entries)
+
+    assert [len(batch) for batch in batches] == [2, 2, 10, 6]
+    assert [e for batch in batches for e in batch] == entries
+
+
 @pytest.mark.slow
 def test__dispatcher_trigger_lambda_workflow_exists(
     dynamo_tables, sns, lambda_function
@@ -66,3 +404,347 @@ def test__dispatcher_trigger_lambda_workflow_not_exists(
 
     dynamodb_item_updated = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
     assert dynamodb_item_updated.status == ScheduleStatus.ERROR
+
+
+def test__dispatcher_trigger_lambda_workflow_continuation(sns, dynamo_tables, mocker):
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.dispatcher.time_budget import TimeBudget
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(
+            workflow_arn="test_arn", schedule_time=int(time.time()) + 3 * 60
+        )
+    )
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    sleep = mocker.patch("time.sleep")
+    publish = mocker.patch.object(Dispatcher.sns_topic.meta.client, "publish")
+    start = mocker.patch.object(Dispatcher, "start_lambda_workflow")
+
+    # item is due after the deadline, published again right away
+    Dispatcher.trigger_lambda_workflow(dynamodb_item, TimeBudget(lambda: 60, 10))
+
+    sleep.assert_not_called()
+    publish.assert_called_once()
+    start.assert_not_called()
+
+
+def test__dispatcher_start_due_workflows(sns, dynamo_tables, mocker):
+    from lib.aws import AwsClients
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    mocker.patch.object(Dispatcher.environment, "dispatch_mode", "direct")
+    invoke = mocker.patch.object(AwsClients.client("lambda"), "invoke")
+
+    # last item is past the horizon and stays for the next poll
+    current_time = int(time.time())
+    schedule_items = [
+        DynamoScheduler.add_to_schedule(
+            ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+        )
+        for schedule_time in (
+            current_time + 130,
+            current_time + 125,
+            current_time + 200,
+        )
+    ]
+    # sleeping advances the clock
+    clock = [float(current_time + 100)]
+    mocker.patch("time.time", side_effect=lambda: clock[0])
+    sleep = mocker.patch(
+        "time.sleep",
+        side_effect=lambda seconds: clock.__setitem__(0, clock[0] + seconds),
+    )
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+        for schedule_item in schedule_items
+    ]
+
+    dispatch_report = Dispatcher.dispatch_dynamodb_items(dynamodb_items)
+
+    assert dispatch_report.dispatched == 2
+    assert invoke.call_count == 2
+    assert sleep.call_count == 2
+    assert clock[0] * 10**6 >= dynamodb_items[0].trigger_time
+    assert [
+        DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id).status
+        for schedule_item in schedule_items
+    ] == [
+        ScheduleStatus.COMPLETED,
+        ScheduleStatus.COMPLETED,
+        ScheduleStatus.NOT_STARTED,
+    ]
+    assert all(
+        DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id).lease_owner is None
+        for schedule_item in schedule_items
+    )
+
+
+def test__dispatcher_start_due_workflows_deadline(sns, dynamo_tables, mocker):
+    from lib.aws import AwsClients
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.dispatcher.time_budget import TimeBudget
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    mocker.patch.object(Dispatcher.environment, "dispatch_mode", "direct")
+    invoke = mocker.patch.object(AwsClients.client("lambda"), "invoke")
+
+    current_time = int(time.time())
+    schedule_items = [
+        DynamoScheduler.add_to_schedule(
+            ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+        )
+        for schedule_time in (current_time + 130, current_time + 160)
+    ]
+    # sleeping advances the clock
+    clock = [float(current_time + 120)]
+    mocker.patch("time.time", side_effect=lambda: clock[0])
+    mocker.patch(
+        "time.sleep",
+        side_effect=lambda seconds: clock.__setitem__(0, clock[0] + seconds),
+    )
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+        for schedule_item in schedule_items
+    ]
+
+    # only the item due before the deadline is held, the other is left over
+    time_budget = TimeBudget(lambda: current_time + 150 - clock[0], 0)
+    dispatch_report = Dispatcher.dispatch_dynamodb_items(dynamodb_items, time_budget)
+
+    assert dispatch_report.dispatched == 1
+    assert time_budget.exhausted
+    assert clock[0] < current_time + 150
+    invoke.assert_called_once()
+    assert [
+        DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id).status
+        for schedule_item in schedule_items
+    ] == [ScheduleStatus.COMPLETED, ScheduleStatus.NOT_STARTED]
+
+
+def test__dispatcher_run_due_queue_engine_deadline(sns, dynamo_tables, mocker):
+    from lib.aws import AwsClients
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.dispatcher.time_budget import TimeBudget
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    mocker.patch.object(Dispatcher.environment, "engine_run_seconds", 50)
+    invoke = mocker.patch.object(AwsClients.client("lambda"), "invoke")
+
+    current_time = int(time.time())
+    schedule_items = [
+        DynamoScheduler.add_to_schedule(
+            ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+        )
+        for schedule_time in (current_time + 130, current_time + 160)
+    ]
+    # sleeping advances the clock
+    clock = [float(current_time + 120)]
+    mocker.patch("time.time", side_effect=lambda: clock[0])
+    mocker.patch(
+        "time.sleep",
+        side_effect=lambda seconds: clock.__setitem__(0, clock[0] + seconds),
+    )
+
+    # the run ends at the deadline, the later item is left for the next tick
+    time_budget = TimeBudget(lambda: current_time + 150 - clock[0], 0)
+    dispatch_report = Dispatcher.run_due_queue_engine(time_budget)
+
+    assert dispatch_report.dispatched == 1
+    assert clock[0] <= current_time + 150
+    invoke.assert_called_once()
+    assert [
+        DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id).status
+        for schedule_item in schedule_items
+    ] == [ScheduleStatus.COMPLETED, ScheduleStatus.NOT_STARTED]
+
+
+def test__dispatcher_start_due_workflows_stopped(sns, dynamo_tables, mocker):
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    mocker.patch("time.sleep")
+    mocker.patch.object(
+        Dispatcher, "_start_lambda_workflows", side_effect=Exception("stopped")
+    )
+    mocker.patch.object(DynamoScheduler.environment, "leased_index_name", "gsi_leased")
+
+    current_time = int(time.time())
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=current_time + 150)
+    )
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+
+    # process stops while it holds the claimed item
+    mocker.patch("time.time", return_value=current_time + 120)
+    with pytest.raises(Exception, match="stopped"):
+        Dispatcher.start_due_workflows([dynamodb_item])
+
+    claimed_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert claimed_item.status == ScheduleStatus.PROCESSING
+    assert claimed_item.lease_owner == Dispatcher.lease_owner
+    assert claimed_item.lease_expiry > schedule_item.schedule_time
+
+    # lease outlives the hold, once expired the item waits for dispatch again
+    query_range = QueryRange(start_time=current_time + 90, end_time=current_time + 210)
+    assert Dispatcher.release_expired_claims(query_range) == 0
+    mocker.patch("time.time", return_value=claimed_item.lease_expiry + 1)
+    assert Dispatcher.release_expired_claims(query_range) == 1
+
+    released_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert released_item.status == ScheduleStatus.NOT_STARTED
+    assert released_item.lease_owner is None
+
+
+def test__dispatcher_lease_engine_items(sns, dynamo_tables, mocker):
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    warning = mocker.patch("lib.dispatcher.dispatcher.logger.warning")
+
+    current_time = int(time.time())
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(
+            DynamoScheduler.add_to_schedule(
+                ScheduleRequest(
+                    workflow_arn="test_arn", schedule_time=current_time + 150
+                )
+            ).schedule_id
+        )
+        for _ in range(2)
+    ]
+
+    # another poller claimed the first item after the window was loaded
+    DynamoScheduler.claim_dynamodb_items(
+        dynamodb_items[:1], "running_poller", current_time + 10 * 60
+    )
+
+    claimed_items = Dispatcher._lease_engine_items(dynamodb_items)
+    assert [item.schedule_item for item in claimed_items] == [
+        dynamodb_items[1].schedule_item
+    ]
+    warning.assert_called_once()
+    assert str(dynamodb_items[0].schedule_item.schedule_id) in warning.call_args[0][0]
+
+    # lease lasts while the item is held for the rest of the window
+    claimed_item = DynamoScheduler.get_dynamodb_item(
+        dynamodb_items[1].schedule_item.schedule_id
+    )
+    assert claimed_item.status == ScheduleStatus.PROCESSING
+    assert claimed_item.lease_owner == Dispatcher.lease_owner
+    assert claimed_item.lease_expiry >= current_time + Dispatcher.engine_lookahead
+
+
+def test__dispatcher_start_due_workflows_claimed(sns, dynamo_tables, mocker):
+    from lib.aws import AwsClients
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    mocker.patch("time.sleep")
+    invoke = mocker.patch.object(AwsClients.client("lambda"), "invoke")
+
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(
+            workflow_arn="test_arn", schedule_time=int(time.time()) + 3 * 60
+        )
+    )
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    DynamoScheduler.update_dynamodb_item_status(
+        dynamodb_item, ScheduleStatus.PROCESSING
+    )
+    mocker.patch("time.time", return_value=schedule_item.schedule_time)
+
+    dispatch_report = Dispatcher.start_due_workflows([dynamodb_item])
+    assert dispatch_report.dispatched == 0
+    assert len(dispatch_report.errors) == 1
+    invoke.assert_not_called()
+
+
+def test__async_dispatcher_dispatch_query_range(moto_server, mocker):
+    import asyncio
+
+    pytest.importorskip("aiobotocore")
+    from lib.dispatcher.async_dispatcher import AsyncDispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    _, workflow_topic = moto_server
+    mocker.patch.object(
+        AsyncDispatcher.environment, "dispatch_topic_arn", workflow_topic.arn
+    )
+    mocker.patch.object(AsyncDispatcher.environment, "async_max_in_flight", 2)
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_requests = [
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time + i)
+        for i in range(25)
+    ]
+    results = DynamoScheduler.add_many(schedule_requests)
+
+    query_range = QueryRange(start_time=schedule_time - 60, end_time=schedule_time + 60)
+    dispatch_report = asyncio.run(AsyncDispatcher.dispatch_query_range(query_range))
+
+    assert dispatch_report.dispatched == 25
+    assert dispatch_report.errors == []
+    for result in results:
+        dynamodb_item = DynamoScheduler.get_dynamodb_item(
+            result.schedule_item.schedule_id
+        )
+        assert dynamodb_item.status == ScheduleStatus.PROCESSING
+
+
+def test__async_dispatcher_dispatch_query_range_deadline(moto_server, mocker):
+    import asyncio
+
+    pytest.importorskip("aiobotocore")
+    from lib.dispatcher.async_dispatcher import AsyncDispatcher
+    from lib.dispatcher.time_budget import TimeBudget
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    _, workflow_topic = moto_server
+    mocker.patch.object(
+        AsyncDispatcher.environment, "dispatch_topic_arn", workflow_topic.arn
+    )
+    mocker.patch.object(AsyncDispatcher.environment, "async_max_in_flight", 1)
+
+    schedule_time = int(time.time()) + 3 * 60
+    results = DynamoScheduler.add_many(
+        [
+            ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time + i)
+            for i in range(25)
+        ]
+    )
+
+    # time runs out after the first batch, the rest is left for a continuation
+    remaining = iter([60])
+    time_budget = TimeBudget(lambda: next(remaining, 0), 10)
+    query_range = QueryRange(start_time=schedule_time - 60, end_time=schedule_time + 60)
+    dispatch_report = asyncio.run(
+        AsyncDispatcher.dispatch_query_range(query_range, time_budget)
+    )
+
+    assert dispatch_report.dispatched == 10
+    assert time_budget.exhausted
+    statuses = [
+        DynamoScheduler.get_dynamodb_item(result.schedule_item.schedule_id).status
+        for result in results
+    ]
+    assert statuses.count(ScheduleStatus.PROCESSING) == 10
+    assert statuses.count(ScheduleStatus.NOT_STARTED) == 15
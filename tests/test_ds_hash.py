@@ -66,3 +66,54 @@ def test__ds_hash_get_time_period_hash_not_exists(dynamo_tables):
     period_map = DSPeriodHasher.get_time_period_hash(schedule_time)
 
     assert period_map is not None
+
+
+def test__ds_hash_get_time_period_hash_cached(dynamo_tables, mocker):
+    from lib.scheduler.ds_hash import DSPeriodHasher
+
+    load_spy = mocker.spy(DSPeriodHasher, "_load_period_hash")
+    schedule_time = int(time.time()) + 3 * 60
+    period_map = DSPeriodHasher.get_time_period_hash(schedule_time)
+    period_map_2 = DSPeriodHasher.get_time_period_hash(schedule_time)
+
+    assert period_map == period_map_2
+    assert load_spy.call_count == 1
+
+
+def test__ds_hash_invalidate_cache(dynamo_tables, mocker):
+    from lib.scheduler.ds_hash import DSPeriodHasher
+
+    load_spy = mocker.spy(DSPeriodHasher, "_load_period_hash")
+    schedule_time = int(time.time()) + 3 * 60
+    period_map = DSPeriodHasher.get_time_period_hash(schedule_time)
+    DSPeriodHasher.invalidate_cache(schedule_time)
+    period_map_2 = DSPeriodHasher.get_time_period_hash(schedule_time)
+
+    assert period_map == period_map_2
+    assert load_spy.call_count == 2
+
+
+def test__ds_hash_add_period_hash_shard_count(dynamo_tables, mocker):
+    from lib.scheduler.ds_hash import DSPeriodHasher
+
+    mocker.patch.object(DSPeriodHasher.environment, "period_shard_count", 4)
+    DSPeriodHasher._add_period_hash("test_period")
+
+    # shard count changes do not affect existing periods
+    mocker.patch.object(DSPeriodHasher.environment, "period_shard_count", 8)
+    period_map = DSPeriodHasher._load_period_hash("test_period")
+    assert period_map.shard_count == 4
+
+
+def test__ds_hash_find_time_period_hash_not_exists(dynamo_tables):
+    from lib.scheduler.ds_hash import DSPeriodHasher
+    from lib.scheduler.periods import PeriodGranularity
+
+    schedule_time = int(time.time()) + 3 * 60
+    period_map = DSPeriodHasher.find_time_period_hash(
+        schedule_time, PeriodGranularity.HOUR
+    )
+    assert period_map is None
+
+    # lookup does not create the period
+    assert DSPeriodHasher.find_time_period_hash(schedule_time) is None
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+import random
+
+import pytest  # type: ignore
+
+
+def _dynamodb_item(trigger_time: int, time_period_hash: str = "test_hash"):
+    from lib.scheduler.data import DynamodbItem, ScheduleItem
+
+    return DynamodbItem(
+        time_period_hash=time_period_hash,
+        trigger_time=trigger_time,
+        schedule_item=ScheduleItem(
+            schedule_time=trigger_time // 10**6, workflow_arn="test_arn"
+        ),
+    )
+
+
+def _due_queue(backend: str):
+    from lib.dispatcher.due_queue import HeapDueQueue
+    from lib.dispatcher.timing_wheel import TimingWheel
+
+    return HeapDueQueue() if backend == "heap" else TimingWheel()
+
+
+@pytest.mark.parametrize("backend", ["heap", "wheel"])
+def test__due_queue_order(backend):
+    due_queue = _due_queue(backend)
+    for trigger_time, time_period_hash in (
+        (3 * 10**6, "test_hash"),
+        (1 * 10**6, "test_hash"),
+        (2 * 10**6, "test_hash"),
+        (1 * 10**6, "other_hash"),
+    ):
+        due_queue.push(_dynamodb_item(trigger_time, time_period_hash))
+
+    assert len(due_queue) == 4
+    assert due_queue.next_trigger_time() == 1 * 10**6
+    assert [i.trigger_time for i in due_queue.pop_due(2 * 10**6)] == [
+        1 * 10**6,
+        1 * 10**6,
+        2 * 10**6,
+    ]
+    assert due_queue.pop_due(2 * 10**6) == []
+    assert due_queue.next_trigger_time() == 3 * 10**6
+
+
+@pytest.mark.parametrize("backend", ["heap", "wheel"])
+def test__due_queue_empty(backend):
+    due_queue = _due_queue(backend)
+    assert not due_queue
+    assert due_queue.next_trigger_time() is None
+    assert due_queue.pop_due(10**6) == []
+
+
+@pytest.mark.parametrize("backend", ["heap", "wheel"])
+def test__due_queue_cancel_and_replace(backend):
+    due_queue = _due_queue(backend)
+    dynamodb_items = [_dynamodb_item(trigger_time * 10**6) for trigger_time in (5, 7)]
+    for dynamodb_item in dynamodb_items:
+        due_queue.push(dynamodb_item)
+
+    # same key replaces the held item
+    due_queue.push(dynamodb_items[1])
+    assert len(due_queue) == 2
+
+    assert due_queue.cancel(dynamodb_items[0])
+    assert not due_queue.cancel(dynamodb_items[0])
+    assert due_queue.next_trigger_time() == 7 * 10**6
+    assert due_queue.pop_due(10 * 10**6) == [dynamodb_items[1]]
+    assert len(due_queue) == 0
+
+
+def test__timing_wheel_matches_heap():
+    from lib.dispatcher.due_queue import HeapDueQueue
+    from lib.dispatcher.timing_wheel import TimingWheel
+
+    # items spread over seconds, minutes, hours and days
+    random.seed(7)
+    start_time = 1_700_000_000 * 10**6
+    timing_wheel, heap = TimingWheel(start_time=start_time), HeapDueQueue()
+    dynamodb_items = [
+        _dynamodb_item(start_time + random.randint(-10, 3 * 24 * 3600) * 10**6)
+        for _ in range(500)
+    ]
+    for dynamodb_item in dynamodb_items:
+        timing_wheel.push(dynamodb_item)
+        heap.push(dynamodb_item)
+    for dynamodb_item in dynamodb_items[::5]:
+        assert timing_wheel.cancel(dynamodb_item) == heap.cancel(dynamodb_item)
+
+    current_time = start_time
+    while heap:
+        assert timing_wheel.next_trigger_time() <= heap.next_trigger_time()
+        current_time += random.choice([1, 10**6, 37 * 10**6, 5 * 3600 * 10**6])
+        assert timing_wheel.pop_due(current_time) == heap.pop_due(current_time)
+        assert len(timing_wheel) == len(heap)
+
+
+def test__timing_wheel_out_of_order(mocker):
+    from lib.dispatcher.due_queue import HeapDueQueue
+    from lib.dispatcher.timing_wheel import TimingWheel
+
+    # wheel starts from the clock, earlier items pushed later are not fired early
+    start_time = 1_700_000_000
+    mocker.patch("time.time", return_value=start_time)
+    timing_wheel, heap = TimingWheel(), HeapDueQueue()
+    for offset in (50, 20, -5, 90):
+        dynamodb_item = _dynamodb_item((start_time + offset) * 10**6)
+        timing_wheel.push(dynamodb_item)
+        heap.push(dynamodb_item)
+
+    for offset in (0, 19, 20, 49, 50, 89, 90):
+        current_time = (start_time + offset) * 10**6
+        assert timing_wheel.pop_due(current_time) == heap.pop_due(current_time)
+        assert len(timing_wheel) == len(heap)
+    assert not timing_wheel
+
+
+def _fake_clock(mocker, start_time: float):
+    clock = [start_time]
+    mocker.patch("time.time", side_effect=lambda: clock[0])
+    mocker.patch(
+        "time.sleep",
+        side_effect=lambda seconds: clock.__setitem__(0, clock[0] + seconds),
+    )
+    return clock
+
+
+def test__due_queue_engine_dedupe_and_lateness(mocker):
+    from lib.dispatcher.due_queue import DueQueueEngine
+
+    start_time = 1000
+    clock = _fake_clock(mocker, start_time)
+
+    # every window returns the same items, they are claimed and fired once
+    dynamodb_items = [
+        _dynamodb_item(trigger_time)
+        for trigger_time in (1005 * 10**6 + 250000, 1012 * 10**6, 1100 * 10**6)
+    ]
+    loaded_ranges = []
+
+    def load_items(query_range):
+        loaded_ranges.append((query_range.start_time, query_range.end_time))
+        return [
+            dynamodb_item
+            for dynamodb_item in dynamodb_items
+            if dynamodb_item.trigger_time < query_range.end_time * 10**6
+        ]
+
+    claimed = []
+    fired = []
+    engine = DueQueueEngine(
+        load_items=load_items,
+        claim_items=lambda items: claimed.extend(items) or items,
+        fire_items=lambda items: fired.extend((clock[0], i) for i in items) or [],
+        lookahead=60,
+        reload_interval=10,
+    )
+    dispatch_report = engine.run(30)
+
+    assert loaded_ranges == [(940, 1030), (950, 1030), (960, 1030)]
+    assert claimed == dynamodb_items[:2]
+    assert [(fired_at * 10**6, i) for fired_at, i in fired] == [
+        (i.trigger_time, i) for i in dynamodb_items[:2]
+    ]
+    assert dispatch_report.dispatched == 2
+    assert dispatch_report.lateness.count == 2
+    assert dispatch_report.lateness.max_ms == 0
+
+
+def test__due_queue_engine_late_items(mocker):
+    from lib.dispatcher.data import DispatchError
+    from lib.dispatcher.due_queue import DueQueueEngine
+
+    _fake_clock(mocker, 1000)
+    dynamodb_items = [_dynamodb_item(990 * 10**6), _dynamodb_item(998 * 10**6)]
+
+    engine = DueQueueEngine(
+        load_items=lambda query_range: dynamodb_items,
+        claim_items=lambda items: items,
+        fire_items=lambda items: [
+            DispatchError(
+                schedule_id=str(items[0].schedule_item.schedule_id), message=""
+            )
+        ],
+        reload_interval=60,
+    )
+    dispatch_report = engine.run(5)
+
+    assert dispatch_report.dispatched == 1
+    assert len(dispatch_report.errors) == 1
+    assert dispatch_report.lateness.max_ms == 10000
+    assert dispatch_report.lateness.mean_ms == 6000
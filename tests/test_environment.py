@@ -14,3 +14,64 @@ def test__environment_patched(patch_environment):
 
     environment = Environment.dynamodb_scheduler_env()
     assert isinstance(environment, DynamodbSchedulerEnvironment)
+
+
+def test__environment_payload_codec(patch_environment, mocker):
+    import os
+
+    from lib.environment import Environment
+
+    mocker.patch.dict(os.environ, {Environment.payload_codec_env_name: "zlib"})
+
+    environment = Environment.dynamodb_scheduler_env()
+    assert environment.payload_codec == "zlib"
+
+
+def test__environment_payload_store(patch_environment, mocker):
+    import os
+
+    from lib.environment import Environment
+
+    mocker.patch.dict(
+        os.environ,
+        {
+            Environment.payload_bucket_env_name: "schedule_payloads",
+            Environment.payload_offload_threshold_env_name: "1024",
+        },
+    )
+
+    environment = Environment.dynamodb_scheduler_env()
+    assert environment.payload_bucket_name == "schedule_payloads"
+    assert environment.payload_offload_threshold == 1024
+
+
+def test__environment_aws_client(mocker):
+    import os
+
+    from lib.environment import Environment
+
+    mocker.patch.dict(
+        os.environ,
+        {
+            Environment.max_pool_connections_env_name: "100",
+            Environment.retry_mode_env_name: "standard",
+            Environment.tcp_keepalive_env_name: "false",
+            Environment.client_overrides_env_name: '{"lambda": {"read_timeout": 5}}',
+        },
+    )
+
+    environment = Environment.aws_client_env()
+    assert environment.max_pool_connections == 100
+    assert environment.retry_mode == "standard"
+    assert environment.tcp_keepalive is False
+    assert environment.client_overrides == {"lambda": {"read_timeout": 5}}
+
+
+def test__environment_aws_client_invalid_overrides(mocker):
+    import os
+
+    from lib.environment import Environment, EnvironmentConfigError
+
+    mocker.patch.dict(os.environ, {Environment.client_overrides_env_name: "{"})
+    with pytest.raises(EnvironmentConfigError):
+        Environment.aws_client_env()
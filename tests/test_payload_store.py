@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+import time
+
+import pytest  # type: ignore
+
+
+def test__payload_store_small_payload_inline(dynamo_tables, payload_bucket):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=int(time.time()) + 3 * 60
+    )
+    schedule_item = DynamoScheduler.add_to_schedule(schedule_request)
+
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert dynamodb_item.payload_ref is None
+    assert list(payload_bucket.objects.all()) == []
+
+
+def test__payload_store_offload(dynamo_tables, payload_bucket):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data_mapper import DataMapper
+    from lib.scheduler.payload_store import PayloadStore
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    workflow_payload = {"values": list(range(100))}
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn",
+        schedule_time=int(time.time()) + 3 * 60,
+        workflow_payload=workflow_payload,
+    )
+    schedule_item = DynamoScheduler.add_to_schedule(schedule_request)
+    assert schedule_item.workflow_payload == workflow_payload
+
+    # only the reference is stored in the table and sent through sns
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert dynamodb_item.payload_ref.startswith(
+        f"s3://{payload_bucket.name}/payloads/{schedule_item.schedule_id}/"
+    )
+    assert dynamodb_item.schedule_item.workflow_payload == {}
+    assert "values" not in DataMapper.dynamodb_item_to_sns_payload(dynamodb_item)
+
+    assert PayloadStore.load(dynamodb_item) == workflow_payload
+    assert DynamoScheduler.get_schedule_item(schedule_item.schedule_id) == schedule_item
+
+    DynamoScheduler.remove_from_schedule(schedule_item.schedule_id)
+    assert list(payload_bucket.objects.all()) == []
+
+
+def test__payload_store_update_inline(dynamo_tables, payload_bucket):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(
+            workflow_arn="test_arn",
+            schedule_time=schedule_time,
+            workflow_payload={"values": list(range(100))},
+        )
+    )
+    assert len(list(payload_bucket.objects.all())) == 1
+
+    DynamoScheduler.update_schedule_item(
+        schedule_item.schedule_id,
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time),
+    )
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert dynamodb_item.payload_ref is None
+    assert list(payload_bucket.objects.all()) == []
+
+
+def test__payload_store_update_offloaded(dynamo_tables, payload_bucket, mocker):
+    from botocore.exceptions import ClientError  # type: ignore
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(
+            workflow_arn="test_arn",
+            schedule_time=schedule_time,
+            workflow_payload={"values": list(range(100))},
+        )
+    )
+    payload_ref = DynamoScheduler.get_dynamodb_item(
+        schedule_item.schedule_id
+    ).payload_ref
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn",
+        schedule_time=schedule_time,
+        workflow_payload={"values": list(range(200))},
+    )
+
+    # failed update keeps the item and its payload as they were
+    transact_write_items = mocker.patch.object(
+        DynamoScheduler.client,
+        "transact_write_items",
+        side_effect=ClientError(
+            {"Error": {"Code": "TransactionCanceledException"}}, "TransactWriteItems"
+        ),
+    )
+    with pytest.raises(ClientError):
+        DynamoScheduler.update_schedule_item(
+            schedule_item.schedule_id, schedule_request
+        )
+
+    assert DynamoScheduler.get_schedule_item(schedule_item.schedule_id) == schedule_item
+    assert len(list(payload_bucket.objects.all())) == 1
+
+    # committed update points at a new object and drops the old one
+    mocker.stop(transact_write_items)
+    DynamoScheduler.update_schedule_item(schedule_item.schedule_id, schedule_request)
+
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert dynamodb_item.payload_ref != payload_ref
+    assert len(list(payload_bucket.objects.all())) == 1
+    assert DynamoScheduler.get_schedule_item(
+        schedule_item.schedule_id
+    ).workflow_payload == {"values": list(range(200))}
+
+
+def test__dispatcher_trigger_lambda_workflow_offloaded(
+    dynamo_tables, sns, payload_bucket, mocker
+):
+    import json
+
+    from lib.aws import AwsClients
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    workflow_payload = {"values": list(range(100))}
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(
+            workflow_arn="test_arn",
+            schedule_time=int(time.time()) + 3 * 60,
+            workflow_payload=workflow_payload,
+        )
+    )
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+
+    mocker.patch("time.sleep")
+    invoke = mocker.patch.object(AwsClients.client("lambda"), "invoke")
+    Dispatcher.trigger_lambda_workflow(dynamodb_item)
+
+    assert json.loads(invoke.call_args.kwargs["Payload"]) == workflow_payload
+    dynamodb_item_updated = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert dynamodb_item_updated.status == ScheduleStatus.COMPLETED
+
+    # payload is not kept once the workflow started
+    assert list(payload_bucket.objects.all()) == []
+    assert (
+        DynamoScheduler.get_schedule_item(schedule_item.schedule_id).workflow_payload
+        == {}
+    )
+
+
+def test__dispatcher_trigger_lambda_workflow_offloaded_error(
+    dynamo_tables, sns, payload_bucket, mocker
+):
+    from botocore.exceptions import ClientError  # type: ignore
+    from lib.aws import AwsClients
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(
+            workflow_arn="test_arn",
+            schedule_time=int(time.time()) + 3 * 60,
+            workflow_payload={"values": list(range(100))},
+        )
+    )
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+
+    mocker.patch("time.sleep")
+    mocker.patch.object(
+        AwsClients.client("lambda"),
+        "invoke",
+        side_effect=ClientError({"Error": {"Code": "ResourceNotFound"}}, "Invoke"),
+    )
+    Dispatcher.trigger_lambda_workflow(dynamodb_item)
+
+    dynamodb_item_updated = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert dynamodb_item_updated.status == ScheduleStatus.ERROR
+    assert list(payload_bucket.objects.all()) == []
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+from datetime import datetime, timezone
+
+from lib.scheduler.periods import PeriodGranularity, PeriodKeys
+
+
+def utc_timestamp(*args) -> int:
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+def test__period_key_hour():
+    timestamp = utc_timestamp(2022, 10, 18, 13, 45, 10)
+    period_key = PeriodKeys.get_period_key(PeriodGranularity.HOUR, timestamp)
+    assert period_key == "hour-2022-10-18T13"
+
+
+def test__period_key_week():
+    timestamp = utc_timestamp(2022, 10, 20, 13, 45, 10)
+    period_key = PeriodKeys.get_period_key(PeriodGranularity.WEEK, timestamp)
+    assert period_key == "week-2022-10-17T00"
+
+
+def test__period_key_quarter_legacy():
+    timestamp = int(datetime(2022, 11, 18, 13).timestamp())
+    period_key = PeriodKeys.get_period_key(PeriodGranularity.QUARTER, timestamp)
+    assert period_key == "2022-3"
+
+
+def test__next_period_start_quarter():
+    timestamp = int(datetime(2022, 11, 18, 13).timestamp())
+    next_period_start = PeriodKeys.get_next_period_start(
+        PeriodGranularity.QUARTER, timestamp
+    )
+    assert next_period_start == int(datetime(2023, 1, 1).timestamp())
+
+
+def test__period_times():
+    start_time = utc_timestamp(2022, 10, 18, 13, 58)
+    end_time = utc_timestamp(2022, 10, 18, 15, 0)
+    period_times = PeriodKeys.get_period_times(
+        PeriodGranularity.HOUR, start_time, end_time
+    )
+
+    assert period_times == [
+        start_time,
+        utc_timestamp(2022, 10, 18, 14),
+        utc_timestamp(2022, 10, 18, 15),
+    ]
+
+
+def test__period_times_single_period():
+    start_time = utc_timestamp(2022, 10, 18, 13, 0)
+    period_times = PeriodKeys.get_period_times(
+        PeriodGranularity.DAY, start_time, start_time + 600
+    )
+    assert period_times == [start_time]
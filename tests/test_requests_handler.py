@@ -57,3 +57,34 @@ def test__requests_handler_update_schedule_item(dynamo_tables):
     payload = {"schedule_id": schedule_id, **payload}
     response = RequestsHandler.update_schedule_item(payload, scheduler)
     assert response["status_code"] == 200
+
+
+def test__requests_handler_add_schedule_items(dynamo_tables):
+    from lib.requests_handler.requests_handler import RequestsHandler
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    scheduler = DynamoScheduler()
+    schedule_time = int(time.time()) + 3 * 60
+    payload = {
+        "schedule_items": [
+            {"schedule_time": schedule_time, "workflow_arn": "test"},
+            {"schedule_time": 0, "workflow_arn": "test"},
+            {"workflow_arn": "test"},
+            {"schedule_time": schedule_time + 60, "workflow_arn": "test"},
+        ]
+    }
+    response = RequestsHandler.add_schedule_items(payload, scheduler)
+    assert response["status_code"] == 200
+
+    results = json.loads(response["body"])["results"]
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result["success"] for result in results] == [True, False, False, True]
+
+
+def test__requests_handler_add_schedule_items_invalid(dynamo_tables):
+    from lib.requests_handler.requests_handler import RequestsHandler
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    scheduler = DynamoScheduler()
+    response = RequestsHandler.add_schedule_items({"schedule_items": []}, scheduler)
+    assert response["status_code"] == 400
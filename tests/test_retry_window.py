@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+import time
+
+
+def test__retry_window_expire(sns, dynamo_tables, mocker):
+    from lib.dispatcher.cursor import DispatchCursor
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.dispatcher.retry_window import RetryWindow
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+    from src.workflow_starter import lambda_handler
+
+    current_time = int(time.time())
+    schedule_items = [
+        DynamoScheduler.add_to_schedule(
+            ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+        )
+        for schedule_time in (current_time + 150, current_time + 200)
+    ]
+    mocker.patch.object(Dispatcher.environment, "dispatch_cursor", True)
+    mocker.patch.object(
+        DynamoScheduler.environment, "pending_index_name", "gsi_pending"
+    )
+    DispatchCursor.advance(None, current_time + 60)
+
+    # one item always fails, the cursor moves on and the other is dispatched
+    bad_schedule_id = str(schedule_items[0].schedule_id)
+    dispatch_dynamodb_item = Dispatcher.dispatch_dynamodb_item
+
+    def failing_dispatch(dynamodb_item):
+        if str(dynamodb_item.schedule_item.schedule_id) == bad_schedule_id:
+            raise Exception("rejected")
+        dispatch_dynamodb_item(dynamodb_item)
+
+    mocker.patch.object(Dispatcher.environment, "publish_batch_size", 1)
+    mocker.patch.object(
+        Dispatcher, "dispatch_dynamodb_item", side_effect=failing_dispatch
+    )
+
+    # retried by every tick while in the window, then set to error
+    errors = []
+    tick_time = current_time + 100
+    for _ in range(RetryWindow.window_seconds // 60 + 2):
+        mocker.patch("time.time", return_value=tick_time)
+        errors.append(len(lambda_handler({}, None)["errors"]))
+        tick_time += 60
+
+    assert DispatchCursor.load() == tick_time
+    assert errors[0] == 1 and sum(errors) > 2 and errors[-1] == 0
+    assert [
+        DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id).status
+        for schedule_item in schedule_items
+    ] == [ScheduleStatus.ERROR, ScheduleStatus.PROCESSING]
+
+
+def test__retry_window_interval(sns, dynamo_tables, mocker):
+    from lib.dispatcher.retry_window import RetryWindow
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    window_seconds = RetryWindow.window_seconds
+    current_time = int(time.time())
+    cursor = ((current_time + 300) // window_seconds + 1) * window_seconds
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=cursor - 100)
+    )
+
+    # without the pending index the window is read on one tick per interval
+    get_dynamodb_items = mocker.spy(DynamoScheduler, "get_dynamodb_items")
+    mocker.patch("time.time", return_value=cursor - 1)
+    assert RetryWindow.run(cursor, cursor + 60).dispatched == 0
+    get_dynamodb_items.assert_not_called()
+
+    mocker.patch("time.time", return_value=cursor + 10)
+    assert RetryWindow.run(cursor, cursor + 60).dispatched == 1
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert dynamodb_item.status == ScheduleStatus.PROCESSING
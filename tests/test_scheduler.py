@@ -138,3 +138,548 @@ def test__scheduler_update_item_not_exists(dynamo_tables):
 
     with pytest.raises(NotFound):
         DynamoScheduler.update_schedule_item("test", schedule_request)
+
+
+def test__scheduler_add_many(dynamo_tables):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_requests = [
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time + i)
+        for i in range(30)
+    ]
+    results = DynamoScheduler.add_many(schedule_requests)
+
+    assert len(results) == 30
+    assert all(result.success for result in results)
+    assert [result.index for result in results] == list(range(30))
+    for result in results:
+        schedule_item = DynamoScheduler.get_schedule_item(
+            result.schedule_item.schedule_id
+        )
+        assert schedule_item == result.schedule_item
+
+
+def test__scheduler_add_many_unprocessed_items(dynamo_tables, mocker):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    table_client = DynamoScheduler.table.meta.client
+    batch_write_item = table_client.batch_write_item
+
+    # first call leaves the last item unprocessed
+    def batch_write_item_once(RequestItems):
+        for table_name, request_items in RequestItems.items():
+            if batch_write_mock.call_count == 1:
+                batch_write_item(RequestItems={table_name: request_items[:-1]})
+                return {"UnprocessedItems": {table_name: request_items[-1:]}}
+        return batch_write_item(RequestItems=RequestItems)
+
+    batch_write_mock = mocker.patch.object(
+        table_client, "batch_write_item", side_effect=batch_write_item_once
+    )
+    mocker.patch("lib.scheduler.schedule_writer.time.sleep")
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_requests = [
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+        for _ in range(3)
+    ]
+    results = DynamoScheduler.add_many(schedule_requests)
+
+    assert batch_write_mock.call_count == 2
+    assert all(result.success for result in results)
+    DynamoScheduler.get_schedule_item(results[-1].schedule_item.schedule_id)
+
+
+def test__scheduler_add_many_not_processed(dynamo_tables, mocker):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    def batch_write_item_never(RequestItems):
+        return {"UnprocessedItems": RequestItems}
+
+    table_client = DynamoScheduler.table.meta.client
+    mocker.patch.object(
+        table_client, "batch_write_item", side_effect=batch_write_item_never
+    )
+    mocker.patch("lib.scheduler.schedule_writer.time.sleep")
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    results = DynamoScheduler.add_many([schedule_request])
+
+    assert not results[0].success
+    assert results[0].message is not None
+
+
+def test__scheduler_update_items_status(dynamo_tables):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_requests = [
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+        for _ in range(120)
+    ]
+    results = DynamoScheduler.add_many(schedule_requests)
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(result.schedule_item.schedule_id)
+        for result in results
+    ]
+
+    results = DynamoScheduler.update_dynamodb_items_status(
+        dynamodb_items,
+        ScheduleStatus.PROCESSING,
+        expected_status=ScheduleStatus.NOT_STARTED,
+        max_workers=2,
+    )
+
+    assert all(result.success for result in results)
+    for dynamodb_item in dynamodb_items:
+        dynamodb_item_updated = DynamoScheduler.get_dynamodb_item(
+            dynamodb_item.schedule_item.schedule_id
+        )
+        assert dynamodb_item_updated.status == ScheduleStatus.PROCESSING
+
+
+def test__scheduler_update_items_status_pending_index(dynamo_tables):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(
+            DynamoScheduler.add_to_schedule(schedule_request).schedule_id
+        )
+        for _ in range(2)
+    ]
+
+    def pending_ids():
+        response = dynamo_tables[0].scan(IndexName="gsi_pending")
+        return sorted(item["schedule_id"] for item in response["Items"])
+
+    # leaving NOT_STARTED drops the item from the index, returning adds it back
+    DynamoScheduler.update_dynamodb_items_status(
+        dynamodb_items, ScheduleStatus.PROCESSING
+    )
+    assert pending_ids() == []
+
+    DynamoScheduler.update_dynamodb_items_status(
+        dynamodb_items[:1], ScheduleStatus.NOT_STARTED
+    )
+    assert pending_ids() == [dynamodb_items[0].schedule_item.schedule_id]
+
+
+def test__scheduler_update_items_status_condition_failed(dynamo_tables):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(
+            DynamoScheduler.add_to_schedule(schedule_request).schedule_id
+        )
+        for _ in range(3)
+    ]
+    DynamoScheduler.update_dynamodb_item_status(
+        dynamodb_items[1], ScheduleStatus.COMPLETED
+    )
+    DynamoScheduler._remove_dynamodb_item_from_schedule(dynamodb_items[2])
+
+    results = DynamoScheduler.update_dynamodb_items_status(
+        dynamodb_items + [dynamodb_items[0]],
+        ScheduleStatus.PROCESSING,
+        expected_status=ScheduleStatus.NOT_STARTED,
+    )
+
+    assert [result.success for result in results] == [True, False, False, False]
+    dynamodb_item_updated = DynamoScheduler.get_dynamodb_item(
+        dynamodb_items[1].schedule_item.schedule_id
+    )
+    assert dynamodb_item_updated.status == ScheduleStatus.COMPLETED
+    with pytest.raises(NotFound):
+        DynamoScheduler.get_dynamodb_item(dynamodb_items[2].schedule_item.schedule_id)
+
+
+def test__scheduler_claim_dynamodb_items(dynamo_tables):
+    from dataclasses import replace
+
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    dynamodb_items = [
+        DynamoScheduler.get_dynamodb_item(
+            DynamoScheduler.add_to_schedule(schedule_request).schedule_id
+        )
+        for _ in range(3)
+    ]
+    lease_expiry = int(time.time()) + 60
+
+    # active lease is kept from other owners, the same owner may retry
+    results = DynamoScheduler.claim_dynamodb_items(
+        dynamodb_items[:2], "owner_1", lease_expiry
+    )
+    assert [result.success for result in results] == [True, True]
+    results = DynamoScheduler.claim_dynamodb_items(
+        dynamodb_items, "owner_2", lease_expiry
+    )
+    assert [result.success for result in results] == [False, False, True]
+    results = DynamoScheduler.claim_dynamodb_items(
+        dynamodb_items[:1], "owner_1", lease_expiry
+    )
+    assert [result.success for result in results] == [True]
+
+    dynamodb_item_claimed = DynamoScheduler.get_dynamodb_item(
+        dynamodb_items[0].schedule_item.schedule_id
+    )
+    assert dynamodb_item_claimed.status == ScheduleStatus.PROCESSING
+    assert dynamodb_item_claimed.lease_owner == "owner_1"
+    assert dynamodb_item_claimed.lease_expiry == lease_expiry
+
+    # completed claim is not taken over, released one waits for dispatch again
+    claimed_items = [
+        replace(item, lease_owner="owner_1", lease_expiry=lease_expiry)
+        for item in dynamodb_items[:2]
+    ]
+    assert DynamoScheduler.complete_claims(claimed_items[:1])[0].success
+    assert DynamoScheduler.release_claims(claimed_items[1:])[0].success
+    assert not DynamoScheduler.release_claims(claimed_items[1:])[0].success
+
+    dynamodb_item_completed = DynamoScheduler.get_dynamodb_item(
+        dynamodb_items[0].schedule_item.schedule_id
+    )
+    assert dynamodb_item_completed.status == ScheduleStatus.PROCESSING
+    assert dynamodb_item_completed.lease_owner is None
+    dynamodb_item_released = DynamoScheduler.get_dynamodb_item(
+        dynamodb_items[1].schedule_item.schedule_id
+    )
+    assert dynamodb_item_released.status == ScheduleStatus.NOT_STARTED
+    assert dynamodb_item_released.lease_owner is None
+
+    results = DynamoScheduler.claim_dynamodb_items(
+        dynamodb_items[:2], "owner_2", lease_expiry
+    )
+    assert [result.success for result in results] == [False, True]
+
+
+def test__scheduler_claim_dynamodb_items_expired_lease(dynamo_tables):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(
+        DynamoScheduler.add_to_schedule(
+            ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+        ).schedule_id
+    )
+
+    # lease of a stopped owner is taken over once expired
+    DynamoScheduler.claim_dynamodb_items(
+        [dynamodb_item], "owner_1", int(time.time()) - 1
+    )
+    results = DynamoScheduler.claim_dynamodb_items(
+        [dynamodb_item], "owner_2", int(time.time()) + 60
+    )
+
+    assert results[0].success
+    dynamodb_item_claimed = DynamoScheduler.get_dynamodb_item(
+        dynamodb_item.schedule_item.schedule_id
+    )
+    assert dynamodb_item_claimed.lease_owner == "owner_2"
+
+
+def test__scheduler_get_schedule_items_pending_index(dynamo_tables, mocker):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    mocker.patch.object(
+        DynamoScheduler.environment, "pending_index_name", "gsi_pending"
+    )
+    query_spy = mocker.spy(DynamoScheduler.table.meta.client, "query")
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    schedule_items = [
+        DynamoScheduler.add_to_schedule(schedule_request) for _ in range(3)
+    ]
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_items[0].schedule_id)
+    DynamoScheduler.update_dynamodb_item_status(dynamodb_item, ScheduleStatus.COMPLETED)
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_items[1].schedule_id)
+    DynamoScheduler.update_dynamodb_items_status(
+        [dynamodb_item], ScheduleStatus.PROCESSING
+    )
+
+    query_range = QueryRange(start_time=schedule_time, end_time=schedule_time + 60)
+    query_spy.reset_mock()
+    schedule_items_pending = list(
+        DynamoScheduler.get_schedule_items(query_range, ScheduleStatus.NOT_STARTED)
+    )
+
+    assert schedule_items_pending == [schedule_items[2]]
+    assert all(
+        call.kwargs["IndexName"] == "gsi_pending" for call in query_spy.call_args_list
+    )
+
+    # finished items are not present in the index at all
+    response = dynamo_tables[0].scan(IndexName="gsi_pending")
+    assert [item["schedule_id"] for item in response["Items"]] == [
+        schedule_items[2].schedule_id
+    ]
+
+
+def test__scheduler_backfill_pending_period_hash(dynamo_tables, mocker):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.data_mapper import DataMapper
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    dynamodb_item = DynamoScheduler._create_dynamodb_item(schedule_request)
+    record = DataMapper.dynamodb_item_to_record(dynamodb_item)
+    del record[DataMapper.pending_period_hash_key]
+    dynamo_tables[0].put_item(Item=record)
+
+    mocker.patch.object(
+        DynamoScheduler.environment, "pending_index_name", "gsi_pending"
+    )
+    query_range = QueryRange(start_time=schedule_time, end_time=schedule_time + 60)
+    assert not list(
+        DynamoScheduler.get_schedule_items(query_range, ScheduleStatus.NOT_STARTED)
+    )
+
+    assert DynamoScheduler.backfill_pending_period_hash() == 1
+    assert list(
+        DynamoScheduler.get_schedule_items(query_range, ScheduleStatus.NOT_STARTED)
+    ) == [dynamodb_item.schedule_item]
+
+
+def test__scheduler_get_dynamodb_items_filter(dynamo_tables, mocker):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    query_spy = mocker.spy(DynamoScheduler.table.meta.client, "query")
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    schedule_items = [
+        DynamoScheduler.add_to_schedule(schedule_request) for _ in range(2)
+    ]
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_items[0].schedule_id)
+    DynamoScheduler.update_dynamodb_item_status(dynamodb_item, ScheduleStatus.COMPLETED)
+
+    query_range = QueryRange(start_time=schedule_time, end_time=schedule_time + 60)
+    query_spy.reset_mock()
+    dynamodb_items = list(
+        DynamoScheduler.get_dynamodb_items(query_range, ScheduleStatus.NOT_STARTED)
+    )
+
+    assert [item.schedule_item for item in dynamodb_items] == [schedule_items[1]]
+    query_arguments = query_spy.call_args.kwargs
+    assert "FilterExpression" in query_arguments
+
+    # rows in other states are dropped before they are returned
+    response = query_spy.spy_return
+    assert response["Count"] == 1
+
+
+def test__scheduler_get_dynamodb_items_multiple_periods(dynamo_tables, mocker):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.ds_hash import DSPeriodHasher
+    from lib.scheduler.periods import PeriodGranularity
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    mocker.patch.object(DSPeriodHasher, "granularity", PeriodGranularity.HOUR)
+
+    # range spans the start of the next hour
+    period_start = ((int(time.time()) + 3 * 60) // 3600 + 1) * 3600
+    schedule_time = period_start - 15
+    schedule_requests = [
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time + i)
+        for i in range(0, 40, 5)
+    ]
+    DynamoScheduler.add_many(schedule_requests)
+
+    query_range = QueryRange(start_time=schedule_time, end_time=schedule_time + 30)
+    dynamodb_items = list(
+        DynamoScheduler.get_dynamodb_items(query_range, ScheduleStatus.NOT_STARTED)
+    )
+    trigger_times = [dynamodb_item.trigger_time for dynamodb_item in dynamodb_items]
+
+    assert (
+        len({dynamodb_item.time_period_hash for dynamodb_item in dynamodb_items}) == 2
+    )
+    assert trigger_times == sorted(trigger_times)
+    assert len(dynamodb_items) == 6
+
+
+def test__scheduler_period_granularity_migration(dynamo_tables, mocker):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.ds_hash import DSPeriodHasher
+    from lib.scheduler.periods import PeriodGranularity
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    schedule_item_quarter = DynamoScheduler.add_to_schedule(schedule_request)
+
+    # switch to day buckets, quarter ones are still read
+    mocker.patch.object(DSPeriodHasher, "granularity", PeriodGranularity.DAY)
+    mocker.patch.object(
+        DSPeriodHasher, "migration_granularities", (PeriodGranularity.QUARTER,)
+    )
+    schedule_item_day = DynamoScheduler.add_to_schedule(schedule_request)
+
+    query_range = QueryRange(start_time=schedule_time, end_time=schedule_time + 60)
+    schedule_items = list(
+        DynamoScheduler.get_schedule_items(query_range, ScheduleStatus.NOT_STARTED)
+    )
+    dynamodb_item_day = DynamoScheduler.get_dynamodb_item(schedule_item_day.schedule_id)
+
+    assert len(schedule_items) == 2
+    assert {item.schedule_id for item in schedule_items} == {
+        schedule_item_quarter.schedule_id,
+        schedule_item_day.schedule_id,
+    }
+    assert dynamodb_item_day.time_period_hash == (
+        DSPeriodHasher.get_time_period_hash(schedule_time).time_period_hash
+    )
+
+    # after migration quarter items are no longer read
+    mocker.patch.object(DSPeriodHasher, "migration_granularities", ())
+    schedule_items = list(
+        DynamoScheduler.get_schedule_items(query_range, ScheduleStatus.NOT_STARTED)
+    )
+    assert schedule_items == [schedule_item_day]
+
+
+def test__scheduler_sharded_period(dynamo_tables, mocker):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.ds_hash import DSPeriodHasher
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    mocker.patch.object(DSPeriodHasher.environment, "period_shard_count", 4)
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_requests = [
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time + i)
+        for i in range(20)
+    ]
+    results = DynamoScheduler.add_many(schedule_requests)
+    schedule_item = DynamoScheduler.add_to_schedule(schedule_requests[0])
+
+    query_range = QueryRange(start_time=schedule_time, end_time=schedule_time + 60)
+    dynamodb_items = list(
+        DynamoScheduler.get_dynamodb_items(query_range, ScheduleStatus.NOT_STARTED)
+    )
+    trigger_times = [dynamodb_item.trigger_time for dynamodb_item in dynamodb_items]
+
+    assert len(dynamodb_items) == 21
+    assert len({dynamodb_item.time_period_hash for dynamodb_item in dynamodb_items}) > 1
+    assert trigger_times == sorted(trigger_times)
+
+    # shard follows the schedule id through updates
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    DynamoScheduler.update_schedule_item(
+        schedule_item.schedule_id, schedule_requests[1]
+    )
+    dynamodb_item_updated = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert dynamodb_item.time_period_hash == dynamodb_item_updated.time_period_hash
+    assert results[0].success
+
+
+def test__scheduler_client_engine(dynamo_tables, mocker):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    mocker.patch.object(DynamoScheduler.environment, "dynamodb_engine", "client")
+    mocker.patch.object(
+        DynamoScheduler.environment, "pending_index_name", "gsi_pending"
+    )
+    query_spy = mocker.spy(DynamoScheduler.client, "query")
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_requests = [
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=schedule_time)
+        for _ in range(3)
+    ]
+    results = DynamoScheduler.add_many(schedule_requests)
+    assert all(result.success for result in results)
+
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(
+        results[0].schedule_item.schedule_id
+    )
+    DynamoScheduler.update_dynamodb_item_status(dynamodb_item, ScheduleStatus.COMPLETED)
+
+    query_range = QueryRange(start_time=schedule_time, end_time=schedule_time + 60)
+    dynamodb_items = list(
+        DynamoScheduler.get_dynamodb_items(query_range, ScheduleStatus.NOT_STARTED)
+    )
+    assert query_spy.call_args.kwargs["IndexName"] == "gsi_pending"
+    assert sorted(item.schedule_item.schedule_id for item in dynamodb_items) == sorted(
+        result.schedule_item.schedule_id for result in results[1:]
+    )
+
+    mocker.patch.object(DynamoScheduler.environment, "dynamodb_engine", "resource")
+    assert dynamodb_items == list(
+        DynamoScheduler.get_dynamodb_items(query_range, ScheduleStatus.NOT_STARTED)
+    )
+
+
+@pytest.mark.parametrize("dynamodb_engine", ["resource", "client"])
+def test__scheduler_mixed_payload_codecs(dynamo_tables, mocker, dynamodb_engine):
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.codecs import PayloadCodec
+    from lib.scheduler.data import QueryRange, ScheduleStatus
+    from lib.scheduler.data_mapper import DataMapper
+    from lib.scheduler.scheduler import DynamoScheduler
+
+    mocker.patch.object(DynamoScheduler.environment, "dynamodb_engine", dynamodb_engine)
+
+    schedule_time = int(time.time()) + 3 * 60
+    schedule_request = ScheduleRequest(
+        workflow_arn="test_arn", schedule_time=schedule_time
+    )
+    schedule_items = [DynamoScheduler.add_to_schedule(schedule_request)]
+    mocker.patch.object(DataMapper, "payload_codec", PayloadCodec.ZLIB)
+    schedule_items += [
+        r.schedule_item for r in DynamoScheduler.add_many([schedule_request])
+    ]
+
+    query_range = QueryRange(start_time=schedule_time, end_time=schedule_time + 60)
+    assert sorted(
+        DynamoScheduler.get_schedule_items(query_range, ScheduleStatus.NOT_STARTED),
+        key=lambda schedule_item: schedule_item.schedule_id,
+    ) == sorted(schedule_items, key=lambda schedule_item: schedule_item.schedule_id)
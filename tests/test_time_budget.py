@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+
+
+def test__time_budget_fits():
+    from lib.dispatcher.time_budget import TimeBudget
+
+    remaining = [30.0]
+    time_budget = TimeBudget(lambda: remaining[0], 10)
+
+    # latency unknown, only the margin and the explicit wait count
+    assert time_budget.fits(100)
+    assert time_budget.fits(1, 20)
+    assert not time_budget.exhausted
+    assert not time_budget.fits(1, 21)
+    assert time_budget.exhausted
+
+
+def test__time_budget_record(mocker):
+    from lib.dispatcher.time_budget import TimeBudget
+
+    clock = [0.0]
+    mocker.patch("time.monotonic", side_effect=lambda: clock[0])
+    time_budget = TimeBudget(lambda: 30, 10, smoothing=0.5)
+
+    # one second per item, then a slower batch moves the average halfway
+    clock[0] = 10.0
+    time_budget.record(10)
+    assert time_budget.seconds_per_item == 1.0
+    clock[0] = 40.0
+    time_budget.record(10)
+    assert time_budget.seconds_per_item == 2.0
+
+    assert time_budget.fits(10)
+    assert not time_budget.fits(11)
+
+
+def test__time_budget_limit():
+    from lib.dispatcher.time_budget import TimeBudget
+
+    remaining = iter([30, 30, 5])
+    time_budget = TimeBudget(lambda: next(remaining), 10)
+
+    batches = list(time_budget.limit([[1], [2], [3], [4]]))
+    assert batches == [[1], [2]]
+    assert time_budget.exhausted
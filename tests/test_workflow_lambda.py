@@ -37,3 +37,175 @@ def test__dispatcher_lambda(sns, lambda_function, dynamo_tables):
         ]
     }
     lambda_handler(lambda_event, None)
+
+
+def test__workflow_starter_lambda_engine(sns, dynamo_tables, mocker):
+    from lib.aws import AwsClients
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+    from src.workflow_starter import lambda_handler
+
+    current_time = int(time.time())
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=current_time + 150)
+    )
+
+    mocker.patch.object(Dispatcher.environment, "dispatch_mode", "engine")
+    mocker.patch.object(Dispatcher.environment, "engine_run_seconds", 30)
+    invoke = mocker.patch.object(AwsClients.client("lambda"), "invoke")
+
+    # sleeping advances the clock
+    clock = [float(current_time + 130)]
+    mocker.patch("time.time", side_effect=lambda: clock[0])
+    mocker.patch(
+        "time.sleep",
+        side_effect=lambda seconds: clock.__setitem__(0, clock[0] + seconds),
+    )
+
+    response = lambda_handler({}, None)
+
+    assert response["dispatched"] == 1
+    assert response["lateness"]["count"] == 1
+    invoke.assert_called_once()
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert dynamodb_item.status == ScheduleStatus.COMPLETED
+
+
+def test__workflow_starter_lambda_cursor(sns, dynamo_tables, mocker):
+    from lib.dispatcher.cursor import DispatchCursor
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.dispatcher.retry_window import RetryWindow
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+    from src.workflow_starter import lambda_handler
+
+    # ticks fall between the reads of the retry window
+    window_seconds = RetryWindow.window_seconds
+    current_time = (int(time.time()) // window_seconds + 1) * window_seconds + 200
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=current_time + 150)
+    )
+    mocker.patch.object(Dispatcher.environment, "dispatch_cursor", True)
+    get_dynamodb_items = mocker.spy(DynamoScheduler, "get_dynamodb_items")
+
+    # each tick reads from where the previous one stopped
+    mocker.patch("time.time", return_value=current_time)
+    assert lambda_handler({}, None)["dispatched"] == 0
+    assert DispatchCursor.load() == current_time + 60
+
+    mocker.patch("time.time", return_value=current_time + 100)
+    assert lambda_handler({}, None)["dispatched"] == 1
+    assert DispatchCursor.load() == current_time + 160
+
+    query_ranges = [
+        call.args[0]
+        for call in get_dynamodb_items.call_args_list
+        if call.args[1] == ScheduleStatus.NOT_STARTED
+    ]
+    assert [(r.start_time, r.end_time) for r in query_ranges] == [
+        (current_time - 60, current_time + 60),
+        (current_time + 60, current_time + 160),
+    ]
+
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert dynamodb_item.status == ScheduleStatus.PROCESSING
+
+
+def test__workflow_starter_lambda_cursor_errors(sns, dynamo_tables, mocker):
+    from lib.dispatcher.cursor import DispatchCursor
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+    from src.workflow_starter import lambda_handler
+
+    current_time = int(time.time())
+    schedule_item = DynamoScheduler.add_to_schedule(
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=current_time + 150)
+    )
+    mocker.patch.object(Dispatcher.environment, "dispatch_cursor", True)
+    mocker.patch.object(
+        DynamoScheduler.environment, "pending_index_name", "gsi_pending"
+    )
+    mocker.patch("time.time", return_value=current_time + 100)
+    DispatchCursor.advance(None, current_time + 60)
+
+    # failed publish does not hold the cursor, the item is retried behind it
+    mocker.patch.object(
+        Dispatcher.sns_topic.meta.client,
+        "publish",
+        side_effect=[Exception("test"), None],
+    )
+    assert len(lambda_handler({}, None)["errors"]) == 1
+    assert DispatchCursor.load() == current_time + 160
+
+    mocker.patch("time.time", return_value=current_time + 160)
+    assert lambda_handler({}, None)["dispatched"] == 1
+    assert DispatchCursor.load() == current_time + 220
+    dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+    assert dynamodb_item.status == ScheduleStatus.PROCESSING
+
+
+def test__workflow_starter_lambda_catch_up(sns, dynamo_tables, mocker):
+    from lib.dispatcher.cursor import DispatchCursor
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.scheduler import DynamoScheduler
+    from src.workflow_starter import lambda_handler
+
+    current_time = int(time.time())
+    DynamoScheduler.add_to_schedule(
+        ScheduleRequest(workflow_arn="test_arn", schedule_time=current_time + 150)
+    )
+    mocker.patch.object(Dispatcher.environment, "dispatch_cursor", True)
+    mocker.patch.object(Dispatcher.environment, "catch_up", True)
+    DispatchCursor.advance(None, current_time)
+
+    # backlog wider than one query range is drained in one tick
+    mocker.patch("time.time", return_value=current_time + 2000)
+    context = mocker.Mock(get_remaining_time_in_millis=lambda: 60000)
+    assert lambda_handler({}, context)["dispatched"] == 1
+    assert DispatchCursor.load() == current_time + 2060
+
+
+def test__workflow_starter_lambda_continuation(sns, dynamo_tables, mocker):
+    import json
+
+    from lib.aws import AwsClients
+    from lib.dispatcher.dispatcher import Dispatcher
+    from lib.requests_handler.data import ScheduleRequest
+    from lib.scheduler.data import ScheduleStatus
+    from lib.scheduler.scheduler import DynamoScheduler
+    from src.workflow_starter import lambda_handler
+
+    current_time = int(time.time())
+    schedule_items = [
+        DynamoScheduler.add_to_schedule(
+            ScheduleRequest(workflow_arn="test_arn", schedule_time=current_time + 150)
+        )
+        for _ in range(3)
+    ]
+    mocker.patch.object(Dispatcher.environment, "publish_batch_size", 1)
+    invoke = mocker.patch.object(AwsClients.client("lambda"), "invoke")
+    mocker.patch("time.time", return_value=current_time + 100)
+
+    # time runs out after the first item, a continuation gets the rest
+    remaining = iter([60000])
+    context = mocker.Mock(
+        function_name="workflow_starter",
+        get_remaining_time_in_millis=lambda: next(remaining, 0),
+    )
+    assert lambda_handler({}, context)["dispatched"] == 1
+
+    invoke.assert_called_once()
+    event = json.loads(invoke.call_args.kwargs["Payload"])
+    assert event["continuation"]["start_time"] == current_time + 40
+    assert invoke.call_args.kwargs["FunctionName"] == "workflow_starter"
+
+    assert lambda_handler(event, None)["dispatched"] == 2
+    for schedule_item in schedule_items:
+        dynamodb_item = DynamoScheduler.get_dynamodb_item(schedule_item.schedule_id)
+        assert dynamodb_item.status == ScheduleStatus.PROCESSING